@@ -0,0 +1,58 @@
+"""Compare Hilbert and Z-order (Morton) layouts of binary data.
+
+Reports the mapping throughput of both curves (the Hilbert table built from
+scratch and cached) and, on the same inputs, the mean spatial box count
+ratio per box size, which depends on how well the layout keeps neighbouring
+bytes together.
+
+    python benchmarks/bench_curves.py --sizes 1000000 16777216
+"""
+import argparse
+import time
+
+import numpy as np
+
+from spacial_boxcounting.core import spacialBoxcount_pyramid
+from spacial_boxcounting.hilbert import _hilbert_index_table
+from spacial_boxcounting.io import _map_bytes_to_hilbert
+from spacial_boxcounting.morton import morton_scatter
+
+
+def _timed(function, data):
+    start = time.perf_counter()
+    arr = function(data)
+    return arr, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1 << 20, 1 << 24], help="Input sizes in bytes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    maxiteration = 6
+    for size in args.sizes:
+        # Structured input: a random walk, so the layout affects the box counts.
+        data = (np.cumsum(rng.integers(-3, 4, size=size)) % 256).astype(np.uint8)
+        _hilbert_index_table.cache_clear()
+        hilbert_arr, hilbert_cold = _timed(_map_bytes_to_hilbert, data)
+        _, hilbert_warm = _timed(_map_bytes_to_hilbert, data)
+        morton_arr, morton_time = _timed(morton_scatter, data)
+        print(f"{size} bytes")
+        for name, seconds, arr in (("hilbert (cold)", hilbert_cold, hilbert_arr),
+                                   ("hilbert (cached)", hilbert_warm, hilbert_arr),
+                                   ("morton", morton_time, morton_arr)):
+            print(f"  {name:<17} {arr.shape!s:>14} {seconds:8.3f} s {size / seconds / 1e6:10.1f} MB/s")
+        print(f"  box sizes        {[2 << i for i in range(maxiteration)]}")
+        for name, arr in (("hilbert", hilbert_arr), ("morton", morton_arr)):
+            ratios = [_mean_ratio(BoxCountR_map) for BoxCountR_map, _ in spacialBoxcount_pyramid(arr, maxiteration, 256)]
+            print(f"  {name:<17}{np.round(ratios, 4).tolist()}")
+
+
+def _mean_ratio(BoxCountR_map):
+    """Mean box count ratio over the full tiles (the last row and column stay empty)."""
+    return float(BoxCountR_map[:-1, :-1].mean())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from ._version import VERSION as __version__
+
+
+def warmup(dtypes=None, verbose=False, **kwargs):
+    """Pre-compile the numba kernels, see core.warmup for kernels and layouts.
+
+    Returns:
+        dict: Mapping from kernel name to compile time in seconds; empty when numba is unavailable.
+    """
+    from .api import _numba_enabled
+    if not _numba_enabled():
+        return {}
+    from . import core
+    if dtypes is None:
+        dtypes = core.WARMUP_DTYPES
+    return core.warmup(dtypes, verbose=verbose, **kwargs)
@@ -1,36 +1,78 @@
 import math
+import os
+import importlib.util
 import numpy as np
-from .io import load_file_as_ndarray
-from .core import spacialBoxcount, Z_boxcount
+from .io import file_shape, iter_file_tiles, load_file_as_ndarray
 
 
-def boxcount_from_file(filepath, mode='spatial', hilbert=False, **kwargs):
+def _numba_enabled():
+    """Return False when numba is not installed or disabled.
+
+    Set SPACIAL_BOXCOUNTING_DISABLE_NUMBA=1 (or numba's own NUMBA_DISABLE_JIT=1)
+    to use the pure NumPy engine without importing numba at all.
+    """
+    for variable in ('SPACIAL_BOXCOUNTING_DISABLE_NUMBA', 'NUMBA_DISABLE_JIT'):
+        if os.environ.get(variable, '0') not in ('', '0'):
+            return False
+    return importlib.util.find_spec('numba') is not None
+
+
+def boxcount_from_file(filepath, mode='spatial', hilbert=False, curve=None, tile_side=None, cache=None, **kwargs):
     """Compute box count from a file.
 
     Parameters:
         filepath (str): Path to the input file.
         mode (str): 'spatial' for 2D result, 'single' for overall count.
         hilbert (bool): If True, apply Hilbert curve transformation.
-        **kwargs: Additional parameters for future extensions.
+        curve (str): Layout of binary files, 'hilbert' or the cheaper 'morton' (Z-order).
+        tile_side (int): Read the file in regions of this side (a power of two, at least
+            the box size) instead of loading it whole; spatial mode only, same result.
+        cache (ResultCache or str): Result cache (or its directory) to look the result up in
+            and store it to, see spacial_boxcounting.cache.
+        **kwargs: Additional parameters, e.g. num_threads for the spatial engine, out
+            (preallocated maps) and reduce (image downscaling) with tile_side, or color
+            ('channels' or 'joint') to count colour images without converting them to
+            grayscale, see boxcount_from_color.
 
     Returns:
         np.ndarray or dict: Spatial box count array or dict with single box count and lacunarity.
     """
-    arr = load_file_as_ndarray(filepath, mode='auto', hilbert=hilbert)
-    maxvalue = 256  # assuming 8-bit data
-    if mode == 'spatial':
-        # For demonstration, use the first iteration (box size = 2)
-        result = spacialBoxcount(arr, 0, maxvalue)
+    if cache is not None:
+        from .cache import as_cache
+        cache = as_cache(cache)
+        key = cache.key(filepath, function='boxcount_from_file', mode=mode, hilbert=hilbert, curve=curve,
+                        maxvalue=256, reduce=kwargs.get('reduce', 1), color=kwargs.get('color'))
+        result = cache.get(key)
+        if result is None:
+            result = boxcount_from_file(filepath, mode, hilbert, curve, tile_side, **kwargs)
+            cache.put(key, result)
+        elif kwargs.get('out') is not None:
+            for out, cached in zip(kwargs['out'], result):
+                out[...] = cached
+            result = kwargs['out']
         return result
+    if kwargs.get('color') is not None:
+        if mode != 'spatial' or tile_side is not None:
+            raise ValueError("color requires mode='spatial' without tile_side")
+        arr = load_file_as_ndarray(filepath, mode='auto', hilbert=hilbert, curve=curve, color=True)
+        return boxcount_from_color(arr, kwargs['color'], num_threads=kwargs.get('num_threads'))
+    if tile_side is not None:
+        if mode != 'spatial':
+            raise ValueError("tile_side requires mode='spatial'")
+        reduce = kwargs.get('reduce', 1)
+        tiles = iter_file_tiles(filepath, tile_side, hilbert=hilbert, curve=curve, reduce=reduce)
+        shape = file_shape(filepath, hilbert=hilbert, curve=curve, reduce=reduce)
+        return boxcount_from_tiles(tiles, shape, num_threads=kwargs.get('num_threads'), out=kwargs.get('out'))
+    from .scalespace import ScaleSpace
+    space = ScaleSpace.from_file(filepath, hilbert=hilbert, curve=curve, num_threads=kwargs.get('num_threads'))
+    if mode == 'spatial':
+        return space.spatial(0)
     elif mode == 'single':
-        # Use an arbitrary box size, e.g., 8 (index 2 in list [2,4,8,...])
-        counted, lacunarity = Z_boxcount(arr, 8, maxvalue)  
-        return {'boxcount': counted, 'lacunarity': lacunarity}
-    else:
-        raise ValueError("Unsupported mode. Use 'spatial' or 'single'.")
+        return space.single()
+    raise ValueError("Unsupported mode. Use 'spatial' or 'single'.")
 
 
-def boxcount_from_array(arr, mode='spatial', hilbert=False, maxvalue=256):
+def boxcount_from_array(arr, mode='spatial', hilbert=False, maxvalue=256, num_threads=None):
     """Compute box count from a numpy array.
 
     Parameters:
@@ -38,42 +80,206 @@ def boxcount_from_array(arr, mode='spatial', hilbert=False, maxvalue=256):
         mode (str): 'spatial' for spatial box count map, 'single' for overall count
         hilbert (bool): If True, apply Hilbert transform (if needed).
         maxvalue (int): Maximum value, defaults to 256 for 8-bit data
+        num_threads (int): Threads for the spatial engine, defaults to all cores.
 
     Returns:
         np.ndarray or dict: Spatial box count result or dictionary with box count and lacunarity in single mode.
+
+    Without a working numba the pure NumPy engine from vectorized is used.
     """
-    from .core import spacialBoxcount, Z_boxcount
     if mode == 'spatial':
-        result = spacialBoxcount(arr, 0, maxvalue)
+        if _numba_enabled():
+            from .core import spacialBoxcount_parallel
+            result = spacialBoxcount_parallel(arr, 0, maxvalue, num_threads)
+        else:
+            from .vectorized import spacialBoxcount_numpy
+            result = spacialBoxcount_numpy(arr, 0, maxvalue)
         return result
     elif mode == 'single':
+        if _numba_enabled():
+            from .core import Z_boxcount_hist as Z_boxcount
+        else:
+            from .vectorized import Z_boxcount_numpy as Z_boxcount
         counted, lacunarity = Z_boxcount(arr, 8, maxvalue)
         return {'boxcount': counted, 'lacunarity': lacunarity}
     else:
         raise ValueError("Unsupported mode. Use 'spatial' or 'single'.")
 
 
-def boxcount_from_array(arr, mode='spatial', hilbert=False, maxvalue=256):
-    """Compute box count from a numpy array.
+def multiscale_boxcount(arr, maxiteration=None, maxvalue=256, dtype=np.float64, out=None):
+    """Compute the spatial maps of the scales 0..maxiteration-1 into one contiguous buffer.
+
+    Replaces the dict of MultithreadBoxcount: the single-pass pyramid writes every
+    map straight into a MultiscaleMaps buffer, float32 on request, without copies.
 
     Parameters:
-        arr (np.ndarray): Input array
-        mode (str): 'spatial' for spatial box count map, 'single' for overall count
-        hilbert (bool): If True, apply Hilbert transform (if needed).
+        arr (np.ndarray): Input 2D array.
+        maxiteration (int): Number of scales, defaults to the box sizes up to
+            min(16, Y, X) as in MultithreadBoxcount.
         maxvalue (int): Maximum value, defaults to 256 for 8-bit data
+        dtype: np.float64 or np.float32 for the maps.
+        out (MultiscaleMaps): Preallocated maps to fill, e.g. MultiscaleMaps.load(path, 'r+').
 
     Returns:
-        np.ndarray or dict: Spatial box count result or dictionary with box count and lacunarity in single mode.
+        MultiscaleMaps: maps[iteration] is the (2, h, w) view [BoxCountR_map, spa_Lac_map].
     """
-    from .core import spacialBoxcount, Z_boxcount
-    if mode == 'spatial':
-        result = spacialBoxcount(arr, 0, maxvalue)
-        return result
-    elif mode == 'single':
-        counted, lacunarity = Z_boxcount(arr, 8, maxvalue)
-        return {'boxcount': counted, 'lacunarity': lacunarity}
+    from .multiscale import MultiscaleMaps
+    if maxiteration is None:
+        maxiteration = int(np.log2(min(16, *arr.shape))) if min(arr.shape) >= 2 else 0
+    if maxiteration < 1:
+        raise ValueError("at least one scale is required")
+    if out is None:
+        out = MultiscaleMaps.allocate(arr.shape, range(maxiteration), dtype)
+    elif out.iterations != tuple(range(maxiteration)) or \
+            out.shapes != MultiscaleMaps.allocate(arr.shape, range(maxiteration), np.uint8).shapes:
+        raise ValueError("out does not hold the maps of %d scales of a %s array" % (maxiteration, arr.shape))
+    if out.dtype not in (np.float32, np.float64):
+        raise ValueError("maps must be float32 or float64")
+    if not out.buffer.flags.writeable:
+        raise ValueError("out is read-only; load the maps with MultiscaleMaps.load(path, 'r+')")
+    if _numba_enabled():
+        from .core import _pyramid_fill, _pyramid_offsets
+        offsets = _pyramid_offsets(arr.shape[0], arr.shape[1], maxiteration)
+        _pyramid_fill(arr, maxiteration, maxvalue, np.asarray(out.buffer), offsets)
     else:
-        raise ValueError("Unsupported mode. Use 'spatial' or 'single'.")
+        from .vectorized import spacialBoxcount_numpy
+        for iteration, maps in out:
+            maps[...] = spacialBoxcount_numpy(arr, iteration, maxvalue)
+    return out
+
+
+def boxcount_from_color(image, mode='channels', iteration=0, maxvalue=256, num_threads=None):
+    """Compute spatial box counts of a multi-channel image without concatenating its channels.
+
+    Parameters:
+        image (np.ndarray): (C, Y, X) array, e.g. io.load_file_as_ndarray(path, color=True)
+            or rgb.transpose(2, 0, 1); read in place whatever its strides.
+        mode (str): 'channels' for the maps of every channel, 'joint' for the occupied
+            cells of the C-dimensional value cube (e.g. RGB) per spatial box.
+        iteration (int): Index into the box sizes [2, 4, ..., 1024].
+        maxvalue (int): Maximum value per channel, defaults to 256 for 8-bit data
+        num_threads (int): Threads for the numba engine, defaults to all cores.
+
+    Returns:
+        np.ndarray or list: (C, 2, h, w) maps in 'channels' mode, [BoxCountR_map, spa_Lac_map]
+            in 'joint' mode, see core.spacialBoxcount_channels and core.spacialBoxcount_joint.
+    """
+    if image.ndim != 3:
+        raise ValueError("image must have shape (C, Y, X)")
+    if mode not in ('channels', 'joint'):
+        raise ValueError("Unsupported mode. Use 'channels' or 'joint'.")
+    if _numba_enabled():
+        from .core import spacialBoxcount_channels, spacialBoxcount_joint
+        if mode == 'channels':
+            return spacialBoxcount_channels(image, iteration, maxvalue, num_threads)
+        return spacialBoxcount_joint(image, iteration, maxvalue, num_threads)
+    from .vectorized import spacialBoxcount_numpy
+    if mode == 'channels':
+        return np.stack([np.array(spacialBoxcount_numpy(channel, iteration, maxvalue)) for channel in image])
+    # Same bound as core.spacialBoxcount_joint, the cells then number at most (maxvalue / boxsize) ** C.
+    if not (image.dtype == np.uint8 and maxvalue >= 256) and image.size \
+            and (image.min() < 0 or image.max() >= maxvalue):
+        raise ValueError("joint mode requires values in [0, maxvalue)")
+    # Number the value cells and scale them back up by the box size, so the plain
+    # spatial engine counts cells with (maxvalue / boxsize) ** C possible ones.
+    boxsize = 2 << iteration
+    cells = np.zeros(image.shape[1:], dtype=np.int64)
+    for channel in image:
+        bins = np.floor_divide(channel, boxsize).astype(np.int64)
+        cells *= int(bins.max(initial=0)) + 1
+        cells += bins
+    return spacialBoxcount_numpy(cells * boxsize, iteration, int(maxvalue / boxsize) ** image.shape[0] * boxsize)
+
+
+def boxcount_from_stack(stack, scales=(0,), maxvalue=256, num_threads=None, out=None):
+    """Compute spatial box count maps of N same-shaped images at several scales.
+
+    Parameters:
+        stack (np.ndarray): (N, Y, X) array, e.g. a dataset of 128x128 chunks.
+        scales (iterable): Indices into the box sizes [2, 4, ..., 1024].
+        maxvalue (int): Maximum value, defaults to 256 for 8-bit data
+        num_threads (int): Threads for the spatial engine, defaults to all cores.
+        out (np.ndarray): Preallocated float64 result of the shape below.
+
+    Returns:
+        np.ndarray: (N, S, 2, h, w) maps with h, w = Y // b + 1, X // b + 1 for the smallest
+            box size b; out[n, s] holds the spatial result of stack[n] at scales[s] in its
+            top-left corner, see core.spacialBoxcount_stack.
+    """
+    scales = list(scales)
+    if _numba_enabled():
+        from .core import spacialBoxcount_stack
+        return spacialBoxcount_stack(stack, scales, maxvalue, num_threads, out)
+    from .vectorized import spacialBoxcount_numpy
+    stack = np.asarray(stack)
+    if stack.ndim != 3 or not scales:
+        raise ValueError("stack must have shape (N, Y, X) and at least one scale is required")
+    N, YRange, XRange = stack.shape
+    boxsize = 2 << min(scales)
+    shape = (N, len(scales), 2, YRange // boxsize + 1, XRange // boxsize + 1)
+    if out is None:
+        out = np.zeros(shape)
+    elif out.shape != shape:
+        raise ValueError("out must have shape %s" % (shape,))
+    else:
+        out[...] = 0
+    for n in range(N):
+        for s, iteration in enumerate(scales):
+            BoxCountR_map, spa_Lac_map = spacialBoxcount_numpy(stack[n], iteration, maxvalue)
+            out[n, s, 0, :BoxCountR_map.shape[0], :BoxCountR_map.shape[1]] = BoxCountR_map
+            out[n, s, 1, :spa_Lac_map.shape[0], :spa_Lac_map.shape[1]] = spa_Lac_map
+    return out
+
+
+def boxcount_from_tiles(tiles, shape, iteration=0, maxvalue=256, num_threads=None, out=None):
+    """Compute the spatial box count maps of an array given as tiles.
+
+    Each tile is counted on its own and its maps are copied into the maps of
+    the whole array, so only one tile has to be in memory at a time.
+
+    Parameters:
+        tiles (iterable): (y0, x0, tile) triples, e.g. from io.iter_binary_tiles, covering
+            the array; tile origins must be multiples of the box size.
+        shape (tuple): Shape (Y, X) of the whole array.
+        iteration (int): Index into the box sizes [2, 4, ..., 1024].
+        maxvalue (int): Maximum value, defaults to 256 for 8-bit data
+        num_threads (int): Threads for the spatial engine, defaults to all cores.
+        out (list): Preallocated [BoxCountR_map, spa_Lac_map] of shape
+            (Y // boxsize + 1, X // boxsize + 1), e.g. np.memmap files for huge inputs.
+
+    Returns:
+        list: [BoxCountR_map, spa_Lac_map], equal to the spatial result for the whole array.
+    """
+    if _numba_enabled():
+        from .core import spacialBoxcount_parallel
+
+        def count(tile):
+            return spacialBoxcount_parallel(tile, iteration, maxvalue, num_threads)
+    else:
+        from .vectorized import spacialBoxcount_numpy
+
+        def count(tile):
+            return spacialBoxcount_numpy(tile, iteration, maxvalue)
+    boxsize = 2 << iteration
+    YRange, XRange = shape
+    if out is None:
+        BoxCountR_map = np.zeros((YRange // boxsize + 1, XRange // boxsize + 1))
+        spa_Lac_map = np.zeros((YRange // boxsize + 1, XRange // boxsize + 1))
+    else:
+        BoxCountR_map, spa_Lac_map = out
+        if BoxCountR_map.shape != (YRange // boxsize + 1, XRange // boxsize + 1) or spa_Lac_map.shape != BoxCountR_map.shape:
+            raise ValueError("out maps must have shape %s" % ((YRange // boxsize + 1, XRange // boxsize + 1),))
+        BoxCountR_map[-1] = BoxCountR_map[:, -1] = 0
+        spa_Lac_map[-1] = spa_Lac_map[:, -1] = 0
+    for y0, x0, tile in tiles:
+        if y0 % boxsize or x0 % boxsize:
+            raise ValueError("tile origin (%d, %d) is not a multiple of the box size %d" % (y0, x0, boxsize))
+        # Only full boxes are counted, the trailing row and column of a tile map stay empty.
+        nY, nX = tile.shape[0] // boxsize, tile.shape[1] // boxsize
+        tile_counts, tile_lacunarity = count(tile)
+        BoxCountR_map[y0 // boxsize:y0 // boxsize + nY, x0 // boxsize:x0 // boxsize + nX] = tile_counts[:nY, :nX]
+        spa_Lac_map[y0 // boxsize:y0 // boxsize + nY, x0 // boxsize:x0 // boxsize + nX] = tile_lacunarity[:nY, :nX]
+    return [BoxCountR_map, spa_Lac_map]
 
 
 def global_boxcount_from_array(arr, scales=range(10), maxvalue=256, BoxSizes = None):
@@ -90,15 +296,87 @@ def global_boxcount_from_array(arr, scales=range(10), maxvalue=256, BoxSizes = N
     if BoxSizes is None:
         BoxSizes = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
 
-    from .core import Z_boxcount
-    result = {}
-    for iteration in scales:
-        bs = BoxSizes[iteration]
-        counted, _ = Z_boxcount(arr, bs, maxvalue)
-        result[bs] = counted
-    return result
+    from .scalespace import ScaleSpace
+    box_sizes = [BoxSizes[iteration] for iteration in scales]
+    counts, _ = ScaleSpace(arr, maxvalue).global_boxcounts(box_sizes)
+    return dict(zip(box_sizes, (int(counted) for counted in counts)))
+
+
+def pack_patches(patches):
+    """Pack arrays of different shapes into one flat buffer with CSR offsets.
+
+    Returns:
+        tuple: (pixels, offsets, shapes); patch i is pixels[offsets[i]:offsets[i + 1]]
+            reshaped to shapes[i].
+    """
+    patches = [np.asarray(patch) for patch in patches]
+    shapes = np.array([patch.shape if patch.ndim == 2 else (1, patch.size) for patch in patches],
+                      dtype=np.int64).reshape(-1, 2)
+    offsets = np.zeros(len(patches) + 1, dtype=np.int64)
+    np.cumsum([patch.size for patch in patches], out=offsets[1:])
+    dtype = np.result_type(*patches) if patches else np.uint8
+    pixels = np.empty(offsets[-1], dtype=dtype)
+    for patch, start, stop in zip(patches, offsets[:-1], offsets[1:]):
+        pixels[start:stop] = patch.ravel()
+    return pixels, offsets, shapes
 
 
+def global_boxcount_from_ragged(pixels, offsets, box_sizes=(2, 4, 8, 16, 32, 64, 128), maxvalue=256, shapes=None,
+                                num_threads=None):
+    """Compute global box counts and lacunarities of many patches of different sizes.
+
+    Parameters:
+        pixels (np.ndarray): 1D buffer with the pixels of all patches, e.g. from pack_patches.
+        offsets (np.ndarray): n_patches + 1 offsets; patch i is pixels[offsets[i]:offsets[i + 1]].
+        box_sizes (iterable): Box sizes, any positive integers.
+        maxvalue (int): Maximum value, defaults to 256 for 8-bit data
+        shapes (np.ndarray): Optional (n_patches, 2) patch shapes, checked against the offsets.
+        num_threads (int): Threads for the numba engine, defaults to all cores.
+
+    Returns:
+        tuple: (counts, lacunarities) arrays of shape (n_patches, n_scales), see
+            core.global_boxcount_ragged. Empty patches count 0 with NaN lacunarity.
+    """
+    box_sizes = [int(bs) for bs in box_sizes]
+    if _numba_enabled():
+        from .core import global_boxcount_ragged
+        return global_boxcount_ragged(pixels, offsets, box_sizes, maxvalue, shapes, num_threads)
+    from .vectorized import Z_boxcount_numpy
+    pixels = np.asarray(pixels).ravel()
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if offsets.ndim != 1 or offsets.size == 0 or offsets[0] != 0 or offsets[-1] != pixels.size \
+            or np.any(np.diff(offsets) < 0):
+        raise ValueError("offsets must rise from 0 to len(pixels)")
+    counts = np.zeros((offsets.size - 1, len(box_sizes)), dtype=np.int64)
+    lacunarities = np.full((offsets.size - 1, len(box_sizes)), np.nan)
+    for i, (start, stop) in enumerate(zip(offsets[:-1], offsets[1:])):
+        if stop > start:
+            for s, bs in enumerate(box_sizes):
+                counts[i, s], lacunarities[i, s] = Z_boxcount_numpy(pixels[start:stop], bs, maxvalue)
+    return counts, lacunarities
+
+
+def _global_boxcounts(arr, box_sizes, maxvalue):
+    """Return global box counts and lacunarities for box_sizes.
+
+    Power-of-two sizes share one histogram pyramid; other sizes are counted one by one.
+    """
+    box_sizes = [int(bs) for bs in box_sizes]
+    if not _numba_enabled():
+        from .vectorized import Z_boxcount_numpy
+        results = [Z_boxcount_numpy(arr, bs, maxvalue) for bs in box_sizes]
+        return [r[0] for r in results], [r[1] for r in results]
+    from .core import global_boxcount_pyramid, Z_boxcount_hist
+    shifts = [bs.bit_length() - 1 for bs in box_sizes if bs > 0 and bs & (bs - 1) == 0]
+    pyramid_counts, pyramid_lacunarities = global_boxcount_pyramid(arr, np.array(shifts, dtype=np.int64), maxvalue)
+    pyramid = {1 << s: (int(c), float(l)) for s, c, l in zip(shifts, pyramid_counts, pyramid_lacunarities)}
+    counts, lacunarities = [], []
+    for bs in box_sizes:
+        counted, lacunarity = pyramid[bs] if bs in pyramid else Z_boxcount_hist(arr, bs, maxvalue)
+        counts.append(counted)
+        lacunarities.append(lacunarity)
+    return counts, lacunarities
+
 
 def fractal_dimension_from_array(arr, maxvalue=256, box_sizes=None):
     """
@@ -112,16 +390,38 @@ def fractal_dimension_from_array(arr, maxvalue=256, box_sizes=None):
     Returns:
         float: Fractal dimension estimate
     """
-    # Set default box sizes (powers of 2 up to array size)
+    from .scalespace import ScaleSpace
+    # Default box sizes are the powers of 2 up to the array size
+    return ScaleSpace(arr, maxvalue).fractal_dimension(box_sizes)
+
+
+def fractal_dimension_from_tiles(tiles, shape, maxvalue=256, box_sizes=None):
+    """Compute fractal dimension from an array given as tiles.
+
+    The global box count only depends on which values occur, so the tiles are
+    reduced to their distinct values and the result equals
+    fractal_dimension_from_array on the whole array.
+
+    Parameters:
+        tiles (iterable): (y0, x0, tile) triples, e.g. from io.iter_file_tiles.
+        shape (tuple): Shape (Y, X) of the whole array.
+        maxvalue (int): Maximum pixel value (default 256)
+        box_sizes (list): Box sizes to use (default powers of 2)
+
+    Returns:
+        float: Fractal dimension estimate
+    """
     if box_sizes is None:
-        max_size = min(arr.shape)
-        box_sizes = [2**i for i in range(1, int(np.log2(max_size)) + 1)]
-    
-    counts = []
-    for bs in box_sizes:
-        count, _ = Z_boxcount(arr, bs, maxvalue)
-        counts.append(count)
-    
+        box_sizes = [2**i for i in range(1, int(np.log2(min(shape))) + 1)]
+    values = np.empty(0)
+    for _, _, tile in tiles:
+        values = np.union1d(values, np.unique(tile))
+    counts = [len(np.unique(np.floor(values / bs))) for bs in box_sizes]
+    return _fit_dimension(box_sizes, counts)
+
+
+def _fit_dimension(box_sizes, counts):
+    """Slope of log(count) over log(box size), negated."""
     # Filter zero counts and compute logs
     valid_idx = [i for i, c in enumerate(counts) if c > 0]
     log_sizes = np.log([box_sizes[i] for i in valid_idx])
@@ -131,7 +431,24 @@ def fractal_dimension_from_array(arr, maxvalue=256, box_sizes=None):
     slope, _ = np.polyfit(log_sizes, log_counts, 1)
     return -slope
 
-def fractal_dimension_from_file(filepath, maxvalue=256, box_sizes=None, hilbert=False):
+
+def multi_scale_fractal_dimension_from_array(arr, scales=range(10), maxvalue=256, BoxSizes=None):
+    """Compute fractal dimension from a numpy array over selected scales.
+
+    Parameters:
+        arr (np.ndarray): Input 2D array.
+        scales (iterable): Indices of scales to use (default: 0-9).
+        maxvalue (int): Maximum value, default is 256 (for 8-bit).
+
+    Returns:
+        float: Fractal dimension estimate
+    """
+    if BoxSizes is None:
+        BoxSizes = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    return fractal_dimension_from_array(arr, maxvalue, [BoxSizes[iteration] for iteration in scales])
+
+def fractal_dimension_from_file(filepath, maxvalue=256, box_sizes=None, hilbert=False, curve=None, tile_side=None,
+                                cache=None):
     """
     Compute fractal dimension from file using multi-scale box counting.
     
@@ -140,9 +457,30 @@ def fractal_dimension_from_file(filepath, maxvalue=256, box_sizes=None, hilbert=
         maxvalue (int): Maximum pixel value (default 256)
         box_sizes (list): Box sizes to use
         hilbert (bool): Apply Hilbert curve transformation
+        curve (str): Layout of binary files, 'hilbert' or 'morton'
+        tile_side (int): Read the file in regions of this side instead of loading it whole
+        cache (ResultCache or str): Result cache (or its directory), see spacial_boxcounting.cache
         
     Returns:
         float: Fractal dimension estimate
     """
-    arr = load_file_as_ndarray(filepath, mode='auto', hilbert=hilbert)
-    return fractal_dimension_from_array(arr, maxvalue, box_sizes)
\ No newline at end of file
+    if cache is not None:
+        from .cache import as_cache
+        cache = as_cache(cache)
+        key = cache.key(filepath, function='fractal_dimension_from_file', maxvalue=maxvalue,
+                        box_sizes=None if box_sizes is None else [int(bs) for bs in box_sizes],
+                        hilbert=hilbert, curve=curve)
+        result = cache.get(key)
+        if result is None:
+            result = fractal_dimension_from_file(filepath, maxvalue, box_sizes, hilbert, curve, tile_side)
+            cache.put(key, float(result))
+        return float(result)
+    if tile_side is not None:
+        tiles = iter_file_tiles(filepath, tile_side, hilbert=hilbert, curve=curve)
+        return fractal_dimension_from_tiles(tiles, file_shape(filepath, hilbert=hilbert, curve=curve), maxvalue, box_sizes)
+    from .scalespace import ScaleSpace
+    return ScaleSpace.from_file(filepath, hilbert=hilbert, curve=curve, maxvalue=maxvalue).fractal_dimension(box_sizes)
+
+
+# Short alias used by the CLI and README.
+fractal_dimension = fractal_dimension_from_file
@@ -1,9 +1,12 @@
 import os
 import glob
+import multiprocessing
 from .api import boxcount_from_file
+from .cache import as_cache
 
 
-def batch_boxcount(input_folder, mode='spatial', hilbert=False, file_pattern='*.*'):
+def batch_boxcount(input_folder, mode='spatial', hilbert=False, file_pattern='*.*', curve=None, jobs=1, chunksize=None,
+                   cache=None):
     """Process all files in a directory using boxcounting.
 
     Parameters:
@@ -11,21 +14,92 @@ def batch_boxcount(input_folder, mode='spatial', hilbert=False, file_pattern='*.
         mode (str): 'spatial' or 'single'.
         hilbert (bool): If True, apply Hilbert transform.
         file_pattern (str): Pattern to match files, default '*.*'.
+        curve (str): Layout of binary files, 'hilbert' or 'morton'.
+        jobs (int): Number of worker processes; 1 processes the files in this process.
+        chunksize (int): Files sent to a worker at a time, defaults to a size that
+            gives each worker about four chunks.
+        cache (ResultCache or str): Result cache shared by all workers, see spacial_boxcounting.cache.
 
     Returns:
         dict: Mapping from filename to boxcount result.
+
+    All results are held in memory; iter_batch_boxcount streams them instead.
     """
     results = {}
+    for filepath, result in iter_batch_boxcount(input_folder, mode, hilbert, file_pattern, curve, jobs, chunksize, cache):
+        results[os.path.basename(filepath)] = result
+    return results
+
+
+def iter_batch_boxcount(input_folder, mode='spatial', hilbert=False, file_pattern='*.*', curve=None, jobs=1, chunksize=None,
+                        cache=None):
+    """Yield (path, result) for every matching file as soon as it is processed.
+
+    Takes the same parameters as batch_boxcount. Failed files yield an
+    'Error: ...' string as their result. Pass the pairs to a writer from
+    spacial_boxcounting.writers to store results incrementally.
+    """
     search_path = os.path.join(input_folder, file_pattern)
     file_list = glob.glob(search_path)
+    yield from _iter_results(file_list, mode, hilbert, curve, jobs, chunksize, cache)
 
-    for filepath in file_list:
-        try:
-            result = boxcount_from_file(filepath, mode=mode, hilbert=hilbert)
-            results[os.path.basename(filepath)] = result
-        except Exception as e:
-            results[os.path.basename(filepath)] = f'Error: {e}'
-    return results
+
+def _iter_results(file_list, mode='spatial', hilbert=False, curve=None, jobs=1, chunksize=None, cache=None):
+    """Yield (path, result) for every file, in completion order when jobs > 1.
+
+    With several jobs the files go to a pool of worker processes that import the
+    package and compile the kernels once. The largest files are scheduled first
+    so no big file is left running alone at the end.
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    cache = as_cache(cache)
+    if jobs == 1 or len(file_list) <= 1:
+        for filepath in file_list:
+            yield _boxcount_task((filepath, mode, hilbert, curve, None, cache))
+        return
+    file_list = sorted(file_list, key=_file_size, reverse=True)
+    if chunksize is None:
+        chunksize = max(1, min(64, len(file_list) // (4 * jobs)))
+    # One numba thread per worker, the pool provides the parallelism.
+    tasks = [(filepath, mode, hilbert, curve, 1, cache) for filepath in file_list]
+    # spawn: forking a parent that already runs numba's thread pool is not safe.
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(min(jobs, len(file_list)), initializer=_init_worker) as pool:
+        yield from pool.imap_unordered(_boxcount_task, tasks, chunksize=chunksize)
+    if cache is not None:
+        # Workers rescan only every few puts, trim what they wrote in between.
+        cache.evict()
+
+
+def _file_size(filepath):
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
+
+
+# The kernels behind boxcount_from_file in 'spatial' and 'single' mode, and the
+# uint8 arrays load_file_as_ndarray returns: decoded images and curve layouts
+# (writable), .npy and raw binary files (read-only) and bottom-up BMPs
+# (read-only, reversed row stride).
+WORKER_KERNELS = ('spacialBoxcount_parallel', 'global_boxcount_pyramid')
+WORKER_LAYOUTS = (('C', False), ('C', True), ('A', True))
+
+
+def _init_worker():
+    """Import the engine and compile the kernels of the tasks once per worker process."""
+    from . import warmup
+    warmup(['uint8'], kernels=WORKER_KERNELS, layouts=WORKER_LAYOUTS)
+
+
+def _boxcount_task(task):
+    filepath, mode, hilbert, curve, num_threads, cache = task
+    try:
+        result = boxcount_from_file(filepath, mode=mode, hilbert=hilbert, curve=curve, num_threads=num_threads, cache=cache)
+    except Exception as e:
+        result = f'Error: {e}'
+    return filepath, result
 
 
 if __name__ == '__main__':
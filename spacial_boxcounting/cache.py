@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from ._version import VERSION
+
+# Puts after which the size is rescanned from disk, so that processes sharing a
+# cache directory see each other's writes.
+RESCAN_PUTS = 16
+
+# realpath of a cache directory -> [estimated size in bytes, puts since the last
+# scan]. Kept per process rather than per instance: batch tasks each unpickle
+# their own copy of the cache, and these must all count towards one size.
+_sizes = {}
+
+
+class ResultCache:
+    """Content-addressed on-disk cache for file results.
+
+    Keys hash the input file together with every parameter that changes the
+    result (and the package version). By default the file content is hashed;
+    fast=True uses path, size and mtime instead, so an unchanged input costs a
+    stat call. Every entry is a small JSON file entries/<kk>/<key>.json holding
+    scalar results inline and naming the .npy files of spatial maps (or of an
+    array result) next to it.
+    All files are written to a temporary name and renamed into place, the JSON
+    entry last, so parallel workers can share one cache directory.
+
+    Entries are evicted least recently used first (by entry mtime, refreshed on
+    every hit) once the cache grows beyond max_bytes. The size is scanned on the
+    first put of a process and then tracked from the bytes written, with a fresh
+    scan every RESCAN_PUTS puts so that the writes of other processes sharing the
+    directory are counted too. Failing writes only cost the entry, they never
+    raise.
+
+    Parameters:
+        directory (str): Cache directory, created if missing.
+        max_bytes (int): Size bound of the cache, default 1 GiB.
+        fast (bool): Key on path, size and mtime instead of the file content.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30, fast=False):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.fast = fast
+        os.makedirs(os.path.join(directory, 'entries'), exist_ok=True)
+
+    @property
+    def _size(self):
+        """Estimated size of the cache in bytes, None before the first scan in this process."""
+        state = _sizes.get(os.path.realpath(self.directory))
+        return None if state is None else state[0]
+
+    def key(self, filepath, **params):
+        """Return the cache key of filepath for the given result parameters."""
+        digest = hashlib.sha256()
+        if self.fast:
+            stat = os.stat(filepath)
+            digest.update(json.dumps([os.path.realpath(filepath), stat.st_size, stat.st_mtime_ns]).encode())
+        else:
+            with open(filepath, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        digest.update(json.dumps([VERSION, sorted(params.items())], default=_json_default).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+            if entry['kind'] == 'maps':
+                value = [np.load(os.path.join(os.path.dirname(entry_path), name)) for name in entry['files']]
+            elif entry['kind'] == 'array':
+                value = np.load(os.path.join(os.path.dirname(entry_path), entry['files'][0]))
+            else:
+                value = entry['value']
+        except (OSError, ValueError, KeyError):
+            # missing, or evicted by another process meanwhile
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, result):
+        """Store result, a [BoxCountR_map, spa_Lac_map] pair, an array or a JSON serializable value.
+
+        Returns False if the entry could not be written (e.g. a full or read-only disk).
+        """
+        try:
+            size = self._write(key, result)
+            state = _sizes.get(os.path.realpath(self.directory))
+            if state is None or state[0] + size > self.max_bytes or state[1] + 1 >= RESCAN_PUTS:
+                self.evict()
+            else:
+                state[0] += size
+                state[1] += 1
+        except (OSError, TypeError, ValueError):
+            return False
+        return True
+
+    def _write(self, key, result):
+        entry_path = self._entry_path(key)
+        folder = os.path.dirname(entry_path)
+        os.makedirs(folder, exist_ok=True)
+        size = 0
+        if isinstance(result, (list, tuple)) and all(isinstance(r, np.ndarray) for r in result):
+            files = ['%s.%d.npy' % (key, i) for i in range(len(result))]
+            for name, arr in zip(files, result):
+                size += _atomic_write(os.path.join(folder, name), lambda f, arr=arr: np.save(f, arr))
+            entry = {'kind': 'maps', 'files': files}
+        elif isinstance(result, np.ndarray):
+            # e.g. the (C, 2, h, w) maps of boxcount_from_color
+            files = ['%s.npy' % key]
+            size += _atomic_write(os.path.join(folder, files[0]), lambda f: np.save(f, result))
+            entry = {'kind': 'array', 'files': files}
+        else:
+            entry = {'kind': 'json', 'value': result}
+        data = json.dumps(entry, default=_json_default).encode()
+        return size + _atomic_write(entry_path, lambda f: f.write(data))
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used entries until the cache is below max_bytes (90% of it when trimming).
+
+        Also measures the cache, the size put() tracks from here on.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        # key -> [last use, folder, bytes, file names]; the last use of an entry is the
+        # mtime of its JSON file, files without one (interrupted writes) only have their own.
+        entries, total = {}, 0
+        for folder in os.scandir(os.path.join(self.directory, 'entries')):
+            if not folder.is_dir():
+                continue
+            for item in os.scandir(folder.path):
+                if item.name.endswith('.tmp'):
+                    # in-flight write of another process
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                total += stat.st_size
+                key = item.name.split('.', 1)[0]
+                entry = entries.setdefault(key, [stat.st_mtime, folder.path, 0, []])
+                entry[2] += stat.st_size
+                entry[3].append(item.name)
+                if item.name.endswith('.json'):
+                    entry[0] = stat.st_mtime
+        if total > limit:
+            target = limit * 0.9
+            for _, folder, size, names in sorted(entries.values(), key=lambda entry: entry[0]):
+                if total <= target:
+                    break
+                # the JSON entry first, so readers never find an entry without its maps
+                for name in sorted(names, key=lambda name: not name.endswith('.json')):
+                    try:
+                        os.unlink(os.path.join(folder, name))
+                    except OSError:
+                        pass
+                total -= size
+        _sizes[os.path.realpath(self.directory)] = [total, 0]
+
+    def clear(self):
+        """Remove every entry."""
+        self.evict(max_bytes=-1)
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, 'entries', key[:2], key + '.json')
+
+
+def as_cache(cache):
+    """Return cache as a ResultCache; a string is taken as the cache directory."""
+    if cache is None or isinstance(cache, ResultCache):
+        return cache
+    return ResultCache(cache)
+
+
+def _atomic_write(path, write):
+    """Write through write(f) to a temporary file, rename it to path and return its size."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+def _json_default(value):
+    # numpy scalars and arrays (e.g. box sizes) in keys and results
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (np.ndarray, range)):
+        return list(value)
+    raise TypeError("not JSON serializable: %r" % (value,))
@@ -1,7 +1,13 @@
 import argparse
 import os
 import glob
-from spacial_boxcounting.api import boxcount_from_file, fractal_dimension
+from spacial_boxcounting import warmup
+from spacial_boxcounting.api import boxcount_from_color
+from spacial_boxcounting.batch import _iter_results
+from spacial_boxcounting.cache import ResultCache
+from spacial_boxcounting.io import gray_from_color, load_file_as_ndarray
+from spacial_boxcounting.scalespace import ScaleSpace
+from spacial_boxcounting.writers import open_writer, output_format
 
 try:
     from tqdm import tqdm
@@ -11,46 +17,84 @@ except ImportError:
 
 def main():
     parser = argparse.ArgumentParser(description="spacial-boxcounting CLI")
-    subparsers = parser.add_subparsers(dest="command", help="Commands: single, batch")
+    subparsers = parser.add_subparsers(dest="command", help="Commands: single, batch, warmup")
 
     # Single file processing
     parser_single = subparsers.add_parser("single", help="Process a single file")
     parser_single.add_argument("--file", required=True, help="Path to the input file")
     parser_single.add_argument("--mode", choices=["spatial", "single"], default="spatial", help="Mode to use")
     parser_single.add_argument("--hilbert", action="store_true", help="Apply Hilbert transform")
+    parser_single.add_argument("--curve", choices=["hilbert", "morton"], default=None, help="Curve to lay binary files out on")
+    parser_single.add_argument("--color", choices=["channels", "joint"], default=None,
+                               help="Count colour images per channel or in the joint RGB cube instead of as grayscale "
+                                    "(spatial mode only)")
 
     # Batch processing
     parser_batch = subparsers.add_parser("batch", help="Process a folder of files")
     parser_batch.add_argument("--folder", required=True, help="Path to input folder")
     parser_batch.add_argument("--mode", choices=["spatial", "single"], default="spatial", help="Mode to use")
     parser_batch.add_argument("--hilbert", action="store_true", help="Apply Hilbert transform")
+    parser_batch.add_argument("--curve", choices=["hilbert", "morton"], default=None, help="Curve to lay binary files out on")
     parser_batch.add_argument("--pattern", default="*.*", help="File pattern for matching")
+    parser_batch.add_argument("--jobs", type=int, default=1, help="Worker processes, 0 for one per core")
+    parser_batch.add_argument("--output", default=None,
+                              help="Write results incrementally: a .jsonl file or a directory of map files")
+    parser_batch.add_argument("--format", choices=["jsonl", "npz", "npy"], default=None,
+                              help="Output format, inferred from --output by default")
+    parser_batch.add_argument("--cache", default=None, help="Result cache directory, reused across runs")
+    parser_batch.add_argument("--cache-fast", action="store_true",
+                              help="Key the cache on path, size and mtime instead of file content")
+    parser_batch.add_argument("--cache-size", type=float, default=1.0, help="Cache size bound in GiB")
+
+    # JIT warmup
+    parser_warmup = subparsers.add_parser("warmup", help="Pre-compile the numba kernels into the on-disk cache")
+    parser_warmup.add_argument("--dtypes", nargs="+", default=None, help="Pixel dtypes to compile for")
 
     args = parser.parse_args()
 
     if args.command == "single":
-        result = boxcount_from_file(args.file, mode=args.mode, hilbert=args.hilbert)
+        if args.color and args.mode != "spatial":
+            parser_single.error("--color requires --mode spatial")
+        # One ScaleSpace answers both the box count and the fractal dimension,
+        # so the file is loaded and counted once.
+        if args.color:
+            image = load_file_as_ndarray(args.file, hilbert=args.hilbert, curve=args.curve, color=True)
+            result = boxcount_from_color(image, args.color)
+            space = ScaleSpace(gray_from_color(image))
+        else:
+            space = ScaleSpace.from_file(args.file, hilbert=args.hilbert, curve=args.curve)
+            result = space.spatial(0) if args.mode == "spatial" else space.single()
         print(f"Result for file {args.file}:")
         print(result)
-        fd = fractal_dimension(args.file, hilbert=args.hilbert)
+        fd = space.fractal_dimension()
         print(f"Fractal dimension: {fd:.3f}")
 
     elif args.command == "batch":
+        # Check before any file is processed: JSON Lines hold scalar results only.
+        if args.output and output_format(args.output, args.format) == "jsonl" and args.mode != "single":
+            parser_batch.error("JSON Lines output requires --mode single; write spatial maps to a directory")
         files = glob.glob(os.path.join(args.folder, args.pattern))
-        results = {}
+        cache = None
+        if args.cache:
+            cache = ResultCache(args.cache, max_bytes=int(args.cache_size * 2**30), fast=args.cache_fast)
+        iterator = _iter_results(files, mode=args.mode, hilbert=args.hilbert, curve=args.curve, jobs=args.jobs,
+                                 cache=cache)
         if tqdm:
-            iterator = tqdm(files, desc="Processing files")
+            iterator = tqdm(iterator, total=len(files), desc="Processing files")
+        if args.output:
+            with open_writer(args.output, args.format) as writer:
+                for path, res in iterator:
+                    writer.write(path, res)
+            print(f"Wrote results for {len(files)} files to {args.output}")
         else:
-            iterator = files
-        for file in iterator:
-            try:
-                res = boxcount_from_file(file, mode=args.mode, hilbert=args.hilbert)
-                results[os.path.basename(file)] = res
-            except Exception as e:
-                results[os.path.basename(file)] = f"Error: {e}"
-        print("Batch processing results:")
-        for fname, res in results.items():
-            print(f"{fname}: {res}")
+            print("Batch processing results:")
+            for path, res in iterator:
+                print(f"{os.path.basename(path)}: {res}")
+    elif args.command == "warmup":
+        compile_times = warmup(args.dtypes)
+        for name, seconds in compile_times.items():
+            print(f"{name}: {seconds:.3f} s")
+        print(f"Total compile time: {sum(compile_times.values()):.3f} s")
     else:
         parser.print_help()
 
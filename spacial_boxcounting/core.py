@@ -1,10 +1,17 @@
+import os
 import numpy as np
-from numba import jit
+from contextlib import contextmanager
+from numba import jit, prange, get_num_threads, set_num_threads, types, from_dtype, config as numba_config
+from numba.extending import overload
 import time
 import linecache
 import sys
-import matplotlib.pyplot as plt
-from PIL import Image
+
+# Compiled kernels are cached on disk (cache=True). numba keeps them in
+# __pycache__ or NUMBA_CACHE_DIR; SPACIAL_BOXCOUNTING_CACHE_DIR overrides both
+# and has to be set before this module is imported.
+if os.environ.get('SPACIAL_BOXCOUNTING_CACHE_DIR'):
+    numba_config.CACHE_DIR = os.environ['SPACIAL_BOXCOUNTING_CACHE_DIR']
 
 
 def PrintException():
@@ -20,99 +27,1087 @@ def PrintException():
 
 def show_np_array_as_image(np2ddArray, title, colormap):
     """Display a numpy 2D array as an image."""
+    import matplotlib.pyplot as plt
     plt.figure()
     plt.imshow(np2ddArray, interpolation='none', cmap=colormap)
     plt.title(title)
     plt.show(block=False)
 
-@jit(nopython=True)
+@jit(nopython=True, nogil=True, cache=True)
+def _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, Max_Num_Boxes):
+    """Lacunarity from the occupied bin count and the sum and sum of squares of the bin counts."""
+    # Same population as Z_boxcount: a leading 0.0, one entry per occupied bin
+    # and the empty bins up to MaxValue / boxsize.
+    Num_empty_Boxes = max(Max_Num_Boxes - counted_Boxes, 0)
+    NumEntries = 1 + counted_Boxes + Num_empty_Boxes
+    mean = NumPixels / NumEntries
+    SquaredDeviation = max(SumSquares - NumPixels * mean, 0.0)
+    standardDeviation = np.sqrt(SquaredDeviation / NumEntries)
+    return (standardDeviation / mean) ** 2
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _box_shift(boxsize):
+    """Return log2(boxsize) for power-of-two box sizes and -1 for any other size."""
+    if boxsize <= 0 or boxsize & (boxsize - 1):
+        return -1
+    shift = 0
+    while (1 << shift) < boxsize:
+        shift += 1
+    return shift
+
+
+# Bin index helpers. The plain Python bodies are the general float path (also
+# used when the JIT is disabled); the overloads let numba pick a specialised
+# body per input dtype at compile time, so integer images never go through
+# float division.
+
+def _bin_index(value, boxsize, shift):
+    """Return floor(value / boxsize); shift is _box_shift(boxsize)."""
+    return int(np.floor(value / boxsize))
+
+
+@overload(_bin_index)
+def _bin_index_overload(value, boxsize, shift):
+    if isinstance(value, types.Integer):
+        def impl(value, boxsize, shift):
+            if shift >= 0:
+                return np.int64(value) >> shift
+            return np.int64(value) // boxsize
+        return impl
+    def impl(value, boxsize, shift):
+        return int(np.floor(value / boxsize))
+    return impl
+
+
+def _box_indexes(GlidingBox, boxsize, shift):
+    """Return floor(GlidingBox / boxsize) as a flat array."""
+    return np.floor(GlidingBox / boxsize).ravel()
+
+
+@overload(_box_indexes)
+def _box_indexes_overload(GlidingBox, boxsize, shift):
+    if isinstance(GlidingBox.dtype, types.Integer):
+        def impl(GlidingBox, boxsize, shift):
+            Boxindexes = np.empty(GlidingBox.size, dtype=np.int64)
+            i = 0
+            for value in GlidingBox.flat:
+                Boxindexes[i] = _bin_index(value, boxsize, shift)
+                i += 1
+            return Boxindexes
+        return impl
+    def impl(GlidingBox, boxsize, shift):
+        return np.floor(GlidingBox / boxsize).ravel()
+    return impl
+
+
+def _unsigned_max(npArray):
+    """Return (True, dtype max) for uint8/uint16 arrays and (False, 0) otherwise."""
+    if npArray.dtype in (np.uint8, np.uint16):
+        return True, int(np.iinfo(npArray.dtype).max)
+    return False, 0
+
+
+@overload(_unsigned_max)
+def _unsigned_max_overload(npArray):
+    if npArray.dtype in (types.uint8, types.uint16):
+        dtype_max = 255 if npArray.dtype == types.uint8 else 65535
+        def impl(npArray):
+            return True, dtype_max
+        return impl
+    def impl(npArray):
+        return False, 0
+    return impl
+
+
+@jit(nopython=True, nogil=True, cache=True)
 def Z_boxcount(GlidingBox, boxsize, MaxValue):
     """Compute the box count and lacunarity for a given gliding box."""
-    continualIndexes = GlidingBox / boxsize
-    Boxindexes = np.floor(continualIndexes)
-    unique_Boxes = np.unique(Boxindexes)
-    counted_Boxes = len(unique_Boxes)
-    InitalEntry = [0.0]
-    SumPixInBox = np.array(InitalEntry)
-    for unique_BoxIndex in unique_Boxes:
-        ElementsCountedTRUTHTABLE = Boxindexes == unique_BoxIndex
-        ElementsCounted = np.sum(ElementsCountedTRUTHTABLE)
-        SumPixInBox = np.append(SumPixInBox, ElementsCounted)
-    Max_Num_Boxes = int(MaxValue / boxsize)
-    Num_empty_Boxes = Max_Num_Boxes - counted_Boxes
-    if Num_empty_Boxes >= 1:
-        EmptyBoxes = np.zeros(Num_empty_Boxes)
-        SumPixInBox = np.append(SumPixInBox, EmptyBoxes)
-    mean = np.mean(SumPixInBox)
-    standardDeviation = np.std(SumPixInBox)
-    Lacunarity = np.power(standardDeviation / mean, 2)
+    Boxindexes = np.sort(_box_indexes(GlidingBox, boxsize, _box_shift(boxsize)))
+    NumPixels = Boxindexes.size
+    # Runs of equal sorted indexes are the occupied boxes; only their count and
+    # the sum of squared run lengths are needed for the lacunarity.
+    counted_Boxes = 0
+    SumSquares = 0
+    RunStart = 0
+    for i in range(1, NumPixels + 1):
+        if i == NumPixels or Boxindexes[i] != Boxindexes[RunStart]:
+            ElementsCounted = i - RunStart
+            counted_Boxes += 1
+            SumSquares += ElementsCounted * ElementsCounted
+            RunStart = i
+    Lacunarity = _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, int(MaxValue / boxsize))
     return counted_Boxes, Lacunarity
 
-@jit(nopython=True)
+@jit(nopython=True, nogil=True, cache=True)
+def _bin_bounds(npArray, boxsize, MaxValue):
+    """Return the lowest bin index and the histogram length covering all values of a 2D array."""
+    lo = 0
+    hi = int(MaxValue / boxsize) - 1
+    shift = _box_shift(boxsize)
+    # 8- and 16-bit unsigned images need no scan, their range is known.
+    known, dtype_max = _unsigned_max(npArray)
+    if known:
+        return lo, max(hi, _bin_index(dtype_max, boxsize, shift)) + 1
+    YRange, XRange = npArray.shape
+    for y in range(YRange):
+        for x in range(XRange):
+            b = _bin_index(npArray[y, x], boxsize, shift)
+            if b < lo:
+                lo = b
+            if b > hi:
+                hi = b
+    return lo, hi - lo + 1
+
+
+# Histograms up to this many bins (or a few times MaxValue / boxsize) are always
+# cheap; wider value ranges, e.g. float data far beyond MaxValue, are counted by
+# sorting instead, which needs no memory proportional to the range.
+HIST_MAX_BINS = 1 << 16
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _histogram_fits(nbins, Max_Num_Boxes):
+    """Return True if a bin histogram of nbins bins is small enough to allocate."""
+    return nbins <= max(HIST_MAX_BINS, 4 * Max_Num_Boxes)
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _touched_lacunarity(hist, touched, counted_Boxes, NumPixels, Max_Num_Boxes):
+    """Lacunarity of the occupied bins listed in touched; resets those bins of hist to zero."""
+    SumSquares = 0
+    for i in range(counted_Boxes):
+        b = touched[i]
+        SumSquares += np.int64(hist[b]) * hist[b]
+        hist[b] = 0
+    return _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, Max_Num_Boxes)
+
+@jit(nopython=True, nogil=True, cache=True)
+def _histogram_boxcount(GlidingBox, boxsize, MaxValue, hist, touched, lo):
+    """Count occupied bins and lacunarity of a 2D box with a reusable bin histogram.
+
+    hist and touched are scratch buffers from _bin_bounds; hist must be all zero
+    and is left all zero on return, so one pair can serve every box of an image.
+    """
+    YRange, XRange = GlidingBox.shape
+    shift = _box_shift(boxsize)
+    counted_Boxes = 0
+    for y in range(YRange):
+        for x in range(XRange):
+            b = _bin_index(GlidingBox[y, x], boxsize, shift) - lo
+            if hist[b] == 0:
+                touched[counted_Boxes] = b
+                counted_Boxes += 1
+            hist[b] += 1
+    Lacunarity = _touched_lacunarity(hist, touched, counted_Boxes, YRange * XRange, int(MaxValue / boxsize))
+    return counted_Boxes, Lacunarity
+
+@jit(nopython=True, nogil=True, cache=True)
+def Z_boxcount_hist(GlidingBox, boxsize, MaxValue):
+    """Compute the box count and lacunarity of a 2D box from a single-pass bin histogram.
+
+    Gives the same results as Z_boxcount without sorting the box or allocating per bin;
+    values spread far beyond MaxValue go through the sort-based Z_boxcount.
+    """
+    lo, nbins = _bin_bounds(GlidingBox, boxsize, MaxValue)
+    if not _histogram_fits(nbins, int(MaxValue / boxsize)):
+        return Z_boxcount(GlidingBox, boxsize, MaxValue)
+    hist = np.zeros(nbins, dtype=np.int32)
+    touched = np.zeros(nbins, dtype=np.int32)
+    return _histogram_boxcount(GlidingBox, boxsize, MaxValue, hist, touched, lo)
+
+@jit(nopython=True, nogil=True, cache=True)
 def spacialBoxcount(npOutputFile, iteration, MaxValue):
     """Compute the spatial box count ratio and lacunarity for an image array."""
     Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
     boxsize = Boxsize[iteration]
-    BoxBoundriesX = np.array([0, boxsize])
-    BoxBoundriesY = np.array([0, boxsize])
     YRange, XRange = npOutputFile.shape
     maxIndexY = int(YRange / boxsize) + 1
     maxIndexX = int(XRange / boxsize) + 1
     BoxCountR_map = np.zeros((maxIndexY, maxIndexX))
     spa_Lac_map = np.zeros((maxIndexY, maxIndexX))
-    while BoxBoundriesY[1] <= YRange:
-        while BoxBoundriesX[1] <= XRange:
-            indexY = int(BoxBoundriesY[0] / boxsize)
-            indexX = int(BoxBoundriesX[0] / boxsize)
-            GlidingBox = npOutputFile[BoxBoundriesY[0]:BoxBoundriesY[1], BoxBoundriesX[0]:BoxBoundriesX[1]]
-            counted_Boxes, Lacunarity = Z_boxcount(GlidingBox, boxsize, MaxValue)
-            Max_Num_Boxes = int(MaxValue / boxsize)
-            counted_Box_Ratio = counted_Boxes / Max_Num_Boxes
-            BoxCountR_map[indexY, indexX] = counted_Box_Ratio
+    Max_Num_Boxes = int(MaxValue / boxsize)
+    lo, nbins = _bin_bounds(npOutputFile, boxsize, MaxValue)
+    # Too wide a value range: sort each box (Z_boxcount) instead of a histogram.
+    sparse = not _histogram_fits(nbins, Max_Num_Boxes)
+    if sparse:
+        nbins = 0
+    hist = np.zeros(nbins, dtype=np.int32)
+    touched = np.zeros(nbins, dtype=np.int32)
+    for indexY in range(YRange // boxsize):
+        for indexX in range(XRange // boxsize):
+            GlidingBox = npOutputFile[indexY * boxsize:(indexY + 1) * boxsize,
+                                      indexX * boxsize:(indexX + 1) * boxsize]
+            if sparse:
+                counted_Boxes, Lacunarity = Z_boxcount(GlidingBox, boxsize, MaxValue)
+            else:
+                counted_Boxes, Lacunarity = _histogram_boxcount(GlidingBox, boxsize, MaxValue, hist, touched, lo)
+            BoxCountR_map[indexY, indexX] = counted_Boxes / Max_Num_Boxes
+            spa_Lac_map[indexY, indexX] = Lacunarity
+    return [BoxCountR_map, spa_Lac_map]
+
+
+@contextmanager
+def _numba_threads(num_threads):
+    """Limit numba's parallel kernels to num_threads (capped at NUMBA_NUM_THREADS) inside the block."""
+    previous_threads = get_num_threads()
+    if num_threads is not None:
+        set_num_threads(max(1, min(int(num_threads), numba_config.NUMBA_NUM_THREADS)))
+    try:
+        yield
+    finally:
+        set_num_threads(previous_threads)
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _parallel_spacial_boxcount(npOutputFile, boxsize, MaxValue):
+    """spacialBoxcount for one box size with the tile rows split across threads."""
+    YRange, XRange = npOutputFile.shape
+    maxIndexY = int(YRange / boxsize) + 1
+    maxIndexX = int(XRange / boxsize) + 1
+    BoxCountR_map = np.zeros((maxIndexY, maxIndexX))
+    spa_Lac_map = np.zeros((maxIndexY, maxIndexX))
+    Max_Num_Boxes = int(MaxValue / boxsize)
+    lo, nbins = _bin_bounds(npOutputFile, boxsize, MaxValue)
+    # Too wide a value range: sort each box (Z_boxcount) instead of a histogram.
+    sparse = not _histogram_fits(nbins, Max_Num_Boxes)
+    if sparse:
+        nbins = 0
+    for indexY in prange(YRange // boxsize):
+        # Scratch histogram per tile row, so threads never share one.
+        hist = np.zeros(nbins, dtype=np.int32)
+        touched = np.zeros(nbins, dtype=np.int32)
+        for indexX in range(XRange // boxsize):
+            GlidingBox = npOutputFile[indexY * boxsize:(indexY + 1) * boxsize,
+                                      indexX * boxsize:(indexX + 1) * boxsize]
+            if sparse:
+                counted_Boxes, Lacunarity = Z_boxcount(GlidingBox, boxsize, MaxValue)
+            else:
+                counted_Boxes, Lacunarity = _histogram_boxcount(GlidingBox, boxsize, MaxValue, hist, touched, lo)
+            BoxCountR_map[indexY, indexX] = counted_Boxes / Max_Num_Boxes
             spa_Lac_map[indexY, indexX] = Lacunarity
-            BoxBoundriesX[0] += boxsize
-            BoxBoundriesX[1] += boxsize
-        BoxBoundriesX[0] = 0
-        BoxBoundriesX[1] = boxsize
-        BoxBoundriesY[0] += boxsize
-        BoxBoundriesY[1] += boxsize
+    return BoxCountR_map, spa_Lac_map
+
+
+def spacialBoxcount_parallel(npOutputFile, iteration, MaxValue, num_threads=None):
+    """Compute the spatial box count ratio and lacunarity with tile rows spread over cores.
+
+    Parameters:
+        npOutputFile (np.ndarray): 2D input array.
+        iteration (int): Index into the box sizes [2, 4, ..., 1024].
+        MaxValue (int): Maximum value, 256 for 8-bit data.
+        num_threads (int): Number of threads to use, defaults to all numba threads and
+            is capped at NUMBA_NUM_THREADS.
+
+    Returns:
+        list: [BoxCountR_map, spa_Lac_map], equal to spacialBoxcount(npOutputFile, iteration, MaxValue).
+    """
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    with _numba_threads(num_threads):
+        BoxCountR_map, spa_Lac_map = _parallel_spacial_boxcount(npOutputFile, Boxsize[iteration], MaxValue)
     return [BoxCountR_map, spa_Lac_map]
 
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _stack_spacial_boxcount(stack, iterations, MaxValue, out, NumBlocks):
+    """Fill out[n, s] with the [BoxCountR_map, spa_Lac_map] of stack[n] at iterations[s], blocks of images split across threads."""
+    N, YRange, XRange = stack.shape
+    maxiteration = 1 + np.max(iterations)
+    # Bins over the whole stack, so one set of scratch buffers per block serves every image.
+    lo0, nbins0 = _bin_bounds(stack.reshape((N * YRange, XRange)), 2, MaxValue)
+    # Too wide a value range for the scratch histogram: spacialBoxcount per image and scale.
+    sparse = not _histogram_fits(nbins0, int(MaxValue / 2))
+    if sparse:
+        nbins0 = 0
+    # First slot of every iteration; levels that are not requested go to scratch maps.
+    slots = np.full(maxiteration, -1, dtype=np.int64)
+    for s in range(len(iterations) - 1, -1, -1):
+        slots[iterations[s]] = s
+    for block in prange(NumBlocks):
+        scratch = _pyramid_scratch(YRange, XRange, maxiteration, nbins0)
+        unused = np.empty((2, YRange // 2 + 1, XRange // 2 + 1))
+        for n in range(block * N // NumBlocks, (block + 1) * N // NumBlocks):
+            if sparse:
+                for s in range(len(iterations)):
+                    level = spacialBoxcount(stack[n], iterations[s], MaxValue)
+                    h, w = level[0].shape
+                    out[n, s] = 0.0
+                    out[n, s, 0, :h, :w] = level[0]
+                    out[n, s, 1, :h, :w] = level[1]
+                continue
+            # The pyramid writes the full tiles, only the rest of every slot is zeroed.
+            for s in range(len(iterations)):
+                boxsize = 2 << iterations[s]
+                out[n, s, :, YRange // boxsize:] = 0.0
+                out[n, s, :, :YRange // boxsize, XRange // boxsize:] = 0.0
+            # One pyramid pass per image writes every requested scale straight into out[n].
+            maps = []
+            for iteration in range(maxiteration):
+                boxsize = 2 << iteration
+                h, w = YRange // boxsize + 1, XRange // boxsize + 1
+                if slots[iteration] >= 0:
+                    maps.append(out[n, slots[iteration], 0, :h, :w])
+                    maps.append(out[n, slots[iteration], 1, :h, :w])
+                else:
+                    maps.append(unused[0, :h, :w])
+                    maps.append(unused[1, :h, :w])
+            _pyramid_levels(stack[n], maxiteration, MaxValue, maps, lo0, nbins0, scratch)
+            for s in range(len(iterations)):
+                if slots[iterations[s]] != s:
+                    out[n, s] = out[n, slots[iterations[s]]]
+
+
+def spacialBoxcount_stack(stack, iterations, MaxValue, num_threads=None, out=None):
+    """Compute the spatial maps of N same-shaped images for several scales in one compiled call.
+
+    The images are spread over the threads and each image runs the single-pass
+    pyramid of spacialBoxcount_pyramid, so a dataset of small chunks costs one
+    call instead of one per chunk and scale. Values spread far beyond MaxValue
+    run spacialBoxcount per image and scale instead.
+
+    Parameters:
+        stack (np.ndarray): (N, Y, X) array of images.
+        iterations (iterable): Indices into the box sizes [2, 4, ..., 1024].
+        MaxValue (int): Maximum value, 256 for 8-bit data.
+        num_threads (int): Number of threads to use, defaults to all numba threads.
+        out (np.ndarray): Preallocated float64 result, C-contiguous, of the shape below.
+
+    Returns:
+        np.ndarray: (N, S, 2, h, w) array with h, w = Y // b + 1, X // b + 1 for the smallest
+            box size b. out[n, s] holds [BoxCountR_map, spa_Lac_map] =
+            spacialBoxcount(stack[n], iterations[s], MaxValue) in its top-left corner,
+            the rest of a coarser scale stays zero.
+    """
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    stack = np.ascontiguousarray(stack)
+    if stack.ndim != 3:
+        raise ValueError("stack must have shape (N, Y, X)")
+    iterations = np.array(list(iterations), dtype=np.int64)
+    if iterations.size == 0:
+        raise ValueError("at least one iteration is required")
+    boxsize = Boxsize[iterations.min()]
+    N, YRange, XRange = stack.shape
+    shape = (N, iterations.size, 2, YRange // boxsize + 1, XRange // boxsize + 1)
+    if out is None:
+        out = np.empty(shape)
+    elif out.shape != shape or out.dtype != np.float64 or not out.flags.c_contiguous:
+        raise ValueError("out must be a C-contiguous float64 array of shape %s" % (shape,))
+    with _numba_threads(num_threads):
+        _stack_spacial_boxcount(stack, iterations, MaxValue, out, max(1, min(N, get_num_threads())))
+    return out
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _channel_spacial_boxcount(image, boxsize, MaxValue):
+    """spacialBoxcount of every channel of a (C, Y, X) image, all channels of a pixel read together."""
+    C, YRange, XRange = image.shape
+    out = np.zeros((C, 2, int(YRange / boxsize) + 1, int(XRange / boxsize) + 1))
+    Max_Num_Boxes = int(MaxValue / boxsize)
+    shift = _box_shift(boxsize)
+    los = np.zeros(C, dtype=np.int64)
+    nbins = 1
+    for c in range(C):
+        lo, n = _bin_bounds(image[c], boxsize, MaxValue)
+        los[c] = lo
+        nbins = max(nbins, n)
+    # Too wide a value range: sort each box of each channel (Z_boxcount) instead.
+    sparse = not _histogram_fits(nbins, Max_Num_Boxes)
+    if sparse:
+        nbins = 0
+    for indexY in prange(YRange // boxsize):
+        hist = np.zeros((C, nbins), dtype=np.int32)
+        touched = np.zeros((C, nbins), dtype=np.int32)
+        counted = np.zeros(C, dtype=np.int64)
+        for indexX in range(XRange // boxsize):
+            if sparse:
+                for c in range(C):
+                    counted_Boxes, Lacunarity = Z_boxcount(
+                        image[c, indexY * boxsize:(indexY + 1) * boxsize, indexX * boxsize:(indexX + 1) * boxsize],
+                        boxsize, MaxValue)
+                    out[c, 0, indexY, indexX] = counted_Boxes / Max_Num_Boxes
+                    out[c, 1, indexY, indexX] = Lacunarity
+                continue
+            for y in range(indexY * boxsize, (indexY + 1) * boxsize):
+                for x in range(indexX * boxsize, (indexX + 1) * boxsize):
+                    # Innermost over channels, so interleaved (Y, X, C) memory is read in order.
+                    for c in range(C):
+                        b = _bin_index(image[c, y, x], boxsize, shift) - los[c]
+                        if hist[c, b] == 0:
+                            touched[c, counted[c]] = b
+                            counted[c] += 1
+                        hist[c, b] += 1
+            for c in range(C):
+                out[c, 0, indexY, indexX] = counted[c] / Max_Num_Boxes
+                out[c, 1, indexY, indexX] = _touched_lacunarity(hist[c], touched[c], counted[c], boxsize * boxsize,
+                                                                Max_Num_Boxes)
+                counted[c] = 0
+    return out
+
+
+def spacialBoxcount_channels(image, iteration, MaxValue, num_threads=None):
+    """Compute the spatial maps of every channel of a multi-channel image in one pass.
+
+    Parameters:
+        image (np.ndarray): (C, Y, X) array; any strides, e.g. rgb.transpose(2, 0, 1) of
+            an interleaved (Y, X, C) image, which is read in place without a copy.
+        iteration (int): Index into the box sizes [2, 4, ..., 1024].
+        MaxValue (int): Maximum value per channel, 256 for 8-bit data.
+        num_threads (int): Number of threads to use, defaults to all numba threads.
+
+    Returns:
+        np.ndarray: (C, 2, Y // boxsize + 1, X // boxsize + 1) array; [c] holds
+            [BoxCountR_map, spa_Lac_map] = spacialBoxcount(image[c], iteration, MaxValue).
+    """
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    if image.ndim != 3:
+        raise ValueError("image must have shape (C, Y, X)")
+    with _numba_threads(num_threads):
+        return _channel_spacial_boxcount(image, Boxsize[iteration], MaxValue)
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _joint_spacial_boxcount(image, boxsize, MaxValue, NumBlocks):
+    """Box count ratio and lacunarity of the occupied cells of the C-dimensional value cube per spatial box."""
+    C, YRange, XRange = image.shape
+    BoxCountR_map = np.zeros((int(YRange / boxsize) + 1, int(XRange / boxsize) + 1))
+    spa_Lac_map = np.zeros((int(YRange / boxsize) + 1, int(XRange / boxsize) + 1))
+    Max_Num_Boxes = int(MaxValue / boxsize) ** C
+    shift = _box_shift(boxsize)
+    # A value cell is numbered by its per-channel bins, channel 0 most significant.
+    los = np.zeros(C, dtype=np.int64)
+    sizes = np.zeros(C, dtype=np.int64)
+    ncells = 1
+    for c in range(C):
+        lo, n = _bin_bounds(image[c], boxsize, MaxValue)
+        los[c] = lo
+        sizes[c] = n
+        ncells *= n
+    nY = YRange // boxsize
+    # The cell histogram can be large (128**3 bins for 8-bit RGB and boxsize 2), so
+    # one is allocated per block of tile rows, a few blocks per thread, not per row.
+    NumBlocks = min(nY, NumBlocks)
+    for block in prange(NumBlocks):
+        hist = np.zeros(ncells, dtype=np.int32)
+        touched = np.zeros(min(ncells, boxsize * boxsize), dtype=np.int64)
+        for indexY in range(block * nY // NumBlocks, (block + 1) * nY // NumBlocks):
+            for indexX in range(XRange // boxsize):
+                counted_Boxes = 0
+                for y in range(indexY * boxsize, (indexY + 1) * boxsize):
+                    for x in range(indexX * boxsize, (indexX + 1) * boxsize):
+                        b = 0
+                        for c in range(C):
+                            b = b * sizes[c] + _bin_index(image[c, y, x], boxsize, shift) - los[c]
+                        if hist[b] == 0:
+                            touched[counted_Boxes] = b
+                            counted_Boxes += 1
+                        hist[b] += 1
+                BoxCountR_map[indexY, indexX] = counted_Boxes / Max_Num_Boxes
+                spa_Lac_map[indexY, indexX] = _touched_lacunarity(hist, touched, counted_Boxes, boxsize * boxsize,
+                                                                  Max_Num_Boxes)
+    return BoxCountR_map, spa_Lac_map
+
+
+def spacialBoxcount_joint(image, iteration, MaxValue, num_threads=None):
+    """Compute spatial maps counting the occupied cells of the joint value cube, e.g. RGB.
+
+    Every spatial box of side boxsize is counted in the C-dimensional value space,
+    divided into cells of side boxsize; the ratio is the number of occupied cells
+    over (MaxValue / boxsize) ** C. For C = 1 this is spacialBoxcount.
+
+    Parameters:
+        image (np.ndarray): (C, Y, X) array of channels with values in [0, MaxValue),
+            any strides as in spacialBoxcount_channels.
+        iteration (int): Index into the box sizes [2, 4, ..., 1024].
+        MaxValue (int): Maximum value per channel, 256 for 8-bit data.
+        num_threads (int): Number of threads to use, defaults to all numba threads.
+
+    Returns:
+        list: [BoxCountR_map, spa_Lac_map] of shape (Y // boxsize + 1, X // boxsize + 1).
+
+    Raises:
+        ValueError: If a value lies outside [0, MaxValue), the cube would not be bounded.
+    """
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    if image.ndim != 3:
+        raise ValueError("image must have shape (C, Y, X)")
+    # 8-bit images need no scan, their range is known.
+    if not (image.dtype == np.uint8 and MaxValue >= 256) and image.size \
+            and (image.min() < 0 or image.max() >= MaxValue):
+        raise ValueError("joint mode requires values in [0, MaxValue)")
+    with _numba_threads(num_threads):
+        BoxCountR_map, spa_Lac_map = _joint_spacial_boxcount(image, Boxsize[iteration], MaxValue, 4 * get_num_threads())
+    return [BoxCountR_map, spa_Lac_map]
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _update_box(npOutputFile, Y0, Y1, X0, X1, boxsize, hist, lo, step, state):
+    """Add (step=1) or remove (step=-1) the pixels of a window part from a rolling histogram.
+
+    state holds [counted_Boxes, SumSquares] and is updated in place.
+    """
+    shift = _box_shift(boxsize)
+    for y in range(Y0, Y1):
+        for x in range(X0, X1):
+            b = _bin_index(npOutputFile[y, x], boxsize, shift) - lo
+            c = hist[b]
+            if step > 0:
+                if c == 0:
+                    state[0] += 1
+                state[1] += 2 * c + 1
+            else:
+                if c == 1:
+                    state[0] -= 1
+                state[1] -= 2 * c - 1
+            hist[b] = c + step
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _sliding_spacial_boxcount(npOutputFile, boxsize, MaxValue, stride):
+    """Sliding-window box count ratio and lacunarity with one rolling histogram per window row."""
+    YRange, XRange = npOutputFile.shape
+    BoxCountR_map = np.zeros((YRange // stride + 1, XRange // stride + 1))
+    spa_Lac_map = np.zeros((YRange // stride + 1, XRange // stride + 1))
+    if YRange < boxsize or XRange < boxsize:
+        return BoxCountR_map, spa_Lac_map
+    nY = (YRange - boxsize) // stride + 1
+    nX = (XRange - boxsize) // stride + 1
+    Max_Num_Boxes = int(MaxValue / boxsize)
+    NumPixels = boxsize * boxsize
+    lo, nbins = _bin_bounds(npOutputFile, boxsize, MaxValue)
+    if not _histogram_fits(nbins, Max_Num_Boxes):
+        # Too wide a value range for a rolling histogram: sort every window (Z_boxcount).
+        for indexY in prange(nY):
+            Y0 = indexY * stride
+            for indexX in range(nX):
+                X0 = indexX * stride
+                counted_Boxes, Lacunarity = Z_boxcount(npOutputFile[Y0:Y0 + boxsize, X0:X0 + boxsize], boxsize, MaxValue)
+                BoxCountR_map[indexY, indexX] = counted_Boxes / Max_Num_Boxes
+                spa_Lac_map[indexY, indexX] = Lacunarity
+        return BoxCountR_map, spa_Lac_map
+    for indexY in prange(nY):
+        Y0 = indexY * stride
+        hist = np.zeros(nbins, dtype=np.int32)
+        state = np.zeros(2, dtype=np.int64)
+        _update_box(npOutputFile, Y0, Y0 + boxsize, 0, boxsize, boxsize, hist, lo, 1, state)
+        BoxCountR_map[indexY, 0] = state[0] / Max_Num_Boxes
+        spa_Lac_map[indexY, 0] = _moment_lacunarity(state[0], NumPixels, state[1], Max_Num_Boxes)
+        for indexX in range(1, nX):
+            X0 = indexX * stride
+            PrevX0 = X0 - stride
+            # Drop the columns leaving the window and add the ones entering it;
+            # for stride >= boxsize these are the whole old and new windows.
+            _update_box(npOutputFile, Y0, Y0 + boxsize, PrevX0, min(PrevX0 + boxsize, X0), boxsize, hist, lo, -1, state)
+            _update_box(npOutputFile, Y0, Y0 + boxsize, max(PrevX0 + boxsize, X0), X0 + boxsize, boxsize, hist, lo, 1, state)
+            BoxCountR_map[indexY, indexX] = state[0] / Max_Num_Boxes
+            spa_Lac_map[indexY, indexX] = _moment_lacunarity(state[0], NumPixels, state[1], Max_Num_Boxes)
+    return BoxCountR_map, spa_Lac_map
+
+
+def spacialBoxcount_sliding(npOutputFile, iteration, MaxValue, stride=1, num_threads=None):
+    """Compute dense box count ratio and lacunarity maps with an overlapping gliding box.
+
+    The box moves by stride pixels in both directions; per window row a rolling
+    histogram adds the entering columns and removes the leaving ones, so each
+    step costs O(boxsize * stride) instead of O(boxsize**2). Values spread far
+    beyond MaxValue sort every window instead.
+
+    Parameters:
+        npOutputFile (np.ndarray): 2D input array.
+        iteration (int): Index into the box sizes [2, 4, ..., 1024].
+        MaxValue (int): Maximum value, 256 for 8-bit data.
+        stride (int): Step between windows in pixels, down to 1.
+        num_threads (int): Number of threads to use, defaults to all numba threads.
+
+    Returns:
+        list: [BoxCountR_map, spa_Lac_map] of shape (YRange // stride + 1, XRange // stride + 1).
+            Entry [i, j] belongs to the box whose top-left pixel is (i * stride, j * stride);
+            boxes that do not fit into the array stay zero. stride == boxsize gives the
+            spacialBoxcount result.
+    """
+    if stride < 1:
+        raise ValueError("stride must be a positive integer")
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    with _numba_threads(num_threads):
+        BoxCountR_map, spa_Lac_map = _sliding_spacial_boxcount(npOutputFile, Boxsize[iteration], MaxValue, int(stride))
+    return [BoxCountR_map, spa_Lac_map]
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _pyramid_maps(npOutputFile, maxiteration, MaxValue):
+    """Return flat [BoxCountR_map, spa_Lac_map, ...] for iterations 0..maxiteration-1, see spacialBoxcount_pyramid."""
+    YRange, XRange = npOutputFile.shape
+    offsets = _pyramid_offsets(YRange, XRange, maxiteration)
+    return _pyramid_fill(npOutputFile, maxiteration, MaxValue, np.empty(offsets[-1]), offsets)
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _pyramid_offsets(YRange, XRange, maxiteration):
+    """Offsets of the maps of _pyramid_fill in its flat buffer, BoxCountR_map and spa_Lac_map per iteration."""
+    offsets = np.zeros(2 * maxiteration + 1, dtype=np.int64)
+    for iteration in range(maxiteration):
+        boxsize = 2 << iteration
+        size = (int(YRange / boxsize) + 1) * (int(XRange / boxsize) + 1)
+        offsets[2 * iteration + 1] = offsets[2 * iteration] + size
+        offsets[2 * iteration + 2] = offsets[2 * iteration + 1] + size
+    return offsets
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _pyramid_fill(npOutputFile, maxiteration, MaxValue, buffer, offsets):
+    """Fill the pyramid maps into views of one flat float buffer laid out by _pyramid_offsets and return the views."""
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    YRange, XRange = npOutputFile.shape
+    buffer[:] = 0
+    maps = []
+    for iteration in range(maxiteration):
+        boxsize = Boxsize[iteration]
+        shape = (int(YRange / boxsize) + 1, int(XRange / boxsize) + 1)
+        maps.append(buffer[offsets[2 * iteration]:offsets[2 * iteration + 1]].reshape(shape))
+        maps.append(buffer[offsets[2 * iteration + 1]:offsets[2 * iteration + 2]].reshape(shape))
+    lo0, nbins0 = _bin_bounds(npOutputFile, 2, MaxValue)
+    if not _histogram_fits(nbins0, int(MaxValue / 2)):
+        # Too wide a value range for the scratch histogram: every level on its own,
+        # spacialBoxcount sorts the boxes where it has to.
+        for iteration in range(maxiteration):
+            level = spacialBoxcount(npOutputFile, iteration, MaxValue)
+            maps[2 * iteration][:] = level[0]
+            maps[2 * iteration + 1][:] = level[1]
+        return maps
+    scratch = _pyramid_scratch(YRange, XRange, maxiteration, nbins0)
+    _pyramid_levels(npOutputFile, maxiteration, MaxValue, maps, lo0, nbins0, scratch)
+    return maps
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _pyramid_scratch(YRange, XRange, maxiteration, nbins0):
+    """Scratch buffers of _pyramid_levels for (YRange, XRange) arrays with bins of the range nbins0."""
+    # Level k keeps (band / 2**k) * (XRange / 2**k) tiles of at most 4**k bins,
+    # so every level fits into band * XRange entries; two sets alternate as
+    # child and parent level.
+    size = max(min(2 << (maxiteration - 1), YRange) * XRange, 1)
+    return (np.zeros(nbins0, dtype=np.int32), np.zeros(nbins0, dtype=np.int32),
+            np.empty(size, dtype=np.int64), np.empty(size, dtype=np.int64),
+            np.empty(size, dtype=np.int32), np.empty(size, dtype=np.int32),
+            np.empty(size // 4 + 1, dtype=np.int64), np.empty(size // 4 + 1, dtype=np.int64))
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _pyramid_levels(npOutputFile, maxiteration, MaxValue, maps, lo0, nbins0, scratch):
+    """Write the full tiles of every pyramid level into maps[2 * k], maps[2 * k + 1].
+
+    lo0 and nbins0 are the box size 2 bin bounds of the values (_bin_bounds);
+    scratch comes from _pyramid_scratch and can be reused for every array of
+    the same shape and value range.
+    """
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    YRange, XRange = npOutputFile.shape
+    # Level k bins are the level 0 bins shifted right by k, so one scratch
+    # histogram sized for level 0 covers every level.
+    hi0 = lo0 + nbins0 - 1
+    hist, touched, binsA, binsB, countsA, countsB, lengthsA, lengthsB = scratch
+    # Bands of the largest box height bound the pyramid memory to O(width * band).
+    BandHeight = Boxsize[maxiteration - 1]
+    for BandY in range(0, YRange, BandHeight):
+        BandRange = min(BandHeight, YRange - BandY)
+        # Level 0: per-tile occupied bins and their counts, read from the pixels.
+        nY, nX = BandRange // 2, XRange // 2
+        Max_Num_Boxes = int(MaxValue / 2)
+        capacity = min(4, nbins0)
+        bins = binsA[:nY * nX * capacity].reshape((nY, nX, capacity))
+        counts = countsA[:nY * nX * capacity].reshape((nY, nX, capacity))
+        lengths = lengthsA[:nY * nX].reshape((nY, nX))
+        BoxCountR_map, spa_Lac_map = maps[0], maps[1]
+        for tY in range(nY):
+            for tX in range(nX):
+                counted_Boxes = 0
+                for y in range(BandY + 2 * tY, BandY + 2 * tY + 2):
+                    for x in range(2 * tX, 2 * tX + 2):
+                        b = _bin_index(npOutputFile[y, x], 2, 1) - lo0
+                        if hist[b] == 0:
+                            touched[counted_Boxes] = b
+                            counted_Boxes += 1
+                        hist[b] += 1
+                for i in range(counted_Boxes):
+                    bins[tY, tX, i] = touched[i] + lo0
+                    counts[tY, tX, i] = hist[touched[i]]
+                lengths[tY, tX] = counted_Boxes
+                BoxCountR_map[BandY // 2 + tY, tX] = counted_Boxes / Max_Num_Boxes
+                spa_Lac_map[BandY // 2 + tY, tX] = _touched_lacunarity(hist, touched, counted_Boxes, 4, Max_Num_Boxes)
+        # Level k: merge the four child tiles and fold their bins pairwise.
+        for iteration in range(1, maxiteration):
+            boxsize = Boxsize[iteration]
+            nY, nX = BandRange // boxsize, XRange // boxsize
+            if nY == 0 or nX == 0:
+                break
+            lo = lo0 >> iteration
+            hi = max(int(MaxValue / boxsize) - 1, hi0 >> iteration)
+            Max_Num_Boxes = int(MaxValue / boxsize)
+            capacity = min(boxsize * boxsize, hi - lo + 1)
+            childBins, childCounts, childLengths = bins, counts, lengths
+            if iteration % 2:
+                bins = binsB[:nY * nX * capacity].reshape((nY, nX, capacity))
+                counts = countsB[:nY * nX * capacity].reshape((nY, nX, capacity))
+                lengths = lengthsB[:nY * nX].reshape((nY, nX))
+            else:
+                bins = binsA[:nY * nX * capacity].reshape((nY, nX, capacity))
+                counts = countsA[:nY * nX * capacity].reshape((nY, nX, capacity))
+                lengths = lengthsA[:nY * nX].reshape((nY, nX))
+            BoxCountR_map, spa_Lac_map = maps[2 * iteration], maps[2 * iteration + 1]
+            for tY in range(nY):
+                for tX in range(nX):
+                    counted_Boxes = 0
+                    for cY in range(2 * tY, 2 * tY + 2):
+                        for cX in range(2 * tX, 2 * tX + 2):
+                            for e in range(childLengths[cY, cX]):
+                                b = (childBins[cY, cX, e] >> 1) - lo
+                                if hist[b] == 0:
+                                    touched[counted_Boxes] = b
+                                    counted_Boxes += 1
+                                hist[b] += childCounts[cY, cX, e]
+                    for i in range(counted_Boxes):
+                        bins[tY, tX, i] = touched[i] + lo
+                        counts[tY, tX, i] = hist[touched[i]]
+                    lengths[tY, tX] = counted_Boxes
+                    BoxCountR_map[BandY // boxsize + tY, tX] = counted_Boxes / Max_Num_Boxes
+                    spa_Lac_map[BandY // boxsize + tY, tX] = _touched_lacunarity(
+                        hist, touched, counted_Boxes, boxsize * boxsize, Max_Num_Boxes)
+
+
+def spacialBoxcount_pyramid(npOutputFile, maxiteration, MaxValue):
+    """Compute spatial box count ratio and lacunarity maps for several scales in one pass.
+
+    The pixels are read once to build the 2x2 bin histograms; each coarser level
+    merges four child histograms and folds their bins pairwise, so all scales cost
+    about as much as the finest one. Values spread far beyond MaxValue are counted
+    level by level with spacialBoxcount instead.
+
+    Parameters:
+        npOutputFile (np.ndarray): 2D input array.
+        maxiteration (int): Number of scales, i.e. box sizes Boxsize[0:maxiteration].
+        MaxValue (int): Maximum value, 256 for 8-bit data.
+
+    Returns:
+        list: One [BoxCountR_map, spa_Lac_map] per iteration, equal to spacialBoxcount(npOutputFile, iteration, MaxValue).
+    """
+    maps = _pyramid_maps(npOutputFile, maxiteration, MaxValue)
+    return [[maps[2 * i], maps[2 * i + 1]] for i in range(maxiteration)]
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def global_boxcount_pyramid(npArray, shifts, MaxValue):
+    """Compute global box counts and lacunarities for box sizes 2**shifts from one histogram.
+
+    The value histogram is built once with bins of the smallest box size; each
+    box size 2**s folds it by shifting the bin indices, which equals
+    floor(value / 2**s). Values spread far beyond MaxValue are sorted once
+    instead, and every box size counts the runs of the shifted sorted indices.
+
+    Returns:
+        tuple: (counts, lacunarities) arrays, one entry per shift, equal to Z_boxcount_hist(npArray, 2**s, MaxValue).
+    """
+    counts = np.zeros(len(shifts), dtype=np.int64)
+    lacunarities = np.zeros(len(shifts))
+    if len(shifts) == 0:
+        return counts, lacunarities
+    shift0 = np.min(shifts)
+    boxsize0 = 1 << shift0
+    lo0, nbins0 = _bin_bounds(npArray, boxsize0, MaxValue)
+    YRange, XRange = npArray.shape
+    NumPixels = YRange * XRange
+    if not _histogram_fits(nbins0, int(MaxValue / boxsize0)):
+        Boxindexes = np.empty(NumPixels, dtype=np.int64)
+        i = 0
+        for y in range(YRange):
+            for x in range(XRange):
+                Boxindexes[i] = _bin_index(npArray[y, x], boxsize0, shift0)
+                i += 1
+        Boxindexes.sort()
+        for i in range(len(shifts)):
+            shift = shifts[i] - shift0
+            # Shifting keeps the indexes sorted, runs are the occupied boxes.
+            counted_Boxes = 0
+            SumSquares = 0
+            RunStart = 0
+            for j in range(1, NumPixels + 1):
+                if j == NumPixels or (Boxindexes[j] >> shift) != (Boxindexes[RunStart] >> shift):
+                    counted_Boxes += 1
+                    SumSquares += (j - RunStart) * (j - RunStart)
+                    RunStart = j
+            counts[i] = counted_Boxes
+            lacunarities[i] = _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, int(MaxValue / (1 << shifts[i])))
+        return counts, lacunarities
+    base = np.zeros(nbins0, dtype=np.int64)
+    for y in range(YRange):
+        for x in range(XRange):
+            base[_bin_index(npArray[y, x], boxsize0, shift0) - lo0] += 1
+    hist = np.zeros(nbins0, dtype=np.int64)
+    touched = np.zeros(nbins0, dtype=np.int64)
+    for i in range(len(shifts)):
+        shift = shifts[i] - shift0
+        boxsize = 1 << shifts[i]
+        lo = lo0 >> shift
+        counted_Boxes = 0
+        for b0 in range(nbins0):
+            if base[b0] == 0:
+                continue
+            b = ((b0 + lo0) >> shift) - lo
+            if hist[b] == 0:
+                touched[counted_Boxes] = b
+                counted_Boxes += 1
+            hist[b] += base[b0]
+        counts[i] = counted_Boxes
+        lacunarities[i] = _touched_lacunarity(hist, touched, counted_Boxes, NumPixels, int(MaxValue / boxsize))
+    return counts, lacunarities
+
+
+@jit(nopython=True, nogil=True, parallel=True, cache=True)
+def _ragged_global_boxcount(pixels, offsets, boxsizes, MaxValue, blocks):
+    """Global box counts and lacunarities of the patches pixels[offsets[i]:offsets[i + 1]], blocks of patches split across threads."""
+    NumPatches = len(offsets) - 1
+    counts = np.zeros((NumPatches, len(boxsizes)), dtype=np.int64)
+    lacunarities = np.full((NumPatches, len(boxsizes)), np.nan)
+    if len(boxsizes) == 0:
+        return counts, lacunarities
+    # Base bins of width g, the gcd of the box sizes: floor(value / boxsize) ==
+    # floor(floor(value / d) / (boxsize / d)) for any divisor d of boxsize, so every
+    # box size folds the bins of the previous one when it is a multiple of it, or
+    # else the base bins, instead of the pixels.
+    g = boxsizes[0]
+    for s in range(1, len(boxsizes)):
+        a, b = g, boxsizes[s]
+        while b:
+            a, b = b, a % b
+        g = a
+    shiftg = _box_shift(g)
+    # Over the whole buffer, so one scratch histogram per block serves every patch.
+    log, nbinsg = _bin_bounds(pixels.reshape((1, pixels.size)), g, MaxValue)
+    if not _histogram_fits(nbinsg, int(MaxValue / g)):
+        # Values spread far beyond MaxValue: sort the base bins of each patch once,
+        # every box size counts the runs of the divided sorted indexes.
+        for block in prange(len(blocks) - 1):
+            longest = 0
+            for patch in range(blocks[block], blocks[block + 1]):
+                longest = max(longest, offsets[patch + 1] - offsets[patch])
+            Boxindexes = np.empty(longest, dtype=np.int64)
+            for patch in range(blocks[block], blocks[block + 1]):
+                NumPixels = offsets[patch + 1] - offsets[patch]
+                if NumPixels == 0:
+                    continue
+                for j in range(NumPixels):
+                    Boxindexes[j] = _bin_index(pixels[offsets[patch] + j], g, shiftg)
+                Boxindexes[:NumPixels].sort()
+                for s in range(len(boxsizes)):
+                    factor = boxsizes[s] // g
+                    counted_Boxes = 0
+                    SumSquares = 0
+                    RunStart = 0
+                    for j in range(1, NumPixels + 1):
+                        if j == NumPixels or Boxindexes[j] // factor != Boxindexes[RunStart] // factor:
+                            counted_Boxes += 1
+                            SumSquares += (j - RunStart) * (j - RunStart)
+                            RunStart = j
+                    counts[patch, s] = counted_Boxes
+                    lacunarities[patch, s] = _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, int(MaxValue / boxsizes[s]))
+        return counts, lacunarities
+    for block in prange(len(blocks) - 1):
+        # Base bins of the patch, then the bins of the previous and the current box size.
+        base = np.zeros(nbinsg, dtype=np.int64)
+        touchedg = np.zeros(nbinsg, dtype=np.int64)
+        prev = np.zeros(nbinsg, dtype=np.int64)
+        prevTouched = np.zeros(nbinsg, dtype=np.int64)
+        hist = np.zeros(nbinsg, dtype=np.int64)
+        touched = np.zeros(nbinsg, dtype=np.int64)
+        for patch in range(blocks[block], blocks[block + 1]):
+            NumPixels = offsets[patch + 1] - offsets[patch]
+            if NumPixels == 0:
+                continue
+            occupied = 0
+            for j in range(offsets[patch], offsets[patch + 1]):
+                bg = _bin_index(pixels[j], g, shiftg) - log
+                if base[bg] == 0:
+                    touchedg[occupied] = bg
+                    occupied += 1
+                base[bg] += 1
+            prevSize, prevLo, prevOccupied = g, log, 0
+            for s in range(len(boxsizes)):
+                boxsize = boxsizes[s]
+                if s > 0 and boxsize % prevSize == 0:
+                    src, srcTouched, srcOccupied, srcSize, srcLo = prev, prevTouched, prevOccupied, prevSize, prevLo
+                else:
+                    src, srcTouched, srcOccupied, srcSize, srcLo = base, touchedg, occupied, g, log
+                factor = boxsize // srcSize
+                lo = log // (boxsize // g)
+                counted_Boxes = 0
+                for i in range(srcOccupied):
+                    bs = srcTouched[i]
+                    b = (bs + srcLo) // factor - lo
+                    if hist[b] == 0:
+                        touched[counted_Boxes] = b
+                        counted_Boxes += 1
+                    hist[b] += src[bs]
+                SumSquares = 0
+                for i in range(counted_Boxes):
+                    SumSquares += hist[touched[i]] * hist[touched[i]]
+                counts[patch, s] = counted_Boxes
+                lacunarities[patch, s] = _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, int(MaxValue / boxsize))
+                # The current bins become the previous ones; the old previous bins are cleared.
+                for i in range(prevOccupied):
+                    prev[prevTouched[i]] = 0
+                prev, hist = hist, prev
+                prevTouched, touched = touched, prevTouched
+                prevSize, prevLo, prevOccupied = boxsize, lo, counted_Boxes
+            for i in range(prevOccupied):
+                prev[prevTouched[i]] = 0
+            for i in range(occupied):
+                base[touchedg[i]] = 0
+    return counts, lacunarities
+
+
+def global_boxcount_ragged(pixels, offsets, box_sizes, MaxValue, shapes=None, num_threads=None):
+    """Compute global box counts and lacunarities of many patches of different sizes in one pass.
+
+    The patches are stored CSR-style: patch i is pixels[offsets[i]:offsets[i + 1]],
+    e.g. the flattened pixels of a segmented region. Each patch is read once into a
+    histogram with bins of the gcd of the box sizes that is folded for every box
+    size; values spread far beyond MaxValue are sorted once per patch instead.
+
+    Parameters:
+        pixels (np.ndarray): 1D buffer with the pixels of all patches.
+        offsets (np.ndarray): n_patches + 1 non-decreasing offsets into pixels, starting at 0.
+        box_sizes (iterable): Positive integer box sizes, not limited to powers of two.
+        MaxValue (int): Maximum value, 256 for 8-bit data.
+        shapes (np.ndarray): Optional (n_patches, 2) patch shapes, checked against the offsets.
+        num_threads (int): Number of threads to use, defaults to all numba threads.
+
+    Returns:
+        tuple: (counts, lacunarities) arrays of shape (n_patches, n_scales); entry [i, s] equals
+            Z_boxcount_hist(patch i, box_sizes[s], MaxValue). Empty patches count 0 with NaN lacunarity.
+    """
+    pixels = np.ascontiguousarray(pixels).ravel()
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    boxsizes = np.array(list(box_sizes), dtype=np.int64)
+    if offsets.ndim != 1 or offsets.size == 0 or offsets[0] != 0 or offsets[-1] != pixels.size \
+            or np.any(np.diff(offsets) < 0):
+        raise ValueError("offsets must rise from 0 to len(pixels)")
+    if np.any(boxsizes < 1):
+        raise ValueError("box sizes must be positive")
+    if shapes is not None:
+        shapes = np.asarray(shapes, dtype=np.int64).reshape(-1, 2)
+        if shapes.shape[0] != offsets.size - 1 or np.any(shapes[:, 0] * shapes[:, 1] != np.diff(offsets)):
+            raise ValueError("shapes do not match the offsets")
+    # Blocks of about equal pixel count, a few per thread, balance patches of mixed size.
+    NumPatches = offsets.size - 1
+    NumBlocks = max(1, min(NumPatches, 4 * (num_threads or get_num_threads())))
+    blocks = np.searchsorted(offsets, np.linspace(0, pixels.size, NumBlocks + 1)[1:-1])
+    blocks = np.unique(np.concatenate(([0], np.minimum(blocks, NumPatches), [NumPatches]))).astype(np.int64)
+    with _numba_threads(num_threads):
+        return _ragged_global_boxcount(pixels, offsets, boxsizes, MaxValue, blocks)
+
+WARMUP_DTYPES = ('uint8', 'uint16', 'int64', 'float32', 'float64')
+
+
+def warmup(dtypes=WARMUP_DTYPES, verbose=False, kernels=None, layouts=(('C', False),)):
+    """Compile the numba kernels for 2D arrays of the given dtypes.
+
+    With the on-disk cache a kernel that was compiled before is only loaded,
+    so running this once per machine (or per new cache directory) removes the
+    JIT delay from later processes.
+
+    Parameters:
+        dtypes (iterable): Pixel dtypes to compile for.
+        verbose (bool): If True, print the time spent per kernel.
+        kernels (iterable): Names of the kernels to compile (the keys of the
+            returned dict), defaults to all of them.
+        layouts (iterable): (layout, readonly) pairs of the input arrays, e.g.
+            ('A', True) for the read-only memory-mapped views of io.load_file_as_ndarray;
+            defaults to writable C-contiguous arrays.
+
+    Returns:
+        dict: Mapping from kernel name to compile (or cache load) time in seconds.
+    """
+    i64 = types.int64
+    selected = None if kernels is None else set(kernels)
+    kernels = [
+        ('Z_boxcount', Z_boxcount, lambda a: (a, i64, i64)),
+        ('Z_boxcount_hist', Z_boxcount_hist, lambda a: (a, i64, i64)),
+        ('spacialBoxcount', spacialBoxcount, lambda a: (a, i64, i64)),
+        ('spacialBoxcount_parallel', _parallel_spacial_boxcount, lambda a: (a, i64, i64)),
+        ('spacialBoxcount_stack', _stack_spacial_boxcount,
+         lambda a: (types.Array(a.dtype, 3, 'C'), types.Array(i64, 1, 'C'), i64, types.Array(types.float64, 5, 'C'),
+                    i64)),
+        ('spacialBoxcount_channels', _channel_spacial_boxcount, lambda a: (types.Array(a.dtype, 3, 'A'), i64, i64)),
+        ('spacialBoxcount_joint', _joint_spacial_boxcount, lambda a: (types.Array(a.dtype, 3, 'A'), i64, i64, i64)),
+        ('spacialBoxcount_sliding', _sliding_spacial_boxcount, lambda a: (a, i64, i64, i64)),
+        ('spacialBoxcount_pyramid', _pyramid_maps, lambda a: (a, i64, i64)),
+        ('multiscale_boxcount', _pyramid_fill,
+         lambda a: (a, i64, i64, types.Array(types.float32, 1, 'C'), types.Array(i64, 1, 'C'))),
+        ('global_boxcount_pyramid', global_boxcount_pyramid, lambda a: (a, types.Array(i64, 1, 'C'), i64)),
+        ('global_boxcount_ragged', _ragged_global_boxcount,
+         lambda a: (types.Array(a.dtype, 1, 'C'), types.Array(i64, 1, 'C'), types.Array(i64, 1, 'C'), i64,
+                    types.Array(i64, 1, 'C'))),
+    ]
+    compile_times = {}
+    for name, kernel, signature in kernels:
+        if selected is not None and name not in selected:
+            continue
+        start = time.perf_counter()
+        for dtype in dtypes:
+            for layout, readonly in layouts:
+                kernel.compile(signature(types.Array(from_dtype(np.dtype(dtype)), 2, layout, readonly=readonly)))
+        compile_times[name] = time.perf_counter() - start
+        if verbose:
+            print(round(compile_times[name], 3), "seconds to compile", name)
+    return compile_times
+
+
 # GPU Acceleration Functions
-try:
-    import cupy as cp
-    CUPY_AVAILABLE = True
-except ImportError:
-    CUPY_AVAILABLE = False
+# cupy is imported on first use; importing it eagerly initialises the CUDA stack.
+_cupy = None
+
+
+def _get_cupy():
+    """Import cupy on first use; raises ImportError if it is not installed."""
+    global _cupy
+    if _cupy is None:
+        import cupy
+        _cupy = cupy
+    return _cupy
+
+
+def cupy_available():
+    """Return True if cupy can be imported."""
+    try:
+        _get_cupy()
+    except ImportError:
+        return False
+    return True
+
+
+def __getattr__(name):
+    # Module attribute kept for callers of the former eager import.
+    if name == 'CUPY_AVAILABLE':
+        return cupy_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def Z_boxcount_gpu(GlidingBox, boxsize, MaxValue):
     """Compute the box count and lacunarity using GPU via cupy."""
+    cp = _get_cupy()
     GlidingBox_gpu = cp.asarray(GlidingBox)
     continualIndexes = GlidingBox_gpu / boxsize
     Boxindexes = cp.floor(continualIndexes)
-    unique_Boxes = cp.unique(Boxindexes)
-    counted_Boxes = unique_Boxes.size
-    SumPixInBox = cp.array([0.0])
-    for ub in unique_Boxes:
-        mask = (Boxindexes == ub)
-        ElementsCounted = cp.sum(mask)
-        SumPixInBox = cp.append(SumPixInBox, ElementsCounted)
-    Max_Num_Boxes = int(MaxValue / boxsize)
-    Num_empty_Boxes = Max_Num_Boxes - int(counted_Boxes)
-    if Num_empty_Boxes >= 1:
-        EmptyBoxes = cp.zeros(Num_empty_Boxes)
-        SumPixInBox = cp.append(SumPixInBox, EmptyBoxes)
-    mean = cp.mean(SumPixInBox)
-    standardDeviation = cp.std(SumPixInBox)
-    Lacunarity = cp.power(standardDeviation / mean, 2)
-    return int(counted_Boxes.get()), float(Lacunarity.get())
+    _, ElementsCounted = cp.unique(Boxindexes, return_counts=True)
+    counted_Boxes = int(ElementsCounted.size)
+    SumSquares = int(cp.sum(ElementsCounted.astype(cp.int64) ** 2).get())
+    Lacunarity = _moment_lacunarity(counted_Boxes, int(Boxindexes.size), SumSquares, int(MaxValue / boxsize))
+    return counted_Boxes, float(Lacunarity)
 
 
 def spacialBoxcount_gpu(npOutputFile, iteration, MaxValue):
     """Compute spatial box count ratio and lacunarity on GPU via cupy."""
-    if not CUPY_AVAILABLE:
+    if not cupy_available():
         raise ImportError("cupy is not installed")
+    cp = _get_cupy()
     arr_gpu = cp.asarray(npOutputFile)
     Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
     boxsize = Boxsize[iteration]
@@ -139,7 +1134,10 @@ def spacialBoxcount_gpu(npOutputFile, iteration, MaxValue):
 
 
 def MultithreadBoxcount(npOutputFile):
-    """Compute spatial box count in parallel over multiple scales."""
+    """Compute spatial box count over multiple scales with the single-pass pyramid.
+
+    api.multiscale_boxcount returns the same maps in one contiguous MultiscaleMaps buffer instead.
+    """
     BoxsizeDict = {"2": 0, "4": 1, "8": 2, "16": 3, "32": 4, "64": 5, "128": 6, "256": 7, "512": 8, "1024": 9}
     Height, width = npOutputFile.shape
     Height, width = int(Height), int(width)
@@ -147,30 +1145,12 @@ def MultithreadBoxcount(npOutputFile):
     BaseIteration = BoxsizeDict[str(int(BaseITERMinVal))]
     maxiteration = BaseIteration + 1
 
-    from threading import Thread
-    class ThreadWithReturnValue(Thread):
-        def __init__(self, group=None, target=None, name=None, args=(), kwargs={}):
-            Thread.__init__(self, group, target, name, args, kwargs)
-            self._return = None
-        def run(self):
-            if self._target is not None:
-                self._return = self._target(*self._args, **self._kwargs)
-        def join(self, *args):
-            Thread.join(self, *args)
-            return self._return
-
-    def BoxcountBoxsizeWorker(npOutputFile, iteration):
-        maxvalue = 256  # using 8-bit grayscale max value
-        return spacialBoxcount(npOutputFile, iteration, maxvalue)
-
-    threads = [None] * maxiteration
+    maxvalue = 256  # using 8-bit grayscale max value
     start = time.time()
-    for i in range(len(threads)):
-        threads[i] = ThreadWithReturnValue(target=BoxcountBoxsizeWorker, args=(npOutputFile, i))
-        threads[i].start()
+    levels = spacialBoxcount_pyramid(npOutputFile, maxiteration, maxvalue)
     BoxCountR_SpacialLac_map_Dict = {"iteration": np.array(["BoxcountRatio", "spacialLacunarity"]) }
-    for i in range(len(threads)):
-        BoxCountR_SpacialLac_map = np.array(threads[i].join())
+    for i in range(maxiteration):
+        BoxCountR_SpacialLac_map = np.array(levels[i])
         BoxCountR_SpacialLac_map_Dict[i] = BoxCountR_SpacialLac_map
     end = time.time()
     print(round(end - start, 3), "seconds for spacial boxcounting with", i+1, "iterations/scalings")
@@ -1,5 +1,197 @@
+import os
+import tempfile
+from functools import lru_cache
+
 import numpy as np
-from hilbertcurve.hilbertcurve import HilbertCurve
+
+
+def hilbert_coordinates(p, distances=None):
+    """Map distances along a 2D Hilbert curve of order p to coordinates, vectorized.
+
+    Same mapping as hilbertcurve's HilbertCurve(p, 2).point_from_distance
+    (Skilling's transpose algorithm), applied to whole arrays at once.
+
+    Parameters:
+        p (int): Curve order, the grid is 2**p x 2**p.
+        distances (array-like): Distances to map, defaults to all 4**p of them.
+
+    Returns:
+        tuple: (x0, x1) integer arrays, the first and second point coordinate.
+    """
+    dtype = np.uint32 if p <= 16 else np.uint64
+    if distances is None:
+        h = np.arange(4 ** p, dtype=dtype)
+    else:
+        h = np.asarray(distances).astype(dtype)
+    one = dtype(1)
+    # Transpose: the bits of h alternate between the two coordinates, MSB first.
+    x0 = _compact_bits(h >> one, p)
+    x1 = _compact_bits(h, p)
+    # Gray decode
+    t = x1 >> one
+    x1 ^= x0
+    x0 ^= t
+    # Undo excess work, branch-free: for q = 2, 4, ... 2**(p-1) a set bit q of
+    # x1 inverts the low bits of x0, otherwise the low bits of x0 and x1 are
+    # exchanged; then a set bit q of x0 inverts its own low bits.
+    flip = np.empty_like(h)
+    for k in range(1, p):
+        mask = dtype((1 << k) - 1)
+        np.right_shift(x1, dtype(k), out=flip)
+        flip &= one
+        flip *= mask
+        np.bitwise_xor(x0, x1, out=t)
+        t &= mask
+        t &= ~flip
+        x0 ^= flip
+        x0 ^= t
+        x1 ^= t
+        np.right_shift(x0, dtype(k), out=flip)
+        flip &= one
+        flip *= mask
+        x0 ^= flip
+    return x0, x1
+
+
+def _compact_bits(h, p):
+    """Gather the even bits 0, 2, 4, ... of h into the low p bits."""
+    dtype = h.dtype.type
+    x = h & dtype(0x5555555555555555 & ((1 << 2 * p) - 1))
+    for shift in (1, 2, 4, 8, 16):
+        if shift >= p:
+            break
+        x |= x >> dtype(shift)
+        x &= dtype(_COMPACT_MASKS[shift] & np.iinfo(h.dtype).max)
+    return x
+
+
+# Masks after each compaction step: runs of 2, 4, 8, 16, 32 bits.
+_COMPACT_MASKS = {1: 0x3333333333333333, 2: 0x0F0F0F0F0F0F0F0F, 4: 0x00FF00FF00FF00FF,
+                  8: 0x0000FFFF0000FFFF, 16: 0x00000000FFFFFFFF}
+
+
+def hilbert_index_table(p, cache_dir=None):
+    """Return the read-only Hilbert index table of order p.
+
+    Entry d is the flat position x0 * 2**p + x1 of the d-th curve point in a
+    C-ordered 2**p x 2**p grid, so mapping a sequence onto the curve is a
+    single scatter. Tables are built once per process and kept in an LRU.
+    With a cache directory (cache_dir, or the SPACIAL_BOXCOUNTING_HILBERT_DIR
+    environment variable) they are also saved as .npy files and memory-mapped,
+    so worker processes share one copy through the page cache.
+
+    Parameters:
+        p (int): Curve order.
+        cache_dir (str): Directory for persisted tables, optional.
+
+    Returns:
+        np.ndarray: 4**p indices, uint32 up to p = 16 and uint64 beyond.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get('SPACIAL_BOXCOUNTING_HILBERT_DIR') or None
+    return _hilbert_index_table(int(p), cache_dir)
+
+
+@lru_cache(maxsize=8)
+def _hilbert_index_table(p, cache_dir):
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, 'hilbert_p%d.npy' % p)
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+    x0, x1 = hilbert_coordinates(p)
+    x0 <<= x0.dtype.type(p)
+    x0 |= x1
+    table = x0
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a private temporary file and rename it, so concurrent
+        # processes never see a partially written table.
+        fd, tmp = tempfile.mkstemp(suffix='.npy', dir=cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, table)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return np.load(path, mmap_mode='r')
+    table.flags.writeable = False
+    return table
+
+
+def hilbert_tile(p, k, tile):
+    """Locate the tile-th aligned 2**k x 2**k block of an order p Hilbert curve.
+
+    The curve visits every aligned block with one contiguous run of 4**k
+    distances, tile * 4**k up to (tile + 1) * 4**k, along a rotated or
+    mirrored copy of the order k curve.
+
+    Parameters:
+        p (int): Curve order.
+        k (int): Tile order, at most p.
+        tile (int): Tile number along the curve.
+
+    Returns:
+        tuple: (row0, col0, index) with the block origin in the 2**p x 2**p grid
+            and the read-only flat position row * 2**k + col within the block of
+            each of the run's distances.
+    """
+    side = 1 << k
+    start = tile << (2 * k)
+    sample = np.array([0, 1, (1 << 2 * k) - 1], dtype=np.uint64)[:min(3, 1 << 2 * k)]
+    rows, cols = (c.astype(np.int64) for c in hilbert_coordinates(p, start + sample))
+    row0, col0 = int(rows[0]) >> k << k, int(cols[0]) >> k << k
+    rows, cols = rows - row0, cols - col0
+    base = hilbert_index_table(k)[sample.astype(np.intp)].astype(np.int64)
+    base_rows, base_cols = base >> k, base & (side - 1)
+    for orientation in range(8):
+        r, c = _orient(base_rows, base_cols, side, orientation)
+        if np.array_equal(r, rows) and np.array_equal(c, cols):
+            return row0, col0, _oriented_tile_index(k, orientation)
+    raise AssertionError("no symmetry of the order %d curve matches tile %d" % (k, tile))
+
+
+def _orient(rows, cols, side, orientation):
+    """Apply one of the 8 symmetries of the square: optional transpose, then row and column flips."""
+    if orientation & 4:
+        rows, cols = cols, rows
+    if orientation & 2:
+        rows = side - 1 - rows
+    if orientation & 1:
+        cols = side - 1 - cols
+    return rows, cols
+
+
+@lru_cache(maxsize=8)
+def _oriented_tile_index(k, orientation):
+    """Read-only flat positions of the order k curve after one of the square's symmetries."""
+    side = 1 << k
+    base = hilbert_index_table(k).astype(np.intp)
+    rows, cols = _orient(base >> k, base & (side - 1), side, orientation)
+    index = rows * side + cols
+    index.flags.writeable = False
+    return index
+
+
+@lru_cache(maxsize=8)
+def _hilbert_transform_indices(n):
+    """Scatter indices (dest, src) of hilbert_curve_transform for n input values."""
+    side = int(np.ceil(np.sqrt(n)))
+    p = 1
+    while (2**(2*p)) < n:
+        p += 1
+    table = hilbert_index_table(p)[:n].astype(np.intp)
+    x, y = table >> p, table & ((1 << p) - 1)
+    # Ensure indices are within bounds of our square
+    inside = (x < side) & (y < side)
+    src = np.flatnonzero(inside)
+    dest = y[inside] * side + x[inside]
+    src.flags.writeable = False
+    dest.flags.writeable = False
+    return dest, src
+
 
 def hilbert_curve_transform(arr):
     """Transform a 2D numpy array using a Hilbert curve mapping.
@@ -9,28 +201,12 @@ def hilbert_curve_transform(arr):
     Returns:
         np.ndarray: Transformed 2D array via Hilbert curve ordering
     """
-    # Flatten the array and compute the side length for a square
-    flat = arr.flatten()
+    # Flatten the array; value i goes to the i-th Hilbert point of the
+    # smallest 2^p x 2^p curve, kept if it lies inside the (side, side) square.
+    flat = arr.ravel()
     n = flat.size
     side = int(np.ceil(np.sqrt(n)))
-    # Next power of 2 for Hilbert curve
-    # find p s.t. 2^(p*2) >= n
-    p = 1
-    while (2**(2*p)) < n:
-        p += 1
-    hilbert = HilbertCurve(p, 2)
-    total_points = 2**(2*p)
-    # Get Hilbert indices and sort points accordingly
-    # Build mapping from index to position
-    points = [hilbert.coordinates_from_distance(i) for i in range(total_points)]
-    # Retain only as many points as data length
-    points = points[:n]
-
-    # Create an empty array of shape (side, side)
+    dest, src = _hilbert_transform_indices(n)
     transformed = np.zeros((side, side), dtype=arr.dtype)
-    for idx, point in enumerate(points):
-        x, y = point
-        # Ensure indices are within bounds of our square
-        if y < side and x < side:
-            transformed[y, x] = flat[idx]
+    transformed.ravel()[dest] = flat[src]
     return transformed
@@ -0,0 +1,127 @@
+import json
+import numpy as np
+
+from .vectorized import _moment_lacunarity
+
+
+class IntegralHistogram:
+    """Integral histogram for box-count queries on arbitrary rectangles.
+
+    table[y, x, b] holds the number of pixels in arr[:y, :x] whose value falls
+    into bin b, with bins of width binwidth starting at bin index lo. The bin
+    counts of any rectangle follow from four lookups per bin, so the box count
+    and lacunarity of a window never rescan its pixels.
+    """
+
+    def __init__(self, table, binwidth, lo, MaxValue):
+        self.table = table
+        self.binwidth = int(binwidth)
+        self.lo = int(lo)
+        self.MaxValue = MaxValue
+
+    @classmethod
+    def from_array(cls, arr, binwidth=2, MaxValue=256):
+        """Build the integral histogram of a 2D array.
+
+        Parameters:
+            arr (np.ndarray): 2D input array.
+            binwidth (int): Value bin width, i.e. the box size of the quantization level.
+            MaxValue (int): Maximum value, 256 for 8-bit data.
+
+        Returns:
+            IntegralHistogram: Index of shape (H + 1, W + 1, nbins).
+        """
+        YRange, XRange = arr.shape
+        Boxindexes = np.floor(arr / binwidth).astype(np.int64)
+        lo = min(0, int(Boxindexes.min(initial=0)))
+        hi = max(int(MaxValue / binwidth) - 1, int(Boxindexes.max(initial=0)))
+        nbins = hi - lo + 1
+        Boxindexes -= lo
+        dtype = np.uint32 if YRange * XRange < 2**32 else np.uint64
+        table = np.zeros((YRange + 1, XRange + 1, nbins), dtype=dtype)
+        columns = np.arange(XRange)
+        RowCounts = np.zeros((XRange, nbins), dtype=dtype)
+        for y in range(YRange):
+            RowCounts[:] = 0
+            RowCounts[columns, Boxindexes[y]] = 1
+            np.cumsum(RowCounts, axis=0, out=RowCounts)
+            np.add(table[y, 1:], RowCounts, out=table[y + 1, 1:])
+        return cls(table, binwidth, lo, MaxValue)
+
+    @property
+    def shape(self):
+        """Shape (H, W) of the indexed array."""
+        return self.table.shape[0] - 1, self.table.shape[1] - 1
+
+    def bin_counts(self, rects, boxsize=None):
+        """Return the per-bin pixel counts of rectangles.
+
+        Parameters:
+            rects (array-like): (n, 4) non-empty rectangles [y0, x0, y1, x1] within the array,
+                half-open like slices.
+            boxsize (int): Bin width of the result, a multiple of binwidth; defaults to binwidth.
+
+        Returns:
+            np.ndarray: (n, nbins) int64 counts for bins of width boxsize.
+        """
+        rects = np.atleast_2d(np.asarray(rects, dtype=np.intp))
+        YRange, XRange = self.shape
+        if rects.ndim != 2 or rects.shape[1] != 4:
+            raise ValueError("rects must have shape (n, 4)")
+        y0, x0, y1, x1 = rects.T
+        if not ((0 <= y0) & (y0 < y1) & (y1 <= YRange) & (0 <= x0) & (x0 < x1) & (x1 <= XRange)).all():
+            raise ValueError("rectangles must satisfy 0 <= y0 < y1 <= %d and 0 <= x0 < x1 <= %d" % (YRange, XRange))
+        table = self.table
+        # int64 lookups: mixing them with the unsigned table would promote to float.
+        counts = table[y1, x1].astype(np.int64)
+        counts -= table[y0, x1].astype(np.int64)
+        counts -= table[y1, x0].astype(np.int64)
+        counts += table[y0, x0].astype(np.int64)
+        if boxsize is None or boxsize == self.binwidth:
+            return counts
+        if boxsize % self.binwidth:
+            raise ValueError("boxsize must be a multiple of the bin width %d" % self.binwidth)
+        # floor(floor(v / binwidth) / k) == floor(v / (k * binwidth)), so coarser bins
+        # are sums over consecutive runs of fine bins.
+        groups = (self.lo + np.arange(counts.shape[1])) // (boxsize // self.binwidth)
+        starts = np.flatnonzero(np.diff(groups, prepend=groups[0] - 1))
+        return np.add.reduceat(counts, starts, axis=1)
+
+    def query(self, rects, boxsize=None):
+        """Return box counts and lacunarities of rectangles.
+
+        Parameters:
+            rects (array-like): (n, 4) non-empty rectangles [y0, x0, y1, x1] within the array,
+                half-open like slices.
+            boxsize (int): Bin width to count with, a multiple of binwidth; defaults to binwidth.
+
+        Returns:
+            tuple: (counted_Boxes, Lacunarity) arrays of length n, equal to
+                Z_boxcount(arr[y0:y1, x0:x1], boxsize, MaxValue) per rectangle.
+        """
+        if boxsize is None:
+            boxsize = self.binwidth
+        counts = self.bin_counts(rects, boxsize)
+        counted_Boxes = np.count_nonzero(counts, axis=1)
+        Lacunarity = _moment_lacunarity(counted_Boxes, counts.sum(axis=1), (counts * counts).sum(axis=1),
+                                        int(self.MaxValue / boxsize))
+        return counted_Boxes, Lacunarity
+
+    def save(self, path):
+        """Save the table to path (.npy) and its parameters to a .json file next to it."""
+        if not path.endswith('.npy'):
+            path += '.npy'
+        np.save(path, self.table)
+        with open(path[:-len('.npy')] + '.json', 'w') as f:
+            json.dump({'binwidth': self.binwidth, 'lo': self.lo, 'MaxValue': self.MaxValue}, f)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load an index written by save, memory-mapping the table by default."""
+        if not path.endswith('.npy'):
+            path += '.npy'
+        with open(path[:-len('.npy')] + '.json') as f:
+            params = json.load(f)
+        table = np.load(path, mmap_mode=mmap_mode)
+        return cls(table, params['binwidth'], params['lo'], params['MaxValue'])
@@ -1,64 +1,397 @@
 import os
+import struct
+import warnings
+
 import numpy as np
-from PIL import Image
 
-# Installation erforderlich:
-# pip install hilbertcurve
-from hilbertcurve.hilbertcurve import HilbertCurve
+from .hilbert import hilbert_index_table, hilbert_tile
+from .morton import morton_index, morton_layout, morton_scatter, _morton_order
+
+# PIL wird erst bei Bedarf importiert, damit "import spacial_boxcounting"
+# schnell bleibt.
 
-def load_file_as_ndarray(filepath, mode='auto', hilbert=False):
+def load_file_as_ndarray(filepath, mode='auto', hilbert=False, curve=None, mmap=True, color=False):
     # wie gehabt …
+    # curve: Anordnung von Binärdaten, 'hilbert' oder 'morton' (Z-Kurve,
+    # deutlich billiger); hilbert=True entspricht curve='hilbert'.
+    # mmap: unkomprimierte 8-Bit-Graustufen-BMPs und .npy-Dateien werden als
+    # schreibgeschützte np.memmap-Ansicht geliefert, ohne Kopie.
+    # color: Bilder als (C, H, W)-Ansicht auf die verschachtelten RGB-Pixel
+    # statt nach 'L' zu wandeln (Graustufenbilder: C = 1); 2D-.npy-Arrays
+    # bekommen eine Kanalachse.
+    if curve is None and hilbert:
+        curve = 'hilbert'
     if mode == 'auto':
-        ext = os.path.splitext(filepath)[1].lower()
-        if ext in ['.png', '.jpg', '.jpeg', '.bmp', '.tiff']:
-            mode = 'image'
-        elif ext in ['.npy']:
-            mode = 'npy'
-        else:
-            mode = 'binary'
+        mode = _file_mode(filepath)
 
-    if mode == 'image':
-        img = Image.open(filepath).convert('L')
-        arr = np.array(img)
+    if mode == 'image' and color:
+        arr = _open_color(filepath)
+    elif mode == 'image':
+        arr = _memmap_bmp(filepath) if mmap else None
+        if arr is None:
+            from PIL import Image
+            img = Image.open(filepath).convert('L')
+            arr = np.array(img)
     elif mode == 'npy':
-        arr = np.load(filepath)
+        try:
+            arr = np.load(filepath, mmap_mode='r' if mmap else None)
+        except ValueError:
+            # Objekt-Arrays lassen sich nicht mappen
+            arr = np.load(filepath, allow_pickle=False)
     elif mode == 'binary':
         with open(filepath, 'rb') as f:
             data = np.frombuffer(f.read(), dtype=np.uint8)
-        if hilbert:
+        if curve == 'hilbert':
             arr = _map_bytes_to_hilbert(data)
-        else:
+        elif curve == 'morton':
+            arr = morton_scatter(data)
+        elif curve is None:
             # fallback: Quadrat mit Zeilenweise Reshape
             side = int(np.floor(np.sqrt(data.size)))
             arr = data[:side*side].reshape(side, side)
+        else:
+            raise ValueError(f"Unsupported curve: {curve}")
     else:
         raise ValueError(f"Unsupported mode: {mode}")
 
+    if color and arr.ndim == 2:
+        arr = arr[np.newaxis]
     return arr
 
+
+def _open_color(filepath):
+    """Bild als (C, H, W)-Ansicht ohne Kopie der dekodierten Pixel.
+
+    RGB bleibt verschachtelt im Speicher (H, W, 3), die Kanalachse wird nur
+    per transpose nach vorne gelegt. Graustufen ('L') geben C = 1, alles
+    andere (Paletten, Alpha, CMYK, ...) wird nach RGB gewandelt.
+    """
+    from PIL import Image
+    img = Image.open(filepath)
+    if img.mode == 'L':
+        return np.asarray(img)[np.newaxis]
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return np.asarray(img).transpose(2, 0, 1)
+
+
+def gray_from_color(image):
+    """Graustufen (H, W) einer (C, H, W)-Ansicht aus load_file_as_ndarray(color=True).
+
+    C = 1 gibt die Ebene selbst zurück; RGB wird wie von Pillows
+    convert('L') gewichtet (ITU-R 601-2, gleiche Ganzzahl-Rundung), so dass
+    ein Farbbild nur einmal dekodiert werden muss.
+    """
+    if image.shape[0] == 1:
+        return image[0]
+    r, g, b = (image[c].astype(np.int64) for c in range(3))
+    return ((r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16).astype(image.dtype)
+
+
+def _file_mode(filepath):
+    # Modus anhand der Dateiendung
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext in ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif']:
+        return 'image'
+    elif ext in ['.npy']:
+        return 'npy'
+    return 'binary'
+
+
+def _memmap_bmp(filepath):
+    """Pixel eines unkomprimierten 8-Bit-Graustufen-BMPs als np.memmap-Ansicht.
+
+    Zeilenauffüllung auf 4 Byte und die (übliche) Speicherung von unten nach
+    oben werden über Strides abgebildet. Liefert None für alles andere, z.B.
+    andere Farbtiefen, RLE-Kompression oder Paletten, die keine Graustufen-
+    Identität sind; dann übernimmt PIL.
+    """
+    if not filepath.lower().endswith('.bmp'):
+        return None
+    with open(filepath, 'rb') as f:
+        header = f.read(54)
+        if len(header) < 54 or header[:2] != b'BM':
+            return None
+        offset, = struct.unpack_from('<I', header, 10)
+        dib_size, width, height, planes, bpp, compression, _, _, _, colors = struct.unpack_from('<IiiHHIIiiI', header, 14)
+        if dib_size < 40 or bpp != 8 or compression != 0 or width <= 0 or height == 0:
+            return None
+        colors = colors or 256
+        f.seek(14 + dib_size)
+        palette = np.frombuffer(f.read(4 * colors), dtype=np.uint8)
+    if palette.size != 4 * colors:
+        return None
+    palette = palette.reshape(colors, 4)[:, :3]
+    if not (palette == np.arange(colors, dtype=np.uint8)[:, None]).all():
+        return None
+    stride = (width + 3) // 4 * 4
+    rows = abs(height)
+    if os.path.getsize(filepath) < offset + rows * stride:
+        return None
+    pixels = np.memmap(filepath, dtype=np.uint8, mode='r', offset=offset, shape=(rows, stride))[:, :width]
+    # positive Höhe: unterste Bildzeile zuerst gespeichert
+    return pixels[::-1] if height > 0 else pixels
+
+
+def binary_shape(filepath, curve=None, hilbert=False):
+    """Shape des 2D-Arrays, das load_file_as_ndarray für eine Binärdatei liefert."""
+    if curve is None and hilbert:
+        curve = 'hilbert'
+    return _binary_shape(os.path.getsize(filepath), curve)
+
+
+def _binary_shape(length, curve):
+    if curve == 'hilbert':
+        side = 1 << _hilbert_order(length)
+        return side, side
+    elif curve == 'morton':
+        return morton_layout(length)
+    elif curve is None:
+        side = int(np.floor(np.sqrt(length)))
+        return side, side
+    raise ValueError(f"Unsupported curve: {curve}")
+
+
+def _hilbert_order(length):
+    # minimal p mit 2^(2p) >= length
+    p = 0
+    while (2 ** (2 * p)) < length:
+        p += 1
+    return p
+
+
+def iter_binary_tiles(filepath, tile_side=1024, curve=None, hilbert=False):
+    """Binärdatei kachelweise laden, ohne sie ganz in den Speicher zu lesen.
+
+    Die Datei wird per np.memmap geöffnet. Bei Hilbert- und Z-Kurve belegt jede
+    ausgerichtete Kachel einen zusammenhängenden Bytebereich der Datei, beim
+    zeilenweisen Layout wird die Kachel aus dem Quadrat ausgeschnitten.
+    Zusammengesetzt ergeben die Kacheln genau load_file_as_ndarray(filepath, ...).
+
+    Parameters:
+        filepath (str): Pfad zur Binärdatei.
+        tile_side (int): Kantenlänge der Kacheln, eine Zweierpotenz; Randkacheln
+            des zeilenweisen Layouts können kleiner sein.
+        curve (str): None (zeilenweise), 'hilbert' oder 'morton'.
+        hilbert (bool): Entspricht curve='hilbert'.
+
+    Yields:
+        tuple: (y0, x0, tile) mit der Position der Kachel im Gesamtarray
+            der Form binary_shape(filepath, curve).
+    """
+    if tile_side < 1 or tile_side & (tile_side - 1):
+        raise ValueError("tile_side must be a power of two")
+    if curve is None and hilbert:
+        curve = 'hilbert'
+    length = os.path.getsize(filepath)
+    rows, cols = _binary_shape(length, curve)
+    if length == 0 or rows == 0:
+        return
+    data = np.memmap(filepath, dtype=np.uint8, mode='r')
+    if curve is None:
+        square = data[:rows * cols].reshape(rows, cols)
+        for y0 in range(0, rows, tile_side):
+            for x0 in range(0, cols, tile_side):
+                yield y0, x0, np.array(square[y0:y0 + tile_side, x0:x0 + tile_side])
+        return
+    side = min(tile_side, rows)
+    k = side.bit_length() - 1
+    size = side * side
+    grid = (rows // side, cols // side)
+    if curve == 'morton':
+        order = _morton_order(side, side)
+        positions = morton_index(np.arange(grid[0] * grid[1], dtype=np.uint64), grid)
+    else:
+        p = _hilbert_order(length)
+    for tile in range(grid[0] * grid[1]):
+        # Bytebereich der Kachel, das Ende wird mit Nullen aufgefüllt
+        chunk = np.zeros(size, dtype=np.uint8)
+        start = tile * size
+        if start < length:
+            chunk[:min(size, length - start)] = data[start:start + size]
+        if curve == 'morton':
+            y0, x0 = divmod(int(positions[tile]), grid[1])
+            yield y0 * side, x0 * side, chunk.take(order).reshape(side, side)
+        else:
+            y0, x0, index = hilbert_tile(p, k, tile)
+            out = np.empty(size, dtype=np.uint8)
+            out[index] = chunk
+            yield y0, x0, out.reshape(side, side)
+
+
+def file_shape(filepath, mode='auto', hilbert=False, curve=None, reduce=1):
+    """Shape des Arrays, das iter_file_tiles kachelweise liefert, ohne die Datei zu laden."""
+    if mode == 'auto':
+        mode = _file_mode(filepath)
+    if mode == 'binary':
+        return binary_shape(filepath, curve=curve, hilbert=hilbert)
+    elif mode == 'npy':
+        return np.load(filepath, mmap_mode='r').shape
+    elif mode == 'image':
+        from PIL import Image
+        with Image.open(filepath) as img:
+            width, height = img.size
+        return -(-height // reduce), -(-width // reduce)
+    raise ValueError(f"Unsupported mode: {mode}")
+
+
+def iter_file_tiles(filepath, tile_side=1024, mode='auto', hilbert=False, curve=None, reduce=1):
+    """Beliebige Eingabedatei kachelweise laden, siehe iter_binary_tiles und iter_image_tiles.
+
+    .npy-Dateien werden wie in load_file_as_ndarray gemappt und ausgeschnitten.
+    reduce gilt nur für Bilder.
+
+    Yields:
+        tuple: (y0, x0, tile) im Array der Form file_shape(filepath, ...).
+    """
+    if mode == 'auto':
+        mode = _file_mode(filepath)
+    if mode == 'binary':
+        yield from iter_binary_tiles(filepath, tile_side, curve=curve, hilbert=hilbert)
+    elif mode == 'image':
+        yield from iter_image_tiles(filepath, tile_side, reduce=reduce)
+    elif mode == 'npy':
+        arr = load_file_as_ndarray(filepath, mode='npy')
+        yield from _iter_regions(lambda box: np.array(arr[box[1]:box[3], box[0]:box[2]]), arr.shape, tile_side)
+    else:
+        raise ValueError(f"Unsupported mode: {mode}")
+
+
+def iter_image_tiles(filepath, tile_side=1024, reduce=1):
+    """Bild regionsweise lesen und als 'L'-Kacheln liefern.
+
+    Unkomprimierte 8-Bit-TIFFs (Graustufen oder RGB, mit Streifen oder
+    Kacheln) und unkomprimierte 8-Bit-Graustufen-BMPs werden per np.memmap
+    gelesen: für jede Region nur die Bytes der überdeckten TIFF-Streifen bzw.
+    -Kacheln oder BMP-Zeilen, der Speicherbedarf hängt also von der Regions-
+    und nicht von der Bildgröße ab. Alle anderen Bilder (JPEG, PNG,
+    komprimierte TIFFs, ...) lassen sich nicht regionsweise dekodieren; sie
+    werden einmal ganz dekodiert, mit einer UserWarning. Verkleinerte JPEGs
+    dabei per draft direkt in Graustufen und reduzierter Auflösung, bei voller
+    Auflösung nicht (siehe _open_gray).
+
+    Parameters:
+        filepath (str): Pfad zum Bild.
+        tile_side (int): Kantenlänge der Kacheln, eine Zweierpotenz; Randkacheln
+            können kleiner sein.
+        reduce (int): Verkleinerungsfaktor; JPEGs nutzen dafür die DCT-Skalierung
+            von draft (Faktor 2, 4 oder 8), sonst Image.reduce.
+
+    Yields:
+        tuple: (y0, x0, tile) mit der Position der Kachel im Bild.
+    """
+    if tile_side < 1 or tile_side & (tile_side - 1):
+        raise ValueError("tile_side must be a power of two")
+    pixels = _memmap_bmp(filepath)
+    if pixels is not None:
+        yield from _iter_regions(lambda box: np.array(pixels[box[1]:box[3], box[0]:box[2]]), pixels.shape,
+                                 tile_side, reduce)
+        return
+    from PIL import Image
+    with Image.open(filepath) as img:
+        layout = _raw_tiff_layout(img)
+        image_format = img.format
+    if layout is not None:
+        data = np.memmap(filepath, dtype=np.uint8, mode='r')
+        yield from _iter_regions(lambda box: _read_tiff_region(data, layout, box), layout[0], tile_side, reduce)
+        return
+    warnings.warn("%s (%s) cannot be decoded by region and is decoded whole; only uncompressed TIFF and "
+                  "8-bit grayscale BMP images are read region by region" % (filepath, image_format), stacklevel=2)
+    arr = np.asarray(_open_gray(filepath, reduce))
+    for y0 in range(0, arr.shape[0], tile_side):
+        for x0 in range(0, arr.shape[1], tile_side):
+            yield y0, x0, arr[y0:y0 + tile_side, x0:x0 + tile_side]
+
+
+def _iter_regions(read, shape, tile_side, reduce=1):
+    # Regionen von tile_side * reduce Pixeln über read((x0, y0, x1, y1)) lesen und
+    # auf tile_side verkleinern; reduce-Blöcke bleiben dabei wie im ganzen Bild.
+    height, width = shape
+    region = tile_side * reduce
+    for ry in range(0, height, region):
+        for rx in range(0, width, region):
+            part = read((rx, ry, min(rx + region, width), min(ry + region, height)))
+            if reduce > 1:
+                from PIL import Image
+                part = np.asarray(Image.fromarray(part).reduce(reduce))
+            yield ry // reduce, rx // reduce, part
+
+
+def _raw_tiff_layout(img):
+    """Aufbau eines unkomprimierten 8-Bit-Graustufen- oder RGB(A)-TIFFs aus seinen Tags.
+
+    Liefert ((Höhe, Breite), Samples, Blockhöhe, Blockbreite, Offsets) der
+    Streifen oder Kacheln, oder None für alles andere; dann wird das Bild
+    ganz von PIL dekodiert.
+    """
+    if img.format != 'TIFF':
+        return None
+    tags = img.tag_v2
+    photometric = {'L': 1, 'RGB': 2, 'RGBA': 2}.get(img.mode)
+    samples = tags.get(277, 1)
+    if (photometric is None or tags.get(262) != photometric or tags.get(259, 1) != 1
+            or tags.get(284, 1) != 1 or tuple(tags.get(258, (1,))) != (8,) * samples
+            or tuple(tags.get(339, (1,) * samples)) != (1,) * samples):
+        return None
+    width, height = img.size
+    if 324 in tags:
+        return (height, width), samples, tags[323], tags[322], tuple(tags[324])
+    if 273 in tags:
+        return (height, width), samples, min(tags.get(278, height), height), width, tuple(tags[273])
+    return None
+
+
+def _read_tiff_region(data, layout, box):
+    # Region (x0, y0, x1, y1) aus den gemappten Streifen/Kacheln zusammensetzen
+    (height, width), samples, block_height, block_width, offsets = layout
+    x0, y0, x1, y1 = box
+    region = np.empty((y1 - y0, x1 - x0, samples), dtype=np.uint8)
+    per_row = -(-width // block_width)
+    for by in range(y0 // block_height, (y1 - 1) // block_height + 1):
+        # der letzte Streifen ist kürzer; von aufgefüllten Randkacheln nur die Bildzeilen
+        top = by * block_height
+        rows = min(block_height, height - top)
+        for bx in range(x0 // block_width, (x1 - 1) // block_width + 1):
+            left = bx * block_width
+            offset = offsets[by * per_row + bx]
+            block = data[offset:offset + rows * block_width * samples].reshape(rows, block_width, samples)
+            ya, yb = max(y0, top), min(y1, top + rows)
+            xa, xb = max(x0, left), min(x1, left + block_width)
+            region[ya - y0:yb - y0, xa - x0:xb - x0] = block[ya - top:yb - top, xa - left:xb - left]
+    if samples == 1:
+        return region[:, :, 0]
+    return gray_from_color(region.transpose(2, 0, 1))
+
+
+def _open_gray(filepath, reduce=1):
+    # ganzes Bild in Graustufen; verkleinerte JPEGs über draft. Bei voller
+    # Auflösung nicht, da die Luminanz des Decoders bei Farbbildern leicht von
+    # convert('L') abweicht.
+    from PIL import Image
+    img = Image.open(filepath)
+    if img.format == 'JPEG' and reduce > 1:
+        width = img.size[0]
+        img.draft('L', (-(-img.size[0] // reduce), -(-img.size[1] // reduce)))
+        # draft skaliert nur um 1, 2, 4 oder 8, der Rest über reduce
+        scale = 1 << int(round(np.log2(width / img.size[0])))
+        reduce = max(reduce // scale, 1)
+    img = img.convert('L')
+    if reduce > 1:
+        img = img.reduce(reduce)
+    return img
+
+
 def _map_bytes_to_hilbert(data: np.ndarray) -> np.ndarray:
     """
     Mapping eines 1D Byte-Arrays auf ein 2D-Array via Hilbert-Kurve.
     Das Quadrat muss 2^p × 2^p groß sein.
     """
     length = data.size
-    # Bestimme minimal p: 2^(2p) >= length
-    p = 0
-    while (2 ** (2 * p)) < length:
-        p += 1
+    p = _hilbert_order(length)
     side = 2 ** p
-    total = side * side
-    # Padd das Array auf volle Größe
-    if total > length:
-        data = np.pad(data, (0, total - length), mode='constant', constant_values=0)
-
-    # Hilbert-Kurve initialisieren: n=2 Dim, p Iterationen
-    hc = HilbertCurve(p, 2)
-    # generiere alle distanzbasierten Koordinaten
-    distances = np.arange(total)
-    coords = np.array(hc.points_from_distances(distances))  # shape (total, 2)
-
-    # Mappe Byte-Werte in 2D Raster
-    arr2d = np.zeros((side, side), dtype=data.dtype)
-    arr2d[coords[:,0], coords[:,1]] = data
-    return arr2d
+    # Eine gespeicherte Indextabelle pro Ordnung p: Position d der Kurve liegt
+    # bei x0 * side + x1, das Mapping ist damit ein einziger Scatter.
+    table = hilbert_index_table(p)
+    arr2d = np.zeros(side * side, dtype=data.dtype)
+    arr2d[table[:length]] = data
+    return arr2d.reshape(side, side)
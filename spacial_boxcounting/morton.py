@@ -0,0 +1,66 @@
+import numpy as np
+
+from .hilbert import _compact_bits
+
+# Side of the square tiles morton_scatter permutes in one step.
+_TILE_SIDE = 256
+
+
+def morton_layout(length):
+    """Return the (rows, cols) grid a Z-order curve of length values is laid out on.
+
+    The grid is the smallest 2**floor(k/2) x 2**ceil(k/2) rectangle with
+    2**k >= length, so the padding never exceeds the data itself.
+    """
+    k = max(int(length) - 1, 0).bit_length()
+    return 1 << (k // 2), 1 << ((k + 1) // 2)
+
+
+def morton_index(distances, shape):
+    """Map distances along a Z-order (Morton) curve to flat C-order indexes of shape.
+
+    Bit 0 of a distance is bit 0 of the column, bit 1 is bit 0 of the row and
+    so on, the column taking the extra top bit of a non-square layout.
+
+    Parameters:
+        distances (np.ndarray): Unsigned integer distances.
+        shape (tuple): (rows, cols) from morton_layout.
+
+    Returns:
+        np.ndarray: Flat indexes y * cols + x, same dtype as distances.
+    """
+    row_bits = int(shape[0]).bit_length() - 1
+    col_bits = int(shape[1]).bit_length() - 1
+    x = _compact_bits(distances, col_bits)
+    y = _compact_bits(distances >> distances.dtype.type(1), row_bits)
+    y <<= distances.dtype.type(col_bits)
+    y |= x
+    return y
+
+
+def morton_scatter(data):
+    """Lay a 1D array out on a Z-order curve, zero-padded to morton_layout(data.size).
+
+    Every run of 4**m values fills one 2**m x 2**m tile in the same Z-order, so
+    the values are gathered within tiles through one small index table and the
+    tiles are gathered by the Z-order of their own index.
+
+    Parameters:
+        data (np.ndarray): 1D input array.
+
+    Returns:
+        np.ndarray: 2D array of shape morton_layout(data.size).
+    """
+    rows, cols = morton_layout(data.size)
+    side = min(rows, _TILE_SIDE)
+    grid = (rows // side, cols // side)
+    if data.size != rows * cols:
+        data = np.concatenate([data, np.zeros(rows * cols - data.size, dtype=data.dtype)])
+    tiles = data.reshape(grid[0] * grid[1], side * side).take(_morton_order(side, side), axis=1)
+    tiles = tiles.take(_morton_order(*grid), axis=0).reshape(grid[0], grid[1], side, side)
+    return tiles.transpose(0, 2, 1, 3).reshape(rows, cols)
+
+
+def _morton_order(rows, cols):
+    """Z-order distance of every cell of a (rows, cols) grid, in C order."""
+    return np.argsort(morton_index(np.arange(rows * cols, dtype=np.uint64), (rows, cols)))
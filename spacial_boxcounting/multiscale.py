@@ -0,0 +1,120 @@
+import json
+
+import numpy as np
+
+
+class MultiscaleMaps:
+    """Spatial box count maps of several scales in one contiguous buffer.
+
+    Scale k occupies buffer[offsets[k]:offsets[k + 1]], laid out as a (2, h, w)
+    block [BoxCountR_map, spa_Lac_map]; maps[iteration] returns that block as a
+    view. The buffer is float64 or float32 and can be handed on without a copy,
+    e.g. np.asarray(maps), memoryview(maps.buffer), or saved and memory-mapped
+    again with save and load (read-only by default, 'r+' to fill it again).
+
+    Parameters:
+        buffer (np.ndarray): 1D C-contiguous float buffer of offsets[-1] values.
+        iterations (iterable): Box size index of every scale, Boxsize = [2, 4, ..., 1024].
+        shapes (iterable): (h, w) map shape of every scale.
+    """
+
+    __slots__ = ('buffer', 'iterations', 'shapes', 'offsets')
+
+    def __init__(self, buffer, iterations, shapes):
+        self.iterations = tuple(int(iteration) for iteration in iterations)
+        self.shapes = tuple((int(h), int(w)) for h, w in shapes)
+        if len(self.shapes) != len(self.iterations):
+            raise ValueError("one shape per iteration is required")
+        self.offsets = np.zeros(len(self.shapes) + 1, dtype=np.int64)
+        np.cumsum([2 * h * w for h, w in self.shapes], out=self.offsets[1:])
+        if buffer.ndim != 1 or buffer.size != self.offsets[-1] or not buffer.flags.c_contiguous:
+            raise ValueError("buffer must be a contiguous 1D array of %d values" % self.offsets[-1])
+        self.buffer = buffer
+
+    @classmethod
+    def allocate(cls, shape, iterations, dtype=np.float64):
+        """Return zeroed maps of an array of the given (Y, X) shape."""
+        YRange, XRange = shape
+        shapes = [(YRange // (2 << iteration) + 1, XRange // (2 << iteration) + 1) for iteration in iterations]
+        return cls(np.zeros(sum(2 * h * w for h, w in shapes), dtype=dtype), iterations, shapes)
+
+    @property
+    def dtype(self):
+        return self.buffer.dtype
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def __len__(self):
+        return len(self.iterations)
+
+    def __contains__(self, iteration):
+        return iteration in self.iterations
+
+    def __iter__(self):
+        """Iterate over (iteration, (2, h, w) view) pairs."""
+        for k, iteration in enumerate(self.iterations):
+            yield iteration, self.level(k)
+
+    def __getitem__(self, iteration):
+        """Return the (2, h, w) view [BoxCountR_map, spa_Lac_map] of a box size index."""
+        try:
+            k = self.iterations.index(iteration)
+        except ValueError:
+            raise KeyError(iteration) from None
+        return self.level(k)
+
+    def level(self, k):
+        """Return the (2, h, w) view of the k-th stored scale."""
+        return self.buffer[self.offsets[k]:self.offsets[k + 1]].reshape((2,) + self.shapes[k])
+
+    def boxcount_ratio(self, iteration):
+        return self[iteration][0]
+
+    def lacunarity(self, iteration):
+        return self[iteration][1]
+
+    def __array__(self, dtype=None, copy=None):
+        if copy:
+            return np.array(self.buffer, dtype=dtype)
+        return self.buffer if dtype is None else self.buffer.astype(dtype, copy=False)
+
+    def __getstate__(self):
+        return {'buffer': self.buffer, 'iterations': self.iterations, 'shapes': self.shapes}
+
+    def __setstate__(self, state):
+        self.__init__(state['buffer'], state['iterations'], state['shapes'])
+
+    def __repr__(self):
+        return '%s(iterations=%s, dtype=%s, nbytes=%d)' % (type(self).__name__, list(self.iterations),
+                                                            self.dtype, self.nbytes)
+
+    def to_dict(self):
+        """Return the MultithreadBoxcount layout: {'iteration': labels, iteration: (2, h, w) view}."""
+        result = {"iteration": np.array(["BoxcountRatio", "spacialLacunarity"])}
+        for iteration, maps in self:
+            result[iteration] = maps
+        return result
+
+    def save(self, path):
+        """Save the buffer to path (.npy) and the layout to a .json file next to it."""
+        if not path.endswith('.npy'):
+            path += '.npy'
+        np.save(path, self.buffer)
+        with open(path[:-len('.npy')] + '.json', 'w') as f:
+            json.dump({'iterations': list(self.iterations), 'shapes': [list(shape) for shape in self.shapes]}, f)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load maps written by save, memory-mapping the buffer by default.
+
+        The default mmap_mode 'r' is read-only; pass 'r+' to use the maps as out
+        of api.multiscale_boxcount.
+        """
+        if not path.endswith('.npy'):
+            path += '.npy'
+        with open(path[:-len('.npy')] + '.json') as f:
+            layout = json.load(f)
+        return cls(np.load(path, mmap_mode=mmap_mode), layout['iterations'], layout['shapes'])
@@ -0,0 +1,118 @@
+import numpy as np
+
+from .api import _fit_dimension, _global_boxcounts, _numba_enabled
+from .io import load_file_as_ndarray
+
+
+class ScaleSpace:
+    """Box counting results of one array, computed on demand and kept.
+
+    Spatial maps, global box counts, lacunarity curves and the fractal dimension
+    all derive from the same per-scale counts, so each scale is computed at most
+    once however the results are queried. Spatial maps are stored per scale as
+    one contiguous (2, h, w) block [BoxCountR_map, spa_Lac_map]; global results
+    as (count, lacunarity) per box size. Instances pickle with their cached
+    results, e.g. to hand them to worker processes.
+
+    Parameters:
+        array (np.ndarray): 2D input array.
+        maxvalue (int): Maximum value, defaults to 256 for 8-bit data.
+        num_threads (int): Threads for the spatial engine, defaults to all cores.
+
+    Example:
+        space = ScaleSpace.from_file('image.png')
+        BoxCountR_map, spa_Lac_map = space.spatial(0)
+        fd = space.fractal_dimension()
+    """
+
+    __slots__ = ('array', 'maxvalue', 'num_threads', '_maps', '_global')
+
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+    def __init__(self, array, maxvalue=256, num_threads=None):
+        self.array = array
+        self.maxvalue = maxvalue
+        self.num_threads = num_threads
+        self._maps = {}
+        self._global = {}
+
+    @classmethod
+    def from_file(cls, filepath, hilbert=False, curve=None, maxvalue=256, num_threads=None):
+        """Load filepath as in io.load_file_as_ndarray and wrap it."""
+        return cls(load_file_as_ndarray(filepath, mode='auto', hilbert=hilbert, curve=curve), maxvalue, num_threads)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return '%s(shape=%s, spatial scales=%s, global box sizes=%s)' % (
+            type(self).__name__, tuple(self.array.shape), sorted(self._maps), sorted(self._global))
+
+    def spatial(self, iteration=0):
+        """Return [BoxCountR_map, spa_Lac_map] for Boxsize[iteration], as from spacialBoxcount."""
+        maps = self.spatial_levels([iteration])[0]
+        return [maps[0], maps[1]]
+
+    def spatial_levels(self, iterations):
+        """Return the (2, h, w) maps of several iterations.
+
+        Missing scales are computed together: a single one with the parallel
+        spatial engine, several in one pass of the multi-scale pyramid, whose
+        finer levels are kept as well.
+        """
+        iterations = [int(iteration) for iteration in iterations]
+        missing = sorted(set(iteration for iteration in iterations if iteration not in self._maps))
+        if len(missing) == 1:
+            self._maps[missing[0]] = np.array(self._count_spatial(missing[0]))
+        elif missing:
+            if _numba_enabled():
+                from .core import spacialBoxcount_pyramid
+                for iteration, maps in enumerate(spacialBoxcount_pyramid(self.array, missing[-1] + 1, self.maxvalue)):
+                    self._maps.setdefault(iteration, np.array(maps))
+            else:
+                for iteration in missing:
+                    self._maps[iteration] = np.array(self._count_spatial(iteration))
+        return [self._maps[iteration] for iteration in iterations]
+
+    def _count_spatial(self, iteration):
+        if _numba_enabled():
+            from .core import spacialBoxcount_parallel
+            return spacialBoxcount_parallel(self.array, iteration, self.maxvalue, self.num_threads)
+        from .vectorized import spacialBoxcount_numpy
+        return spacialBoxcount_numpy(self.array, iteration, self.maxvalue)
+
+    def global_boxcounts(self, box_sizes):
+        """Return (counts, lacunarities) arrays of the whole array for box_sizes."""
+        box_sizes = [int(bs) for bs in box_sizes]
+        missing = sorted(set(bs for bs in box_sizes if bs not in self._global))
+        if missing:
+            counts, lacunarities = _global_boxcounts(self.array, missing, self.maxvalue)
+            for bs, counted, lacunarity in zip(missing, counts, lacunarities):
+                self._global[bs] = (int(counted), float(lacunarity))
+        counts = np.array([self._global[bs][0] for bs in box_sizes], dtype=np.int64)
+        lacunarities = np.array([self._global[bs][1] for bs in box_sizes])
+        return counts, lacunarities
+
+    def single(self, box_size=8):
+        """Return the 'single' mode result {'boxcount': ..., 'lacunarity': ...} of boxcount_from_array."""
+        counts, lacunarities = self.global_boxcounts([box_size])
+        return {'boxcount': int(counts[0]), 'lacunarity': float(lacunarities[0])}
+
+    def lacunarity_curve(self, box_sizes=None):
+        """Return the global lacunarity per box size, defaults to the fractal dimension box sizes."""
+        return self.global_boxcounts(self.default_box_sizes() if box_sizes is None else box_sizes)[1]
+
+    def default_box_sizes(self):
+        """Powers of two from 2 up to the shorter side of the array."""
+        return [2**i for i in range(1, int(np.log2(min(self.array.shape))) + 1)]
+
+    def fractal_dimension(self, box_sizes=None):
+        """Return the box counting fractal dimension, as fractal_dimension_from_array."""
+        if box_sizes is None:
+            box_sizes = self.default_box_sizes()
+        counts, _ = self.global_boxcounts(box_sizes)
+        return _fit_dimension(list(box_sizes), list(counts))
@@ -0,0 +1,128 @@
+import numpy as np
+
+
+class SpacialBoxcountStream:
+    """Streaming spatial box count over horizontal bands of rows.
+
+    Bands of any height are pushed as they arrive (from a decoder, a socket,
+    a line-scan camera or a memmap). Every map row whose boxes are complete is
+    counted right away and returned; only the rows of not yet complete boxes
+    are kept, at most max(boxsize) - 1 rows of the image width.
+
+    Stacking the rows emitted for one scale, including the empty trailing row
+    from close(), gives exactly spacialBoxcount(image, iteration, MaxValue).
+
+    Parameters:
+        width (int): Image width, the number of columns of every band.
+        scales (iterable): Indices into the box sizes [2, 4, ..., 1024].
+        MaxValue (int): Maximum value, 256 for 8-bit data.
+        num_threads (int): Threads for the spatial engine, defaults to all cores.
+
+    Example:
+        stream = SpacialBoxcountStream(width, scales=range(4))
+        for band in bands:
+            for iteration, row, BoxCountR_row, spa_Lac_row in stream.push(band):
+                ...
+        stream.close()
+    """
+
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+    def __init__(self, width, scales=(0,), MaxValue=256, num_threads=None):
+        self.width = int(width)
+        self.scales = [int(iteration) for iteration in scales]
+        self.MaxValue = MaxValue
+        self.num_threads = num_threads
+        from .api import _numba_enabled
+        self._numba = _numba_enabled()
+        # rows pushed so far and the next map row per scale
+        self.rows_seen = 0
+        self.next_row = {iteration: 0 for iteration in self.scales}
+        # _buffer[:_fill] holds image rows from _buffer_start on; rows before
+        # _keep_from are done and dropped when the buffer has to make room.
+        self._buffer = None
+        self._buffer_start = 0
+        self._fill = 0
+        self._keep_from = 0
+        self.closed = False
+
+    def push(self, band):
+        """Add a band of rows and return the map rows it completes.
+
+        Parameters:
+            band (np.ndarray): (rows, width) array; rows may be any number.
+
+        Returns:
+            list: (iteration, row, BoxCountR_row, spa_Lac_row) tuples, in order of
+                row per scale; each map row has width // boxsize + 1 entries.
+        """
+        if self.closed:
+            raise ValueError("push on a closed stream")
+        band = np.asarray(band)
+        if band.ndim != 2 or band.shape[1] != self.width:
+            raise ValueError("bands must have shape (rows, %d)" % self.width)
+        self._append(band)
+        self.rows_seen += band.shape[0]
+        emitted = []
+        for iteration in self.scales:
+            emitted.extend(self._count_complete_rows(iteration))
+        self._keep_from = min((self.next_row[iteration] * self.Boxsize[iteration] for iteration in self.scales),
+                              default=self.rows_seen)
+        return emitted
+
+    def _append(self, band):
+        """Copy band behind the buffered rows, dropping done rows or growing the buffer if needed."""
+        if self._buffer is None:
+            self._buffer = np.empty((max(band.shape[0], 1), self.width), dtype=band.dtype)
+        if self._fill + band.shape[0] > self._buffer.shape[0]:
+            live = self._buffer[self._keep_from - self._buffer_start:self._fill]
+            capacity = max(self._buffer.shape[0], 2 * (live.shape[0] + band.shape[0]))
+            buffer = np.empty((capacity, self.width), dtype=self._buffer.dtype)
+            buffer[:live.shape[0]] = live
+            self._buffer, self._buffer_start, self._fill = buffer, self._keep_from, live.shape[0]
+        self._buffer[self._fill:self._fill + band.shape[0]] = band
+        self._fill += band.shape[0]
+
+    def close(self):
+        """End the stream and return the empty trailing map row of every scale.
+
+        Rows left in incomplete boxes are not counted, as in spacialBoxcount.
+        """
+        emitted = []
+        if not self.closed:
+            for iteration in self.scales:
+                boxsize = self.Boxsize[iteration]
+                zeros = np.zeros(self.width // boxsize + 1)
+                emitted.append((iteration, self.rows_seen // boxsize, zeros, zeros.copy()))
+            self.closed = True
+            self._buffer = None
+        return emitted
+
+    def _count_complete_rows(self, iteration):
+        boxsize = self.Boxsize[iteration]
+        first, last = self.next_row[iteration], self.rows_seen // boxsize
+        if last <= first:
+            return []
+        start = first * boxsize - self._buffer_start
+        strip = self._buffer[start:start + (last - first) * boxsize]
+        if self._numba:
+            from .core import spacialBoxcount_parallel
+            BoxCountR_map, spa_Lac_map = spacialBoxcount_parallel(strip, iteration, self.MaxValue, self.num_threads)
+        else:
+            from .vectorized import spacialBoxcount_numpy
+            BoxCountR_map, spa_Lac_map = spacialBoxcount_numpy(strip, iteration, self.MaxValue)
+        self.next_row[iteration] = last
+        return [(iteration, first + i, BoxCountR_map[i], spa_Lac_map[i]) for i in range(last - first)]
+
+
+def stream_boxcount(bands, width, scales=(0,), MaxValue=256, num_threads=None):
+    """Run a SpacialBoxcountStream over an iterable of bands.
+
+    Yields:
+        tuple: (iteration, row, BoxCountR_row, spa_Lac_row) as soon as each row is final,
+            ending with the empty trailing row of every scale.
+    """
+    stream = SpacialBoxcountStream(width, scales, MaxValue, num_threads)
+    for band in bands:
+        yield from stream.push(band)
+    yield from stream.close()
@@ -1,6 +1,5 @@
 import linecache
 import sys
-import matplotlib.pyplot as plt
 
 
 def PrintException():
@@ -16,6 +15,7 @@ def PrintException():
 
 def show_np_array_as_image(np2d_array, title, colormap):
     """Display a numpy 2D array as an image with a specific colormap."""
+    import matplotlib.pyplot as plt
     plt.figure()
     plt.imshow(np2d_array, interpolation='none', cmap=colormap)
     plt.title(title)
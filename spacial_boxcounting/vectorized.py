@@ -0,0 +1,99 @@
+import numpy as np
+
+# Pure NumPy versions of the core kernels for environments where numba is
+# missing, disabled or too slow to import. Results match spacialBoxcount and
+# Z_boxcount; this module must not import numba.
+
+# Upper bound for the per-chunk bin index buffer, in elements.
+_CHUNK_ELEMENTS = 1 << 22
+
+
+def _index_dtype(dtype, boxsize):
+    """Bin index dtype: integer data keeps its dtype (widened to hold boxsize), anything else uses float64."""
+    if np.issubdtype(dtype, np.integer):
+        return np.result_type(dtype, np.min_scalar_type(boxsize))
+    return np.float64
+
+
+def _bin_indexes(values, boxsize, out):
+    """Write floor(values / boxsize) into out without float temporaries for integer data."""
+    if np.issubdtype(values.dtype, np.integer):
+        np.floor_divide(values, out.dtype.type(boxsize), out=out)
+    else:
+        np.divide(values, boxsize, out=out)
+        np.floor(out, out=out)
+    return out
+
+
+def _tile_boxcounts(Boxindexes, boxsize, MaxValue):
+    """Occupied bin count and lacunarity for every row of a (tiles, pixels) bin index array.
+
+    Boxindexes is sorted in place.
+    """
+    NumTiles, NumPixels = Boxindexes.shape
+    Boxindexes.sort(axis=1)
+    # A run of equal bin indexes within a tile is one occupied bin.
+    RunStart = np.ones((NumTiles, NumPixels), dtype=bool)
+    RunStart[:, 1:] = Boxindexes[:, 1:] != Boxindexes[:, :-1]
+    RunPositions = np.flatnonzero(RunStart)
+    RunLengths = np.diff(np.append(RunPositions, NumTiles * NumPixels))
+    RunTiles = RunPositions // NumPixels
+    counted_Boxes = np.bincount(RunTiles, minlength=NumTiles)
+    SumSquares = np.bincount(RunTiles, weights=RunLengths * RunLengths, minlength=NumTiles)
+    Lacunarity = _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, int(MaxValue / boxsize))
+    return counted_Boxes, Lacunarity
+
+
+def _moment_lacunarity(counted_Boxes, NumPixels, SumSquares, Max_Num_Boxes):
+    """Lacunarities from the occupied bin counts and the sums and sums of squares of the bin counts, elementwise."""
+    # Same population as Z_boxcount: a leading 0.0, one entry per occupied bin
+    # and the empty bins up to MaxValue / boxsize.
+    Num_empty_Boxes = np.maximum(Max_Num_Boxes - counted_Boxes, 0)
+    NumEntries = 1 + counted_Boxes + Num_empty_Boxes
+    mean = NumPixels / NumEntries
+    SquaredDeviation = np.maximum(SumSquares - NumPixels * mean, 0.0)
+    standardDeviation = np.sqrt(SquaredDeviation / NumEntries)
+    return (standardDeviation / mean) ** 2
+
+
+def Z_boxcount_numpy(GlidingBox, boxsize, MaxValue):
+    """Compute the box count and lacunarity for a given gliding box with NumPy only."""
+    GlidingBox = np.asarray(GlidingBox)
+    Boxindexes = np.empty((1, GlidingBox.size), dtype=_index_dtype(GlidingBox.dtype, boxsize))
+    _bin_indexes(GlidingBox.reshape(1, -1), boxsize, Boxindexes)
+    counted_Boxes, Lacunarity = _tile_boxcounts(Boxindexes, boxsize, MaxValue)
+    return int(counted_Boxes[0]), float(Lacunarity[0])
+
+
+def spacialBoxcount_numpy(npOutputFile, iteration, MaxValue):
+    """Compute the spatial box count ratio and lacunarity for an image array with NumPy only.
+
+    The image is viewed as (ny, boxsize, nx, boxsize) blocks and every tile of a band
+    of tile rows is counted at once with batched sort and bincount operations.
+
+    Returns:
+        list: [BoxCountR_map, spa_Lac_map], equal to core.spacialBoxcount(npOutputFile, iteration, MaxValue).
+    """
+    Boxsize = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    boxsize = Boxsize[iteration]
+    YRange, XRange = npOutputFile.shape
+    maxIndexY = int(YRange / boxsize) + 1
+    maxIndexX = int(XRange / boxsize) + 1
+    BoxCountR_map = np.zeros((maxIndexY, maxIndexX))
+    spa_Lac_map = np.zeros((maxIndexY, maxIndexX))
+    nY, nX = YRange // boxsize, XRange // boxsize
+    if nY == 0 or nX == 0:
+        return [BoxCountR_map, spa_Lac_map]
+    Max_Num_Boxes = int(MaxValue / boxsize)
+    blocks = npOutputFile[:nY * boxsize, :nX * boxsize].reshape(nY, boxsize, nX, boxsize)
+    index_dtype = _index_dtype(npOutputFile.dtype, boxsize)
+    RowsPerChunk = max(1, _CHUNK_ELEMENTS // (nX * boxsize * boxsize))
+    for Y0 in range(0, nY, RowsPerChunk):
+        Y1 = min(nY, Y0 + RowsPerChunk)
+        # The transposed block view is written straight into tile-major order.
+        Boxindexes = np.empty((Y1 - Y0, nX, boxsize, boxsize), dtype=index_dtype)
+        _bin_indexes(blocks[Y0:Y1].transpose(0, 2, 1, 3), boxsize, Boxindexes)
+        counted_Boxes, Lacunarity = _tile_boxcounts(Boxindexes.reshape(-1, boxsize * boxsize), boxsize, MaxValue)
+        BoxCountR_map[Y0:Y1, :nX] = (counted_Boxes / Max_Num_Boxes).reshape(Y1 - Y0, nX)
+        spa_Lac_map[Y0:Y1, :nX] = Lacunarity.reshape(Y1 - Y0, nX)
+    return [BoxCountR_map, spa_Lac_map]
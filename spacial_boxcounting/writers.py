@@ -0,0 +1,111 @@
+import json
+import os
+
+import numpy as np
+
+# Incremental sinks for (path, result) pairs from batch.iter_batch_boxcount.
+# Every writer is a context manager; write() stores one result right away.
+
+
+class JSONLinesWriter:
+    """Write scalar results as JSON Lines, one object per file.
+
+    'single' mode results become {"path": ..., "boxcount": ..., "lacunarity": ...},
+    failures {"path": ..., "error": ...}. Spatial maps are rejected, use MapWriter.
+    """
+
+    def __init__(self, path, mode='w'):
+        self.path = path
+        self._file = open(path, mode)
+
+    def write(self, path, result):
+        if isinstance(result, str):
+            record = {'path': path, 'error': result}
+        elif isinstance(result, dict):
+            record = {'path': path}
+            record.update({key: _to_json(value) for key, value in result.items()})
+        else:
+            raise TypeError("JSONLinesWriter takes scalar results, write spatial maps with MapWriter")
+        self.write_record(record)
+
+    def write_record(self, record):
+        """Append one JSON object and flush, so the file is readable while the batch runs."""
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MapWriter:
+    """Write spatial maps to a directory, one .npz or a pair of .npy files per input.
+
+    format='npz' stores <name>.npz with the arrays BoxCountR_map and spa_Lac_map;
+    format='npy' stores <name>.BoxCountR.npy and <name>.Lac.npy, which can be
+    memory-mapped later. <name> is the input file name. Every write is also
+    recorded in index.jsonl ({"path", "files"} or, for failures and scalar
+    results, the same record JSONLinesWriter would write).
+    """
+
+    def __init__(self, directory, format='npz'):
+        if format not in ('npz', 'npy'):
+            raise ValueError("format must be 'npz' or 'npy'")
+        self.directory = directory
+        self.format = format
+        os.makedirs(directory, exist_ok=True)
+        self._index = JSONLinesWriter(os.path.join(directory, 'index.jsonl'), mode='a')
+
+    def write(self, path, result):
+        if isinstance(result, (str, dict)):
+            self._index.write(path, result)
+            return
+        BoxCountR_map, spa_Lac_map = result
+        name = os.path.join(self.directory, os.path.basename(path))
+        if self.format == 'npz':
+            files = [name + '.npz']
+            np.savez(files[0], BoxCountR_map=BoxCountR_map, spa_Lac_map=spa_Lac_map)
+        else:
+            files = [name + '.BoxCountR.npy', name + '.Lac.npy']
+            np.save(files[0], BoxCountR_map)
+            np.save(files[1], spa_Lac_map)
+        self._index.write_record({'path': path, 'files': [os.path.basename(f) for f in files]})
+
+    def close(self):
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_writer(output, format=None):
+    """Return a writer for output: JSON Lines for a .jsonl path, a MapWriter directory otherwise.
+
+    Parameters:
+        output (str): Output file or directory.
+        format (str): 'jsonl', 'npz' or 'npy'; inferred from output when None.
+    """
+    format = output_format(output, format)
+    if format == 'jsonl':
+        return JSONLinesWriter(output)
+    return MapWriter(output, format)
+
+
+def output_format(output, format=None):
+    """Return the format open_writer uses for output: format, or 'jsonl' for a .jsonl path and 'npz' otherwise."""
+    if format is None:
+        format = 'jsonl' if output.endswith('.jsonl') else 'npz'
+    return format
+
+
+def _to_json(value):
+    # numpy scalars are not JSON serializable
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import pytest
+
+from spacial_boxcounting.api import boxcount_from_array
+from spacial_boxcounting.batch import batch_boxcount, iter_batch_boxcount
+from spacial_boxcounting.writers import MapWriter, open_writer, output_format
+
+
+def test_batch_boxcount_jobs_match_serial(tmp_path):
+    for i, size in enumerate([16, 40, 24, 64, 8]):
+        np.save(str(tmp_path / f'arr{i}.npy'), np.random.randint(0, 256, size=(size, size)).astype(np.uint8))
+    (tmp_path / 'broken.npy').write_bytes(b'not an array')
+    serial = batch_boxcount(str(tmp_path), mode='single')
+    parallel = batch_boxcount(str(tmp_path), mode='single', jobs=2, chunksize=2)
+    assert serial == parallel
+    assert len(parallel) == 6
+    assert parallel['broken.npy'].startswith('Error:')
+
+
+def test_iter_batch_boxcount_streams_paths(tmp_path):
+    for i in range(3):
+        np.save(str(tmp_path / f'arr{i}.npy'), np.random.randint(0, 256, size=(16, 16)).astype(np.uint8))
+    results = list(iter_batch_boxcount(str(tmp_path), mode='single', file_pattern='*.npy'))
+    assert sorted(path for path, _ in results) == sorted(str(tmp_path / f'arr{i}.npy') for i in range(3))
+    assert all(isinstance(result, dict) for _, result in results)
+
+
+def test_jsonl_writer(tmp_path):
+    output = str(tmp_path / 'out.jsonl')
+    with open_writer(output) as writer:
+        writer.write('a.bmp', {'boxcount': np.int64(3), 'lacunarity': 0.5})
+        writer.write('b.bmp', 'Error: broken')
+        with pytest.raises(TypeError):
+            writer.write('c.bmp', [np.zeros((2, 2)), np.zeros((2, 2))])
+    records = [json.loads(line) for line in open(output)]
+    assert records == [{'path': 'a.bmp', 'boxcount': 3, 'lacunarity': 0.5}, {'path': 'b.bmp', 'error': 'Error: broken'}]
+
+
+def test_cli_rejects_jsonl_for_spatial_maps_before_processing(tmp_path, monkeypatch):
+    from spacial_boxcounting import cli
+    assert output_format('out.jsonl') == 'jsonl' and output_format('maps', 'npy') == 'npy'
+    monkeypatch.setattr(cli, '_iter_results', lambda *args, **kwargs: pytest.fail("batch started"))
+    monkeypatch.setattr('sys.argv', ['cli', 'batch', '--folder', str(tmp_path), '--output', str(tmp_path / 'out.jsonl')])
+    with pytest.raises(SystemExit):
+        cli.main()
+
+
+@pytest.mark.parametrize("format", ['npz', 'npy'])
+def test_map_writer(tmp_path, format):
+    arr = np.random.randint(0, 256, size=(16, 16)).astype(np.uint8)
+    np.save(str(tmp_path / 'in.npy'), arr)
+    out = tmp_path / 'maps'
+    with MapWriter(str(out), format) as writer:
+        for path, result in iter_batch_boxcount(str(tmp_path), file_pattern='*.npy'):
+            writer.write(path, result)
+        writer.write('broken.npy', 'Error: broken')
+    expected = boxcount_from_array(arr)
+    if format == 'npz':
+        stored = np.load(str(out / 'in.npy.npz'))
+        assert np.array_equal(stored['BoxCountR_map'], expected[0]) and np.array_equal(stored['spa_Lac_map'], expected[1])
+    else:
+        assert np.array_equal(np.load(str(out / 'in.npy.BoxCountR.npy')), expected[0])
+        assert np.array_equal(np.load(str(out / 'in.npy.Lac.npy')), expected[1])
+    index = [json.loads(line) for line in open(str(out / 'index.jsonl'))]
+    assert index[0]['path'] == str(tmp_path / 'in.npy') and index[1]['error'] == 'Error: broken'
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+
+from spacial_boxcounting.api import boxcount_from_file, fractal_dimension_from_file
+from spacial_boxcounting.batch import batch_boxcount
+from spacial_boxcounting.cache import ResultCache
+
+
+def _save(path, size=32, seed=0):
+    arr = np.random.RandomState(seed).randint(0, 256, size=(size, size)).astype(np.uint8)
+    np.save(str(path), arr)
+    return str(path)
+
+
+def test_maps_roundtrip_and_hit(tmp_path):
+    path = _save(tmp_path / 'a.npy')
+    cache = ResultCache(str(tmp_path / 'cache'))
+    expected = boxcount_from_file(path)
+    first = boxcount_from_file(path, cache=cache)
+    key = cache.key(path, function='boxcount_from_file', mode='spatial', hilbert=False, curve=None,
+                    maxvalue=256, reduce=1, color=None)
+    assert cache.get(key) is not None
+    second = boxcount_from_file(path, cache=str(tmp_path / 'cache'))
+    for result in (first, second):
+        assert np.array_equal(result[0], expected[0]) and np.array_equal(result[1], expected[1])
+
+
+def test_hit_fills_out(tmp_path):
+    path = _save(tmp_path / 'a.npy')
+    cache = ResultCache(str(tmp_path / 'cache'))
+    expected = boxcount_from_file(path, cache=cache)
+    out = [np.empty_like(expected[0]), np.empty_like(expected[1])]
+    result = boxcount_from_file(path, cache=cache, out=out)
+    assert result is out
+    assert np.array_equal(out[0], expected[0]) and np.array_equal(out[1], expected[1])
+
+
+def test_key_depends_on_content_and_params(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    path = _save(tmp_path / 'a.npy')
+    key = cache.key(path, mode='spatial')
+    assert cache.key(path, mode='single') != key
+    _save(tmp_path / 'a.npy', seed=1)
+    assert cache.key(path, mode='spatial') != key
+
+
+def test_fast_key_uses_stat(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), fast=True)
+    path = _save(tmp_path / 'a.npy')
+    key = cache.key(path, mode='single')
+    assert cache.key(path, mode='single') == key
+    os.utime(path, ns=(0, 0))
+    assert cache.key(path, mode='single') != key
+
+
+def test_scalar_results(tmp_path):
+    path = _save(tmp_path / 'a.npy', size=64)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    expected = fractal_dimension_from_file(path)
+    assert fractal_dimension_from_file(path, cache=cache) == expected
+    assert fractal_dimension_from_file(path, cache=cache) == expected
+    single = boxcount_from_file(path, mode='single', cache=cache)
+    assert boxcount_from_file(path, mode='single', cache=cache) == single
+
+
+def test_eviction_keeps_recent_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=6000)
+    maps = [np.zeros((16, 16)), np.zeros((16, 16))]
+    for key in ('%064x' % i for i in range(4)):
+        cache.put(key, maps)
+        os.utime(cache._entry_path(key), (0, 0) if key.endswith('0') else None)
+    assert cache._size <= 6000
+    assert cache.get('%064x' % 0) is None
+    assert cache.get('%064x' % 3) is not None
+    cache.clear()
+    assert cache.get('%064x' % 3) is None and cache._size == 0
+
+
+def test_batch_with_cache(tmp_path):
+    for i in range(3):
+        _save(tmp_path / f'arr{i}.npy', size=16, seed=i)
+    cache_dir = str(tmp_path.parent / (tmp_path.name + '_cache'))
+    expected = batch_boxcount(str(tmp_path), mode='single')
+    assert batch_boxcount(str(tmp_path), mode='single', cache=cache_dir) == expected
+    assert batch_boxcount(str(tmp_path), mode='single', jobs=2, cache=cache_dir) == expected
+
+
+def _cache_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+
+
+def test_pooled_batch_stays_within_max_bytes(tmp_path):
+    for i in range(40):
+        _save(tmp_path / f'arr{i}.npy', size=32, seed=i)
+    cache_dir = str(tmp_path.parent / (tmp_path.name + '_cache'))
+    cache = ResultCache(cache_dir, max_bytes=100000)
+    batch_boxcount(str(tmp_path), jobs=2, chunksize=1, cache=cache)
+    assert 0 < _cache_bytes(cache_dir) <= 100000
+
+
+def test_eviction_skips_temporary_files(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=1)
+    cache.put('%064x' % 0, [np.zeros((16, 16))])
+    tmp = os.path.join(os.path.dirname(cache._entry_path('%064x' % 1)), 'in-flight.tmp')
+    os.makedirs(os.path.dirname(tmp), exist_ok=True)
+    with open(tmp, 'wb') as f:
+        f.write(b'\0' * 4096)
+    cache.clear()
+    assert os.path.exists(tmp)
+
+
+def test_failed_write_keeps_result(tmp_path, monkeypatch):
+    import spacial_boxcounting.cache as cache_module
+
+    def failing_write(path, write):
+        raise OSError(28, 'No space left on device')
+
+    path = _save(tmp_path / 'a.npy')
+    cache = ResultCache(str(tmp_path / 'cache'))
+    monkeypatch.setattr(cache_module, '_atomic_write', failing_write)
+    expected = boxcount_from_file(path)
+    result = boxcount_from_file(path, cache=cache)
+    assert np.array_equal(result[0], expected[0]) and np.array_equal(result[1], expected[1])
+    assert cache.put('%064x' % 0, {'boxcount': 1}) is False
+
+
+def test_size_is_tracked_without_rescanning(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    cache.put('%064x' % 0, {'boxcount': 1})
+    scans = []
+    monkeypatch.setattr(ResultCache, 'evict', lambda self, max_bytes=None: scans.append(max_bytes))
+    for i in range(1, 4):
+        cache.put('%064x' % i, {'boxcount': i})
+    assert scans == [] and cache._size > 0
+
+
+def test_color_results_keep_their_type(tmp_path):
+    from PIL import Image
+    rgb = np.random.RandomState(0).randint(0, 256, size=(32, 32, 3)).astype(np.uint8)
+    path = str(tmp_path / 'rgb.png')
+    Image.fromarray(rgb).save(path)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    for color in ('channels', 'joint'):
+        expected = boxcount_from_file(path, color=color)
+        boxcount_from_file(path, color=color, cache=cache)
+        cached = boxcount_from_file(path, color=color, cache=cache)
+        assert type(cached) is type(expected)
+        if isinstance(expected, np.ndarray):
+            assert cached.shape == expected.shape and np.array_equal(cached, expected)
+        else:
+            assert all(np.array_equal(c, e) for c, e in zip(cached, expected))
@@ -0,0 +1,258 @@
+import numpy as np
+import pytest
+
+from spacial_boxcounting.core import Z_boxcount, Z_boxcount_hist, spacialBoxcount
+
+
+def _unique_append_Z_boxcount(GlidingBox, boxsize, MaxValue):
+    """The original np.unique / np.append formulation of Z_boxcount."""
+    Boxindexes = np.floor(GlidingBox / boxsize)
+    unique_Boxes = np.unique(Boxindexes)
+    SumPixInBox = np.array([0.0])
+    for unique_BoxIndex in unique_Boxes:
+        SumPixInBox = np.append(SumPixInBox, np.sum(Boxindexes == unique_BoxIndex))
+    Num_empty_Boxes = int(MaxValue / boxsize) - len(unique_Boxes)
+    if Num_empty_Boxes >= 1:
+        SumPixInBox = np.append(SumPixInBox, np.zeros(Num_empty_Boxes))
+    return len(unique_Boxes), np.power(np.std(SumPixInBox) / np.mean(SumPixInBox), 2)
+
+
+@pytest.mark.parametrize("boxsize", [2, 16, 256, 512])
+def test_Z_boxcount_matches_unique_append_formulation(boxsize):
+    arr = np.random.randint(0, 256, size=(48, 40)).astype(np.uint8)
+    arr[:8] = 7  # a dominant bin
+    counted, lacunarity = Z_boxcount(arr, boxsize, 256)
+    expected_counted, expected_lacunarity = _unique_append_Z_boxcount(arr, boxsize, 256)
+    assert counted == expected_counted
+    assert np.isclose(lacunarity, expected_lacunarity)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.float64])
+@pytest.mark.parametrize("boxsize", [2, 8, 64])
+def test_Z_boxcount_hist_matches_Z_boxcount(dtype, boxsize):
+    arr = np.random.randint(0, 256, size=(64, 64)).astype(dtype)
+    counted, lacunarity = Z_boxcount_hist(arr, boxsize, 256)
+    expected_counted, expected_lacunarity = Z_boxcount(arr, boxsize, 256)
+    assert counted == expected_counted
+    assert np.isclose(lacunarity, expected_lacunarity)
+
+
+def test_Z_boxcount_hist_values_beyond_maxvalue():
+    # Bins above MaxValue / boxsize are counted, as with np.unique
+    arr = np.array([[0, 300], [5, 1000]], dtype=np.int64)
+    assert Z_boxcount_hist(arr, 4, 256) == pytest.approx(Z_boxcount(arr, 4, 256))
+
+
+def test_spacialBoxcount_matches_Z_boxcount_per_tile():
+    arr = np.random.randint(0, 256, size=(40, 52)).astype(np.uint8)
+    iteration, boxsize = 2, 8
+    BoxCountR_map, spa_Lac_map = spacialBoxcount(arr, iteration, 256)
+    assert BoxCountR_map.shape == (40 // boxsize + 1, 52 // boxsize + 1)
+    for y in range(40 // boxsize):
+        for x in range(52 // boxsize):
+            box = arr[y*boxsize:(y+1)*boxsize, x*boxsize:(x+1)*boxsize]
+            counted, lacunarity = Z_boxcount(box, boxsize, 256)
+            assert BoxCountR_map[y, x] == counted / (256 // boxsize)
+            assert np.isclose(spa_Lac_map[y, x], lacunarity)
+    assert not BoxCountR_map[-1].any() and not BoxCountR_map[:, -1].any()
+
+
+@pytest.mark.parametrize("num_threads", [None, 1, 2])
+def test_spacialBoxcount_parallel_matches_spacialBoxcount(num_threads):
+    from spacial_boxcounting.core import spacialBoxcount_parallel
+    arr = np.random.randint(0, 256, size=(70, 100)).astype(np.uint8)
+    for iteration in range(4):
+        result = spacialBoxcount_parallel(arr, iteration, 256, num_threads=num_threads)
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert np.array_equal(result[0], expected[0])
+        assert np.array_equal(result[1], expected[1])
+
+
+def test_spacialBoxcount_sliding_stride_boxsize_matches_spacialBoxcount():
+    from spacial_boxcounting.core import spacialBoxcount_sliding
+    arr = np.random.randint(0, 256, size=(40, 52)).astype(np.uint8)
+    for iteration, boxsize in enumerate([2, 4, 8]):
+        result = spacialBoxcount_sliding(arr, iteration, 256, stride=boxsize)
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert np.array_equal(result[0], expected[0])
+        assert np.allclose(result[1], expected[1])
+
+
+@pytest.mark.parametrize("stride, high", [(1, 64), (3, 64), (2, 2e8)])
+def test_spacialBoxcount_sliding_matches_Z_boxcount_per_window(stride, high):
+    from spacial_boxcounting.core import spacialBoxcount_sliding
+    arr = np.random.uniform(0, high, size=(21, 25))
+    if high < 256:
+        arr = arr.astype(np.uint8)
+    iteration, boxsize = 2, 8
+    BoxCountR_map, spa_Lac_map = spacialBoxcount_sliding(arr, iteration, 256, stride=stride)
+    assert BoxCountR_map.shape == (21 // stride + 1, 25 // stride + 1)
+    for i in range((21 - boxsize) // stride + 1):
+        for j in range((25 - boxsize) // stride + 1):
+            box = arr[i*stride:i*stride+boxsize, j*stride:j*stride+boxsize]
+            counted, lacunarity = Z_boxcount(box, boxsize, 256)
+            assert BoxCountR_map[i, j] == counted / (256 // boxsize)
+            assert np.isclose(spa_Lac_map[i, j], lacunarity)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.int16, np.int64, np.float32])
+@pytest.mark.parametrize("boxsize", [4, 6, 32])
+def test_integer_fast_path_matches_float_path(dtype, boxsize):
+    low = -300 if np.issubdtype(dtype, np.signedinteger) or dtype == np.float32 else 0
+    high = 256 if dtype == np.uint8 else 1000
+    arr = np.random.randint(low, high, size=(32, 32)).astype(dtype)
+    expected_counted, expected_lacunarity = _unique_append_Z_boxcount(arr.astype(np.float64), boxsize, 256)
+    for kernel in (Z_boxcount, Z_boxcount_hist):
+        counted, lacunarity = kernel(arr, boxsize, 256)
+        assert counted == expected_counted
+        assert np.isclose(lacunarity, expected_lacunarity)
+
+
+def test_wide_value_range_falls_back_to_sorting():
+    from spacial_boxcounting.core import spacialBoxcount_parallel
+    arr = np.random.uniform(0, 2e8, size=(32, 40))
+    arr[:4, :4] = 7.0  # a dominant bin
+    for boxsize in (2, 8):
+        expected_counted, expected_lacunarity = _unique_append_Z_boxcount(arr, boxsize, 256)
+        counted, lacunarity = Z_boxcount_hist(arr, boxsize, 256)
+        assert counted == expected_counted and np.isclose(lacunarity, expected_lacunarity)
+    expected = [[Z_boxcount(arr[y * 8:(y + 1) * 8, x * 8:(x + 1) * 8], 8, 256) for x in range(5)] for y in range(4)]
+    for maps in (spacialBoxcount(arr, 2, 256), spacialBoxcount_parallel(arr, 2, 256, num_threads=2)):
+        assert np.array_equal(maps[0][:4, :5], [[c / 32 for c, _ in row] for row in expected])
+        assert np.allclose(maps[1][:4, :5], [[l for _, l in row] for row in expected])
+
+
+@pytest.mark.parametrize("high", [256, 2e8])
+def test_global_boxcount_pyramid_matches_Z_boxcount_hist(high):
+    from spacial_boxcounting.core import global_boxcount_pyramid
+    arr = np.random.uniform(-3, high, size=(40, 36))
+    arr[:6] = 7.5  # a dominant bin
+    shifts = np.array([3, 1, 5], dtype=np.int64)
+    counts, lacunarities = global_boxcount_pyramid(arr, shifts, 256)
+    for counted, lacunarity, shift in zip(counts, lacunarities, shifts):
+        expected_counted, expected_lacunarity = Z_boxcount_hist(arr, 1 << shift, 256)
+        assert counted == expected_counted and np.isclose(lacunarity, expected_lacunarity)
+
+
+@pytest.mark.parametrize("dtype, high", [(np.uint8, 256), (np.float32, 256), (np.float64, 2e8)])
+def test_spacialBoxcount_stack_matches_spacialBoxcount(dtype, high):
+    from spacial_boxcounting.core import spacialBoxcount_stack
+    stack = np.random.uniform(0, high, size=(5, 36, 44)).astype(dtype)
+    iterations = [3, 0, 2, 0]
+    result = spacialBoxcount_stack(stack, iterations, 256, num_threads=2)
+    assert result.shape == (5, 4, 2, 36 // 2 + 1, 44 // 2 + 1)
+    for n in range(5):
+        for s, iteration in enumerate(iterations):
+            expected = spacialBoxcount(stack[n], iteration, 256)
+            h, w = expected[0].shape
+            assert np.array_equal(result[n, s, 0, :h, :w], expected[0])
+            assert np.allclose(result[n, s, 1, :h, :w], expected[1])
+            assert not result[n, s, :, h:].any() and not result[n, s, :, :, w:].any()
+
+
+def test_spacialBoxcount_stack_fills_out():
+    from spacial_boxcounting.core import spacialBoxcount_stack
+    stack = np.random.randint(0, 256, size=(3, 16, 16)).astype(np.uint8)
+    out = np.full((3, 1, 2, 9, 9), np.nan)
+    assert spacialBoxcount_stack(stack, [0], 256, out=out) is out
+    assert np.array_equal(out[1, 0, 0], spacialBoxcount(stack[1], 0, 256)[0])
+    with pytest.raises(ValueError):
+        spacialBoxcount_stack(stack, [0], 256, out=np.empty((3, 1, 2, 8, 8)))
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16, np.float64])
+def test_global_boxcount_ragged_matches_Z_boxcount_hist(dtype):
+    from spacial_boxcounting.api import pack_patches
+    from spacial_boxcounting.core import global_boxcount_ragged
+    low = -300 if dtype != np.uint8 else 0
+    patches = [np.random.randint(low, 256, size=shape).astype(dtype)
+               for shape in [(5, 7), (1, 1), (0, 4), (30, 12), (3, 3), (16, 16)]]
+    pixels, offsets, shapes = pack_patches(patches)
+    box_sizes = [2, 3, 8, 64]
+    counts, lacunarities = global_boxcount_ragged(pixels, offsets, box_sizes, 256, shapes=shapes, num_threads=2)
+    assert counts.shape == lacunarities.shape == (6, 4)
+    for i, patch in enumerate(patches):
+        for s, bs in enumerate(box_sizes):
+            if patch.size == 0:
+                assert counts[i, s] == 0 and np.isnan(lacunarities[i, s])
+                continue
+            expected_counted, expected_lacunarity = Z_boxcount_hist(patch, bs, 256)
+            assert counts[i, s] == expected_counted
+            assert np.isclose(lacunarities[i, s], expected_lacunarity)
+
+
+@pytest.mark.parametrize("high", [256, 2e8])
+def test_global_boxcount_ragged_gcd_bins_and_wide_range(high):
+    from spacial_boxcounting.api import pack_patches
+    from spacial_boxcounting.core import global_boxcount_ragged
+    patches = [np.random.uniform(-high, high, size=shape) for shape in [(64, 64), (5, 7), (0, 3)]]
+    pixels, offsets, _ = pack_patches(patches)
+    box_sizes = [4, 6, 12, 64]
+    counts, lacunarities = global_boxcount_ragged(pixels, offsets, box_sizes, 256)
+    for i, patch in enumerate(patches[:2]):
+        for s, bs in enumerate(box_sizes):
+            expected_counted, expected_lacunarity = Z_boxcount(patch, bs, 256)
+            assert counts[i, s] == expected_counted
+            assert np.isclose(lacunarities[i, s], expected_lacunarity)
+    assert np.all(counts[2] == 0)
+
+
+def test_global_boxcount_ragged_validates_offsets():
+    from spacial_boxcounting.core import global_boxcount_ragged
+    pixels = np.zeros(10, dtype=np.uint8)
+    with pytest.raises(ValueError):
+        global_boxcount_ragged(pixels, [0, 4, 3, 10], [2], 256)
+    with pytest.raises(ValueError):
+        global_boxcount_ragged(pixels, [0, 4, 10], [2], 256, shapes=[(2, 2), (2, 2)])
+    counts, _ = global_boxcount_ragged(pixels[:0], [0], [2], 256)
+    assert counts.shape == (0, 1)
+
+
+def test_spacialBoxcount_channels_reads_interleaved_view():
+    from spacial_boxcounting.core import spacialBoxcount_channels
+    rgb = np.random.randint(0, 256, size=(37, 50, 3)).astype(np.uint8)
+    image = rgb.transpose(2, 0, 1)
+    result = spacialBoxcount_channels(image, 1, 256, num_threads=2)
+    assert result.shape == (3, 2, 37 // 4 + 1, 50 // 4 + 1)
+    for c in range(3):
+        expected = spacialBoxcount(np.ascontiguousarray(rgb[:, :, c]), 1, 256)
+        assert np.array_equal(result[c, 0], expected[0])
+        assert np.allclose(result[c, 1], expected[1])
+
+
+def test_spacialBoxcount_channels_wide_value_range():
+    from spacial_boxcounting.core import spacialBoxcount_channels
+    image = np.random.uniform(0, 2e8, size=(2, 20, 24))
+    image[1] = np.random.randint(0, 256, size=(20, 24))
+    result = spacialBoxcount_channels(image, 1, 256)
+    for c in range(2):
+        expected = spacialBoxcount(image[c], 1, 256)
+        assert np.array_equal(result[c, 0], expected[0])
+        assert np.allclose(result[c, 1], expected[1])
+
+
+def test_spacialBoxcount_joint_rejects_values_out_of_range():
+    from spacial_boxcounting.core import spacialBoxcount_joint
+    for image in (np.full((1, 8, 8), 2e8), np.full((3, 8, 8), -1, dtype=np.int16)):
+        with pytest.raises(ValueError):
+            spacialBoxcount_joint(image, 0, 256)
+
+
+def test_spacialBoxcount_joint_counts_occupied_value_cells():
+    from spacial_boxcounting.core import spacialBoxcount_joint
+    rgb = np.random.randint(0, 64, size=(24, 20, 3)).astype(np.uint8)
+    image = rgb.transpose(2, 0, 1)
+    iteration, boxsize = 1, 4
+    BoxCountR_map, spa_Lac_map = spacialBoxcount_joint(image, iteration, 256, num_threads=2)
+    Max_Num_Boxes = (256 // boxsize) ** 3
+    for y in range(24 // boxsize):
+        for x in range(20 // boxsize):
+            box = rgb[y*boxsize:(y+1)*boxsize, x*boxsize:(x+1)*boxsize].reshape(-1, 3) // boxsize
+            _, occupancy = np.unique(box, axis=0, return_counts=True)
+            population = np.concatenate(([0], occupancy, np.zeros(Max_Num_Boxes - len(occupancy))))
+            assert BoxCountR_map[y, x] == len(occupancy) / Max_Num_Boxes
+            assert np.isclose(spa_Lac_map[y, x], (np.std(population) / np.mean(population)) ** 2)
+    # one channel is the plain spatial box count
+    single = spacialBoxcount_joint(image[:1], iteration, 256)
+    expected = spacialBoxcount(np.ascontiguousarray(rgb[:, :, 0]), iteration, 256)
+    assert np.array_equal(single[0], expected[0]) and np.allclose(single[1], expected[1])
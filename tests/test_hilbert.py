@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from hilbertcurve.hilbertcurve import HilbertCurve
+
+from spacial_boxcounting.hilbert import hilbert_coordinates, hilbert_curve_transform, hilbert_index_table
+from spacial_boxcounting.io import _map_bytes_to_hilbert
+
+
+def _pointwise_hilbert_curve_transform(arr):
+    """Point-by-point reference using the hilbertcurve package."""
+    flat = arr.flatten()
+    n = flat.size
+    side = int(np.ceil(np.sqrt(n)))
+    p = 1
+    while (2**(2*p)) < n:
+        p += 1
+    hilbert = HilbertCurve(p, 2)
+    transformed = np.zeros((side, side), dtype=arr.dtype)
+    for idx in range(n):
+        x, y = hilbert.point_from_distance(idx)
+        if y < side and x < side:
+            transformed[y, x] = flat[idx]
+    return transformed
+
+
+@pytest.mark.parametrize("p", [1, 2, 3, 5])
+def test_hilbert_coordinates_match_hilbertcurve(p):
+    x0, x1 = hilbert_coordinates(p)
+    expected = np.array(HilbertCurve(p, 2).points_from_distances(range(4**p)))
+    assert np.array_equal(x0, expected[:, 0])
+    assert np.array_equal(x1, expected[:, 1])
+
+
+@pytest.mark.parametrize("shape", [(4, 4), (10, 10), (7, 5), (33, 3)])
+def test_hilbert_curve_transform_matches_pointwise_mapping(shape):
+    arr = np.random.randint(0, 256, size=shape).astype(np.uint8)
+    result = hilbert_curve_transform(arr)
+    assert np.array_equal(result, _pointwise_hilbert_curve_transform(arr))
+    # second call goes through the cached scatter indices
+    assert np.array_equal(hilbert_curve_transform(arr), result)
+
+
+def test_hilbert_index_table_packs_coordinates():
+    x0, x1 = hilbert_coordinates(4)
+    table = hilbert_index_table(4)
+    assert not table.flags.writeable
+    assert np.array_equal(table, x0 * 16 + x1)
+    assert hilbert_index_table(4) is table
+
+
+def test_hilbert_index_table_persisted_and_memory_mapped(tmp_path):
+    table = hilbert_index_table(3, cache_dir=str(tmp_path))
+    assert isinstance(table, np.memmap)
+    assert (tmp_path / 'hilbert_p3.npy').exists()
+    loaded = np.load(str(tmp_path / 'hilbert_p3.npy'))
+    assert np.array_equal(loaded, hilbert_index_table(3))
+
+
+@pytest.mark.parametrize("length", [16, 100, 1000])
+def test_map_bytes_to_hilbert_matches_hilbertcurve(length):
+    data = np.random.randint(0, 256, size=length).astype(np.uint8)
+    arr = _map_bytes_to_hilbert(data)
+    side = arr.shape[0]
+    p = side.bit_length() - 1
+    hilbert = HilbertCurve(p, 2)
+    expected = np.zeros((side, side), dtype=np.uint8)
+    for d, value in enumerate(data):
+        x0, x1 = hilbert.point_from_distance(d)
+        expected[x0, x1] = value
+    assert np.array_equal(arr, expected)
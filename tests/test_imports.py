@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['matplotlib', 'PIL', 'cupy', 'hilbertcurve']
+
+
+def _loaded_heavy_modules(statement):
+    code = (statement + "\nimport sys\n"
+            "print(' '.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES + ['numba'],))
+    env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    output = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return output.split()
+
+
+@pytest.mark.parametrize("module", ['spacial_boxcounting', 'spacial_boxcounting.api',
+                                    'spacial_boxcounting.batch', 'spacial_boxcounting.io',
+                                    'spacial_boxcounting.hilbert', 'spacial_boxcounting.utils'])
+def test_import_pulls_in_no_heavy_module(module):
+    # numba is only needed once a kernel runs, see api._numba_enabled
+    assert _loaded_heavy_modules("import " + module) == []
+
+
+def test_core_import_loads_only_numba():
+    assert _loaded_heavy_modules("import spacial_boxcounting.core") == ['numba']
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from spacial_boxcounting.core import Z_boxcount, spacialBoxcount
+from spacial_boxcounting.integral import IntegralHistogram
+
+
+def test_query_matches_Z_boxcount_on_arbitrary_rectangles():
+    arr = np.random.randint(0, 256, size=(37, 45)).astype(np.uint8)
+    index = IntegralHistogram.from_array(arr, binwidth=2, MaxValue=256)
+    rects = np.array([[0, 0, 37, 45], [3, 5, 14, 11], [10, 20, 13, 41], [36, 44, 37, 45]])
+    for boxsize in (2, 6, 16):
+        counted, lacunarity = index.query(rects, boxsize=boxsize)
+        for i, (y0, x0, y1, x1) in enumerate(rects):
+            expected_counted, expected_lacunarity = Z_boxcount(arr[y0:y1, x0:x1], boxsize, 256)
+            assert counted[i] == expected_counted
+            assert np.isclose(lacunarity[i], expected_lacunarity)
+
+
+def test_query_tiles_matches_spacialBoxcount():
+    arr = np.random.randint(0, 256, size=(32, 48)).astype(np.uint8)
+    index = IntegralHistogram.from_array(arr, binwidth=8)
+    ys, xs = np.mgrid[0:32:8, 0:48:8]
+    rects = np.stack([ys.ravel(), xs.ravel(), ys.ravel() + 8, xs.ravel() + 8], axis=1)
+    counted, lacunarity = index.query(rects)
+    BoxCountR_map, spa_Lac_map = spacialBoxcount(arr, 2, 256)
+    assert np.array_equal(counted / 32, BoxCountR_map[:4, :6].ravel())
+    assert np.allclose(lacunarity, spa_Lac_map[:4, :6].ravel())
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    arr = np.random.randint(0, 256, size=(16, 16)).astype(np.uint8)
+    index = IntegralHistogram.from_array(arr, binwidth=4)
+    path = index.save(str(tmp_path / 'index'))
+    loaded = IntegralHistogram.load(path)
+    assert isinstance(loaded.table, np.memmap)
+    assert loaded.shape == (16, 16)
+    rects = [[1, 2, 9, 15]]
+    assert np.array_equal(loaded.query(rects)[0], index.query(rects)[0])
+
+
+def test_rectangles_are_validated_and_counts_stay_integer():
+    arr = np.random.randint(0, 256, size=(16, 20)).astype(np.uint8)
+    index = IntegralHistogram.from_array(arr, binwidth=4)
+    for rect in ([-1, 0, 4, 4], [0, 0, 17, 4], [0, 0, 4, 21], [5, 0, 5, 4], [0, 6, 4, 2]):
+        with pytest.raises(ValueError):
+            index.query([rect])
+    with pytest.raises(ValueError):
+        index.bin_counts([[0, 0, 4]])
+    wide = IntegralHistogram(index.table.astype(np.uint64), index.binwidth, index.lo, index.MaxValue)
+    counts = wide.bin_counts([[2, 3, 9, 11]])
+    assert counts.dtype == np.int64
+    assert np.array_equal(counts, index.bin_counts([[2, 3, 9, 11]]))
@@ -0,0 +1,86 @@
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from spacial_boxcounting.io import load_file_as_ndarray
+
+
+def _pil_gray(path):
+    return np.array(Image.open(path).convert('L'))
+
+
+@pytest.mark.parametrize("width", [16, 13, 1])
+def test_bmp_memory_mapped_matches_pil(tmp_path, width):
+    arr = np.random.randint(0, 256, size=(7, width)).astype(np.uint8)
+    path = str(tmp_path / 'gray.bmp')
+    Image.fromarray(arr).save(path)
+    result = load_file_as_ndarray(path)
+    assert isinstance(result, np.memmap)
+    assert not result.flags.writeable
+    assert np.array_equal(result, arr)
+    assert np.array_equal(load_file_as_ndarray(path, mmap=False), arr)
+
+
+def test_top_down_bmp(tmp_path):
+    arr = np.random.randint(0, 256, size=(5, 6)).astype(np.uint8)
+    path = str(tmp_path / 'gray.bmp')
+    Image.fromarray(arr).save(path)
+    raw = bytearray(open(path, 'rb').read())
+    offset, = struct.unpack_from('<I', raw, 10)
+    # negative height: rows stored top to bottom
+    struct.pack_into('<i', raw, 22, -5)
+    stride = 8
+    rows = [raw[offset + i * stride:offset + (i + 1) * stride] for i in range(5)]
+    raw[offset:offset + 5 * stride] = b''.join(rows[::-1])
+    open(path, 'wb').write(bytes(raw))
+    result = load_file_as_ndarray(path)
+    assert isinstance(result, np.memmap)
+    assert np.array_equal(result, arr)
+
+
+@pytest.mark.parametrize("image", [
+    lambda arr: Image.fromarray(np.stack([arr, 255 - arr, arr // 2], axis=-1)),
+    lambda arr: Image.fromarray(arr).convert('P', palette=Image.Palette.ADAPTIVE, colors=16),
+])
+def test_unmappable_bmp_falls_back_to_pil(tmp_path, image):
+    arr = np.random.randint(0, 256, size=(9, 10)).astype(np.uint8)
+    path = str(tmp_path / 'color.bmp')
+    image(arr).save(path)
+    result = load_file_as_ndarray(path)
+    assert not isinstance(result, np.memmap)
+    assert np.array_equal(result, _pil_gray(path))
+
+
+def test_npy_memory_mapped(tmp_path):
+    arr = np.random.randint(0, 256, size=(12, 8)).astype(np.uint8)
+    path = str(tmp_path / 'arr.npy')
+    np.save(path, arr)
+    result = load_file_as_ndarray(path)
+    assert isinstance(result, np.memmap)
+    assert np.array_equal(result, arr)
+
+
+def test_color_loads_channel_first_view(tmp_path):
+    from spacial_boxcounting.api import boxcount_from_file
+    rgb = np.random.randint(0, 256, size=(16, 24, 3)).astype(np.uint8)
+    path = str(tmp_path / 'rgb.png')
+    Image.fromarray(rgb).save(path)
+    image = load_file_as_ndarray(path, color=True)
+    assert image.shape == (3, 16, 24)
+    assert np.array_equal(image, rgb.transpose(2, 0, 1))
+    assert image.base is not None and image.strides[0] == 1  # interleaved, not copied per channel
+    gray = str(tmp_path / 'gray.png')
+    Image.fromarray(rgb[:, :, 0]).save(gray)
+    assert load_file_as_ndarray(gray, color=True).shape == (1, 16, 24)
+    assert boxcount_from_file(path, color='channels').shape == (3, 2, 9, 13)
+
+
+@pytest.mark.parametrize("mode", ['RGB', 'P', 'L'])
+def test_gray_from_color_matches_pil(tmp_path, mode):
+    from spacial_boxcounting.io import gray_from_color
+    rgb = np.random.randint(0, 256, size=(20, 28, 3)).astype(np.uint8)
+    path = str(tmp_path / 'image.png')
+    Image.fromarray(rgb).convert(mode).save(path)
+    assert np.array_equal(gray_from_color(load_file_as_ndarray(path, color=True)), load_file_as_ndarray(path))
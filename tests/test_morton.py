@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from spacial_boxcounting.io import load_file_as_ndarray
+from spacial_boxcounting.morton import morton_layout, morton_scatter
+
+
+def _pointwise_morton_scatter(data):
+    """Bit-by-bit reference: even distance bits go to the column, odd bits to the row."""
+    rows, cols = morton_layout(data.size)
+    out = np.zeros((rows, cols), dtype=data.dtype)
+    for d, value in enumerate(data):
+        x = y = 0
+        for bit in range(2 * cols.bit_length()):
+            if (d >> bit) & 1:
+                if bit % 2:
+                    y |= 1 << (bit // 2)
+                else:
+                    x |= 1 << (bit // 2)
+        out[y, x] = value
+    return out
+
+
+@pytest.mark.parametrize("length,shape", [(1, (1, 1)), (2, (1, 2)), (5, (2, 4)), (16, (4, 4)), (17, (4, 8))])
+def test_morton_layout_is_smallest_power_of_two_rectangle(length, shape):
+    assert morton_layout(length) == shape
+
+
+@pytest.mark.parametrize("length", [1, 7, 64, 1000, 70000, 140000])
+def test_morton_scatter_matches_pointwise_mapping(length):
+    data = np.random.randint(0, 256, size=length).astype(np.uint8)
+    assert np.array_equal(morton_scatter(data), _pointwise_morton_scatter(data))
+
+
+def test_load_file_as_ndarray_curves(tmp_path):
+    data = np.random.randint(0, 256, size=5000).astype(np.uint8)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(data.tobytes())
+    arr = load_file_as_ndarray(str(path), curve='morton')
+    assert arr.shape == (64, 128)
+    assert np.array_equal(arr, morton_scatter(data))
+    hilbert_arr = load_file_as_ndarray(str(path), hilbert=True)
+    assert np.array_equal(load_file_as_ndarray(str(path), curve='hilbert'), hilbert_arr)
+    assert np.array_equal(np.sort(hilbert_arr.ravel())[-5000:], np.sort(data))
+    with pytest.raises(ValueError):
+        load_file_as_ndarray(str(path), curve='peano')
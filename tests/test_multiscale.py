@@ -1,7 +1,12 @@
+import pickle
+
 import numpy as np
 import pytest
 
 from spacial_boxcounting.api import global_boxcount_from_array, multi_scale_fractal_dimension_from_array
+from spacial_boxcounting import api
+from spacial_boxcounting.core import Z_boxcount, spacialBoxcount, spacialBoxcount_pyramid, MultithreadBoxcount
+from spacial_boxcounting.multiscale import MultiscaleMaps
 
 
 def test_global_boxcount_from_array():
@@ -24,5 +29,97 @@ def test_multi_scale_fractal_dimension_from_array():
     # Fractal dimension should be a non-negative value
     assert fd >= 0
 
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.float64])
+def test_spacialBoxcount_pyramid_matches_spacialBoxcount(dtype):
+    # 70 rows: the last band is shorter than the largest box size
+    arr = np.random.randint(0, 256, size=(70, 100)).astype(dtype)
+    levels = spacialBoxcount_pyramid(arr, 6, 256)
+    assert len(levels) == 6
+    for iteration, (BoxCountR_map, spa_Lac_map) in enumerate(levels):
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert np.array_equal(BoxCountR_map, expected[0])
+        assert np.allclose(spa_Lac_map, expected[1])
+
+
+def test_pyramid_of_wide_value_range_matches_spacialBoxcount():
+    arr = np.random.uniform(0, 2e8, size=(64, 64))
+    levels = spacialBoxcount_pyramid(arr, 4, 256)
+    maps = api.multiscale_boxcount(arr, 4, dtype=np.float64)
+    for iteration, (BoxCountR_map, spa_Lac_map) in enumerate(levels):
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert np.array_equal(BoxCountR_map, expected[0]) and np.array_equal(maps[iteration][0], expected[0])
+        assert np.allclose(spa_Lac_map, expected[1]) and np.allclose(maps[iteration][1], expected[1])
+
+
+def test_global_boxcount_from_array_matches_Z_boxcount():
+    arr = np.random.randint(0, 200, size=(64, 64)).astype(np.uint8)
+    result = global_boxcount_from_array(arr, scales=range(8), maxvalue=256)
+    for bs, counted in result.items():
+        assert counted == Z_boxcount(arr, bs, 256)[0]
+
+
+def test_MultithreadBoxcount_layout():
+    arr = np.random.randint(0, 256, size=(64, 64)).astype(np.uint8)
+    result = MultithreadBoxcount(arr)
+    assert list(result["iteration"]) == ["BoxcountRatio", "spacialLacunarity"]
+    for i in range(4):
+        assert result[i].shape == (2, 64 // 2**(i+1) + 1, 64 // 2**(i+1) + 1)
+        assert np.array_equal(result[i][0], spacialBoxcount(arr, i, 256)[0])
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_multiscale_boxcount_matches_spacialBoxcount(dtype):
+    arr = np.random.randint(0, 256, size=(70, 100)).astype(np.uint8)
+    maps = api.multiscale_boxcount(arr, 5, dtype=dtype)
+    assert maps.dtype == dtype and maps.iterations == (0, 1, 2, 3, 4)
+    for iteration, level in maps:
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert level.shape == (2,) + expected[0].shape
+        assert np.shares_memory(level, maps.buffer)
+        assert np.allclose(maps.boxcount_ratio(iteration), expected[0])
+        assert np.allclose(maps.lacunarity(iteration), expected[1], rtol=1e-6)
+    assert maps.offsets[-1] == maps.buffer.size
+
+
+def test_default_scales_and_dict_layout():
+    arr = np.random.randint(0, 256, size=(64, 64)).astype(np.uint8)
+    maps = api.multiscale_boxcount(arr)
+    legacy = MultithreadBoxcount(arr)
+    layout = maps.to_dict()
+    assert set(layout) == set(legacy)
+    for i in range(4):
+        assert np.array_equal(layout[i][0], legacy[i][0]) and np.allclose(layout[i][1], legacy[i][1])
+    with pytest.raises(KeyError):
+        maps[7]
+
+
+def test_zero_copy_export_and_pickle():
+    arr = np.random.randint(0, 256, size=(32, 32)).astype(np.uint8)
+    maps = api.multiscale_boxcount(arr, 3, dtype=np.float32)
+    assert np.asarray(maps) is maps.buffer
+    assert memoryview(maps.buffer).nbytes == maps.nbytes
+    restored = pickle.loads(pickle.dumps(maps))
+    assert np.array_equal(restored[2], maps[2])
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    arr = np.random.randint(0, 256, size=(40, 24)).astype(np.uint8)
+    maps = api.multiscale_boxcount(arr, 3)
+    path = maps.save(str(tmp_path / 'maps'))
+    loaded = MultiscaleMaps.load(path)
+    assert isinstance(loaded.buffer, np.memmap)
+    assert loaded.shapes == maps.shapes
+    assert np.array_equal(loaded[1], maps[1])
+    # fill a writable memory-mapped file in place
+    target = MultiscaleMaps.load(MultiscaleMaps.allocate(arr.shape, range(3)).save(str(tmp_path / 'out')), 'r+')
+    assert api.multiscale_boxcount(arr, 3, out=target) is target
+    assert np.array_equal(MultiscaleMaps.load(str(tmp_path / 'out'))[2], maps[2])
+    with pytest.raises(ValueError):
+        api.multiscale_boxcount(arr, 2, out=target)
+    with pytest.raises(ValueError, match='read-only'):
+        api.multiscale_boxcount(arr, 3, out=MultiscaleMaps.load(str(tmp_path / 'out')))
+
+
 if __name__ == '__main__':
     pytest.main([__file__])
@@ -0,0 +1,72 @@
+import pickle
+
+import numpy as np
+
+from spacial_boxcounting import api
+from spacial_boxcounting.core import Z_boxcount_hist, spacialBoxcount
+from spacial_boxcounting.scalespace import ScaleSpace
+
+
+def test_spatial_levels_match_spacialBoxcount():
+    arr = np.random.randint(0, 256, size=(70, 90)).astype(np.uint8)
+    space = ScaleSpace(arr)
+    BoxCountR_map, spa_Lac_map = space.spatial(2)
+    expected = spacialBoxcount(arr, 2, 256)
+    assert np.array_equal(BoxCountR_map, expected[0]) and np.allclose(spa_Lac_map, expected[1])
+    levels = space.spatial_levels([0, 4, 2])
+    for maps, iteration in zip(levels, [0, 4, 2]):
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert maps.shape == (2,) + expected[0].shape and maps.flags.c_contiguous
+        assert np.array_equal(maps[0], expected[0]) and np.allclose(maps[1], expected[1])
+    # the pyramid pass (numba engine) also kept the levels in between
+    assert sorted(space._maps) == ([0, 1, 2, 3, 4] if api._numba_enabled() else [0, 2, 4])
+
+
+def test_each_scale_is_computed_once(monkeypatch):
+    arr = np.random.randint(0, 256, size=(64, 64)).astype(np.uint8)
+    space = ScaleSpace(arr)
+    calls = []
+    global_boxcounts = api._global_boxcounts
+
+    def counting(arr, box_sizes, maxvalue):
+        calls.append(list(box_sizes))
+        return global_boxcounts(arr, box_sizes, maxvalue)
+    monkeypatch.setattr('spacial_boxcounting.scalespace._global_boxcounts', counting)
+    fd = space.fractal_dimension()
+    space.single()
+    space.lacunarity_curve([2, 4, 3])
+    assert space.fractal_dimension() == fd
+    assert calls == [[2, 4, 8, 16, 32, 64], [3]]
+
+
+def test_global_results_match_helpers():
+    arr = np.random.randint(0, 200, size=(64, 48)).astype(np.uint8)
+    space = ScaleSpace(arr)
+    counts, lacunarities = space.global_boxcounts([2, 6, 16])
+    for counted, lacunarity, bs in zip(counts, lacunarities, [2, 6, 16]):
+        expected_counted, expected_lacunarity = Z_boxcount_hist(arr, bs, 256)
+        assert counted == expected_counted and np.isclose(lacunarity, expected_lacunarity)
+    single, expected = space.single(), api.boxcount_from_array(arr, mode='single')
+    assert single['boxcount'] == expected['boxcount'] and np.isclose(single['lacunarity'], expected['lacunarity'])
+    assert np.isclose(space.fractal_dimension([2, 4, 8]), api.fractal_dimension_from_array(arr, box_sizes=[2, 4, 8]))
+
+
+def test_pickle_keeps_cached_results():
+    arr = np.random.randint(0, 256, size=(32, 32)).astype(np.uint8)
+    space = ScaleSpace(arr, num_threads=1)
+    space.spatial(1)
+    space.fractal_dimension()
+    assert not hasattr(space, '__dict__')
+    restored = pickle.loads(pickle.dumps(space))
+    assert restored.num_threads == 1 and sorted(restored._maps) == [1]
+    assert np.array_equal(restored.spatial(1)[0], space.spatial(1)[0])
+    assert restored._global == space._global
+
+
+def test_from_file(tmp_path):
+    arr = np.random.randint(0, 256, size=(32, 32)).astype(np.uint8)
+    path = str(tmp_path / 'arr.npy')
+    np.save(path, arr)
+    space = ScaleSpace.from_file(path)
+    assert np.array_equal(space.spatial(0)[0], api.boxcount_from_file(path)[0])
+    assert np.isclose(space.fractal_dimension(), api.fractal_dimension_from_file(path))
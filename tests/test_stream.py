@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from spacial_boxcounting.core import spacialBoxcount
+from spacial_boxcounting.stream import SpacialBoxcountStream, stream_boxcount
+
+
+def _split_rows(arr, heights):
+    bands, start = [], 0
+    for height in heights:
+        bands.append(arr[start:start + height])
+        start += height
+    bands.append(arr[start:])
+    return bands
+
+
+@pytest.mark.parametrize("heights", [[1] * 70, [3, 0, 17, 8, 5], [64], [7, 7, 7, 7, 7, 7, 7, 7, 7, 7]])
+def test_stacked_rows_match_spacialBoxcount(heights):
+    arr = np.random.randint(0, 256, size=(77, 45)).astype(np.uint8)
+    scales = [0, 1, 2, 3, 4]
+    rows = {iteration: [] for iteration in scales}
+    for iteration, row, BoxCountR_row, spa_Lac_row in stream_boxcount(_split_rows(arr, heights), 45, scales):
+        assert row == len(rows[iteration])
+        rows[iteration].append((BoxCountR_row, spa_Lac_row))
+    for iteration in scales:
+        BoxCountR_map, spa_Lac_map = spacialBoxcount(arr, iteration, 256)
+        assert np.array_equal(np.array([r[0] for r in rows[iteration]]), BoxCountR_map)
+        assert np.allclose(np.array([r[1] for r in rows[iteration]]), spa_Lac_map)
+
+
+def test_rows_emitted_as_soon_as_final_with_bounded_buffer():
+    arr = np.random.randint(0, 256, size=(40, 20)).astype(np.uint8)
+    stream = SpacialBoxcountStream(20, scales=[0, 2])
+    emitted = stream.push(arr[:1])
+    assert emitted == []
+    emitted = stream.push(arr[1:2])
+    assert [(iteration, row) for iteration, row, _, _ in emitted] == [(0, 0)]
+    for y in range(2, 40):
+        emitted = stream.push(arr[y:y + 1])
+        assert stream._fill - (stream._keep_from - stream._buffer_start) < 8
+        assert stream._buffer.shape[0] <= 16
+        assert [(iteration, row) for iteration, row, _, _ in emitted] == \
+            [(0, y // 2)] * (y % 2) + [(2, y // 8)] * (y % 8 == 7)
+    assert [(iteration, row) for iteration, row, _, _ in stream.close()] == [(0, 20), (2, 5)]
+    with pytest.raises(ValueError):
+        stream.push(arr[:2])
+
+
+def test_push_rejects_wrong_width():
+    stream = SpacialBoxcountStream(20)
+    with pytest.raises(ValueError):
+        stream.push(np.zeros((2, 21), dtype=np.uint8))
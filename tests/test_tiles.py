@@ -0,0 +1,140 @@
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from spacial_boxcounting.api import (boxcount_from_array, boxcount_from_file, boxcount_from_tiles,
+                                     fractal_dimension_from_array, fractal_dimension_from_file)
+from spacial_boxcounting.core import spacialBoxcount
+from spacial_boxcounting.io import binary_shape, file_shape, iter_binary_tiles, iter_file_tiles, load_file_as_ndarray
+
+# JPEG, PNG and compressed TIFF fixtures are decoded whole, with a warning
+pytestmark = pytest.mark.filterwarnings('ignore:.*cannot be decoded by region:UserWarning')
+
+
+@pytest.fixture(params=[1, 37, 4096, 5000, 70000])
+def binary_file(request, tmp_path):
+    data = np.random.randint(0, 256, size=request.param).astype(np.uint8)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(data.tobytes())
+    return str(path)
+
+
+@pytest.mark.parametrize("curve", [None, 'hilbert', 'morton'])
+@pytest.mark.parametrize("tile_side", [8, 64])
+def test_tiles_reassemble_in_memory_array(binary_file, curve, tile_side):
+    expected = load_file_as_ndarray(binary_file, curve=curve)
+    assert binary_shape(binary_file, curve=curve) == expected.shape
+    arr = np.full(expected.shape, -1, dtype=np.int16)
+    for y0, x0, tile in iter_binary_tiles(binary_file, tile_side, curve=curve):
+        assert tile.shape[0] <= tile_side and tile.shape[1] <= tile_side
+        assert (arr[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] == -1).all()
+        arr[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+    assert np.array_equal(arr, expected)
+
+
+@pytest.mark.parametrize("curve", [None, 'hilbert', 'morton'])
+def test_tiled_boxcount_matches_in_memory(binary_file, curve):
+    arr = load_file_as_ndarray(binary_file, curve=curve)
+    for iteration in range(3):
+        tiles = iter_binary_tiles(binary_file, 16, curve=curve)
+        result = boxcount_from_tiles(tiles, arr.shape, iteration)
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert np.array_equal(result[0], expected[0])
+        assert np.allclose(result[1], expected[1])
+    result = boxcount_from_file(binary_file, curve=curve, tile_side=32)
+    expected = boxcount_from_array(arr)
+    assert np.array_equal(result[0], expected[0]) and np.allclose(result[1], expected[1])
+
+
+def test_boxcount_from_tiles_rejects_misaligned_tiles():
+    tiles = [(0, 0, np.zeros((3, 3), dtype=np.uint8)), (0, 3, np.zeros((3, 3), dtype=np.uint8))]
+    with pytest.raises(ValueError):
+        boxcount_from_tiles(tiles, (3, 6), iteration=0)
+
+
+def _write_tiled_tiff(path, arr, tile):
+    """Minimal uncompressed 8-bit grayscale TIFF with tile_width = tile_length = tile."""
+    height, width = arr.shape
+    ny, nx = -(-height // tile), -(-width // tile)
+    padded = np.zeros((ny * tile, nx * tile), dtype=np.uint8)
+    padded[:height, :width] = arr
+    blocks = [padded[y:y + tile, x:x + tile].tobytes() for y in range(0, ny * tile, tile) for x in range(0, nx * tile, tile)]
+    entries = 10
+    ifd_size = 2 + 12 * entries + 4
+    offsets_at = 8 + ifd_size
+    counts_at = offsets_at + 4 * len(blocks)
+    data_at = counts_at + 4 * len(blocks)
+    tags = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 1, 8), (259, 3, 1, 1), (262, 3, 1, 1),
+            (277, 3, 1, 1), (322, 3, 1, tile), (323, 3, 1, tile),
+            (324, 4, len(blocks), offsets_at), (325, 4, len(blocks), counts_at)]
+    out = bytearray(b'II*\x00' + struct.pack('<I', 8) + struct.pack('<H', entries))
+    for tag, kind, count, value in tags:
+        out += struct.pack('<HHII', tag, kind, count, value)
+    out += struct.pack('<I', 0)
+    out += struct.pack('<%dI' % len(blocks), *[data_at + i * tile * tile for i in range(len(blocks))])
+    out += struct.pack('<%dI' % len(blocks), *[tile * tile] * len(blocks))
+    out += b''.join(blocks)
+    with open(path, 'wb') as f:
+        f.write(bytes(out))
+
+
+@pytest.fixture(params=['strips', 'tiled', 'bmp', 'lzw', 'jpeg', 'png'])
+def image_file(request, tmp_path):
+    arr = np.random.randint(0, 256, size=(75, 131)).astype(np.uint8)
+    rgb = np.stack([arr, arr // 2, 255 - arr], axis=-1)
+    if request.param == 'strips':
+        path = str(tmp_path / 'image.tif')
+        Image.fromarray(rgb).save(path, tiffinfo={278: 7})
+    elif request.param == 'tiled':
+        path = str(tmp_path / 'image.tif')
+        _write_tiled_tiff(path, arr, 16)
+    elif request.param == 'bmp':
+        path = str(tmp_path / 'image.bmp')
+        Image.fromarray(arr).save(path)
+    elif request.param == 'lzw':
+        path = str(tmp_path / 'image.tiff')
+        Image.fromarray(arr).save(path, compression='tiff_lzw')
+    else:
+        path = str(tmp_path / ('image.' + {'jpeg': 'jpg', 'png': 'png'}[request.param]))
+        Image.fromarray(rgb).save(path)
+    return path
+
+
+@pytest.mark.parametrize("tile_side", [8, 32, 256])
+def test_image_tiles_reassemble_in_memory_array(image_file, tile_side):
+    expected = load_file_as_ndarray(image_file)
+    assert file_shape(image_file) == expected.shape
+    arr = np.full(expected.shape, -1, dtype=np.int16)
+    for y0, x0, tile in iter_file_tiles(image_file, tile_side):
+        arr[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+    assert np.array_equal(arr, expected)
+
+
+def test_image_tiles_reduce(image_file):
+    reduced = np.full(file_shape(image_file, reduce=2), -1, dtype=np.int16)
+    for y0, x0, tile in iter_file_tiles(image_file, 16, reduce=2):
+        reduced[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+    assert reduced.shape == (38, 66) and (reduced >= 0).all()
+
+
+def test_tiled_image_analysis_matches_in_memory(image_file, tmp_path):
+    arr = load_file_as_ndarray(image_file)
+    expected = boxcount_from_array(arr)
+    out = [np.lib.format.open_memmap(str(tmp_path / name), mode='w+', shape=expected[0].shape)
+           for name in ('counts.npy', 'lacunarity.npy')]
+    result = boxcount_from_file(image_file, tile_side=16, out=out)
+    assert result[0] is out[0]
+    assert np.array_equal(result[0], expected[0]) and np.allclose(result[1], expected[1])
+    assert fractal_dimension_from_file(image_file, tile_side=32) == pytest.approx(fractal_dimension_from_array(arr))
+
+
+def test_only_undecodable_images_are_decoded_whole(image_file):
+    import warnings
+    regional = not image_file.endswith(('.tiff', '.jpg', '.png'))
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        for _ in iter_file_tiles(image_file, 32):
+            pass
+    assert bool(caught) != regional
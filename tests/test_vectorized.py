@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from spacial_boxcounting.core import Z_boxcount, spacialBoxcount
+from spacial_boxcounting.vectorized import Z_boxcount_numpy, spacialBoxcount_numpy
+from spacial_boxcounting import api
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int64, np.float32])
+def test_spacialBoxcount_numpy_matches_spacialBoxcount(dtype):
+    arr = np.random.randint(0, 256, size=(70, 100)).astype(dtype)
+    for iteration in range(6):
+        result = spacialBoxcount_numpy(arr, iteration, 256)
+        expected = spacialBoxcount(arr, iteration, 256)
+        assert np.array_equal(result[0], expected[0])
+        assert np.allclose(result[1], expected[1])
+
+
+def test_Z_boxcount_numpy_matches_Z_boxcount():
+    arr = np.array([[0, 300], [5, -7]], dtype=np.int64)
+    for boxsize in (2, 4, 64):
+        counted, lacunarity = Z_boxcount_numpy(arr, boxsize, 256)
+        expected_counted, expected_lacunarity = Z_boxcount(arr, boxsize, 256)
+        assert counted == expected_counted
+        assert np.isclose(lacunarity, expected_lacunarity)
+
+
+def test_boxcount_from_array_without_numba(monkeypatch):
+    arr = np.random.randint(0, 256, size=(32, 32)).astype(np.uint8)
+    expected = api.boxcount_from_array(arr, mode='spatial')
+    monkeypatch.setenv('SPACIAL_BOXCOUNTING_DISABLE_NUMBA', '1')
+    assert not api._numba_enabled()
+    result = api.boxcount_from_array(arr, mode='spatial')
+    assert np.array_equal(result[0], expected[0])
+    assert np.allclose(result[1], expected[1])
+    assert api.boxcount_from_array(arr, mode='single')['boxcount'] == Z_boxcount(arr, 8, 256)[0]
+
+
+def test_boxcount_from_stack_without_numba(monkeypatch):
+    stack = np.random.randint(0, 256, size=(3, 24, 20)).astype(np.uint8)
+    expected = api.boxcount_from_stack(stack, scales=[1, 0])
+    monkeypatch.setenv('SPACIAL_BOXCOUNTING_DISABLE_NUMBA', '1')
+    result = api.boxcount_from_stack(stack, scales=[1, 0])
+    assert result.shape == expected.shape == (3, 2, 2, 13, 11)
+    assert np.array_equal(result[:, :, 0], expected[:, :, 0])
+    assert np.allclose(result[:, :, 1], expected[:, :, 1])
+
+
+def test_global_boxcount_from_ragged_without_numba(monkeypatch):
+    patches = [np.random.randint(0, 256, size=shape).astype(np.uint8) for shape in [(4, 9), (0, 0), (12, 5)]]
+    pixels, offsets, _ = api.pack_patches(patches)
+    expected = api.global_boxcount_from_ragged(pixels, offsets, box_sizes=[2, 5, 32])
+    monkeypatch.setenv('SPACIAL_BOXCOUNTING_DISABLE_NUMBA', '1')
+    counts, lacunarities = api.global_boxcount_from_ragged(pixels, offsets, box_sizes=[2, 5, 32])
+    assert np.array_equal(counts, expected[0])
+    assert np.allclose(lacunarities, expected[1], equal_nan=True)
+
+
+@pytest.mark.parametrize("mode", ['channels', 'joint'])
+def test_boxcount_from_color_without_numba(monkeypatch, mode):
+    image = np.random.randint(0, 256, size=(20, 28, 3)).astype(np.uint8).transpose(2, 0, 1)
+    expected = api.boxcount_from_color(image, mode, iteration=1)
+    monkeypatch.setenv('SPACIAL_BOXCOUNTING_DISABLE_NUMBA', '1')
+    result = api.boxcount_from_color(image, mode, iteration=1)
+    for r, e in zip(result, expected):
+        assert np.allclose(r, e)
+
+
+def test_joint_without_numba_rejects_values_out_of_range(monkeypatch):
+    monkeypatch.setenv('SPACIAL_BOXCOUNTING_DISABLE_NUMBA', '1')
+    with pytest.raises(ValueError):
+        api.boxcount_from_color(np.full((3, 8, 8), 2e8), 'joint')
+
+
+def test_multiscale_boxcount_without_numba(monkeypatch):
+    arr = np.random.randint(0, 256, size=(40, 36)).astype(np.uint8)
+    expected = api.multiscale_boxcount(arr, 3)
+    monkeypatch.setenv('SPACIAL_BOXCOUNTING_DISABLE_NUMBA', '1')
+    result = api.multiscale_boxcount(arr, 3)
+    assert np.allclose(np.asarray(result), np.asarray(expected))
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import spacial_boxcounting
+from spacial_boxcounting import core
+from spacial_boxcounting.api import _numba_enabled
+
+pytestmark = pytest.mark.skipif(not _numba_enabled(), reason="numba is disabled, warmup compiles nothing")
+
+
+def test_warmup_compiles_requested_dtypes():
+    compile_times = spacial_boxcounting.warmup(dtypes=('uint8',))
+    assert set(compile_times) >= {'Z_boxcount_hist', 'spacialBoxcount', 'spacialBoxcount_pyramid'}
+    assert all(seconds >= 0 for seconds in compile_times.values())
+    assert any('uint8' in str(sig[0]) for sig in core.spacialBoxcount.signatures)
+
+
+def test_kernels_cache_to_configured_dir(tmp_path):
+    env = dict(os.environ, SPACIAL_BOXCOUNTING_CACHE_DIR=str(tmp_path))
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = repo + os.pathsep + env.get('PYTHONPATH', '')
+    code = ("import numpy as np; from spacial_boxcounting.core import Z_boxcount_hist; "
+            "Z_boxcount_hist(np.zeros((4, 4), np.uint8), 2, 256)")
+    subprocess.run([sys.executable, '-c', code], env=env, check=True)
+    cached = [name for _, _, files in os.walk(str(tmp_path)) for name in files]
+    assert any(name.endswith('.nbi') for name in cached)
+
+
+def test_warmup_selected_kernels_and_layouts():
+    compile_times = spacial_boxcounting.warmup(dtypes=('uint8',), kernels=['global_boxcount_pyramid'],
+                                               layouts=[('A', True)])
+    assert set(compile_times) == {'global_boxcount_pyramid'}
+    assert any(sig[0].layout == 'A' and not sig[0].mutable for sig in core.global_boxcount_pyramid.signatures)